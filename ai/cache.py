@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+
+class ResponseCache:
+    """
+    基于 SQLite 的LLM响应缓存，以内容寻址 (content-addressed) 的方式存储 Structure 结果。
+    缓存键由论文内容、模型名、提示词模板、输出语言和 Structure 模式共同决定，
+    任一项变化都会自然地产生新的键，因此无需手动失效。
+    """
+
+    def __init__(self, path, max_age_days=None, max_size_mb=None):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " paper_id TEXT,"
+            " model_name TEXT,"
+            " payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.evict(max_age_days, max_size_mb)
+
+    @staticmethod
+    def make_key(paper, model_name, prompt_fingerprint):
+        """计算一篇论文在指定模型下的缓存键。"""
+        material = json.dumps({
+            "id": paper.get("id"),
+            "title": paper.get("title"),
+            "summary": paper.get("summary"),
+            "model": model_name,
+            "prompt": prompt_fingerprint,
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def prompt_fingerprint(templates, system_prompt, language, schema):
+        """将模板 (单篇与批量)、系统提示词、语言和输出模式压缩为一个指纹，参与缓存键计算。"""
+        material = json.dumps([templates, system_prompt, language, schema], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        row = self.conn.execute("SELECT payload FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        self.conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key, paper_id, model_name, payload):
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (key, paper_id, model_name, payload, created_at, accessed_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (key, paper_id, model_name, json.dumps(payload, ensure_ascii=False), now, now),
+        )
+        self.conn.commit()
+
+    def evict(self, max_age_days=None, max_size_mb=None):
+        """按条目年龄和缓存总大小淘汰条目，超出大小时优先淘汰最久未被访问的条目。返回淘汰数量。"""
+        removed = 0
+        if max_age_days:
+            cutoff = time.time() - max_age_days * 86400
+            removed += self.conn.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,)).rowcount
+        if max_size_mb:
+            budget = max_size_mb * 1024 * 1024
+            total = self.conn.execute("SELECT COALESCE(SUM(LENGTH(payload)), 0) FROM responses").fetchone()[0]
+            if total > budget:
+                stale_keys = []
+                for key, size in self.conn.execute("SELECT key, LENGTH(payload) FROM responses ORDER BY accessed_at"):
+                    if total <= budget:
+                        break
+                    stale_keys.append((key,))
+                    total -= size
+                self.conn.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+                removed += len(stale_keys)
+        self.conn.commit()
+        return removed
+
+    def stats(self):
+        entries = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self):
+        self.conn.close()
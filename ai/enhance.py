@@ -3,6 +3,7 @@ import json
 import sys
 import dotenv
 import argparse
+import asyncio
 import time
 
 import langchain_core.exceptions
@@ -10,7 +11,16 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 # **新增**: 明确导入需要的异常类型
 from google.api_core import exceptions as google_exceptions
 from langchain.prompts import ChatPromptTemplate
-from structure import Structure
+
+# 论文汇总库 (paper_store.py) 与数据归档 (archive.py) 位于仓库根目录
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+# structure 与 reuse 也被根目录的 paper_store.py、archive.py 以 ai.structure、ai.reuse 导入，这里使用同一个模块名，只加载一次
+from ai.structure import Structure, BatchStructure
+from rate_limiter import parse_rate_limits
+from scheduler import KeyScheduler, backoff_delay
+from cache import ResponseCache
+from ai.reuse import reuse_enhancements, is_enhancement_valid, FAILURE_MESSAGE
+from journal import EnhancementJournal
 
 # 加载环境变量
 if os.path.exists('.env'):
@@ -23,18 +33,48 @@ try:
         template_content = f.read()
     with open(os.path.join(script_dir, "system.txt"), "r", encoding="utf-8") as f:
         system_prompt_template = f.read()
+    with open(os.path.join(script_dir, "template_batch.txt"), "r", encoding="utf-8") as f:
+        batch_template_content = f.read()
 except FileNotFoundError as e:
     print(f"错误：找不到必需的模板文件: {e}。搜索路径: {script_dir}", file=sys.stderr)
     sys.exit(1)
 
+# 常见模型的输出token上限 (按名称前缀匹配)，用于决定批量模式下每个请求可容纳的论文数
+MODEL_OUTPUT_TOKEN_LIMITS = {
+    "gemini-2.5-pro": 65536,
+    "gemini-2.5-flash": 65536,
+    "gemini-2.0-flash": 8192,
+    "gemini-1.5-pro": 8192,
+    "gemini-1.5-flash": 8192,
+}
+DEFAULT_OUTPUT_TOKEN_LIMIT = 8192
+# 瞬时性错误的指数退避上限 (秒)
+MAX_BACKOFF_SECONDS = 60
+
 
-def parse_args():
-    """解析命令行参数。"""
+def parse_args(argv=None):
+    """解析命令行参数 (argv 为 None 时取 sys.argv)。"""
     parser = argparse.ArgumentParser(description="使用AI摘要增强arXiv数据。")
     parser.add_argument("--data", type=str, required=True, help="要处理的JSONL数据文件。")
     parser.add_argument("--retries", type=int, default=3, help="对每个模型任务的最大重试次数。")
-    parser.add_argument("--timeout", type=int, default=1, help="失败尝试之间的等待秒数。")
-    return parser.parse_args()
+    parser.add_argument("--timeout", type=float, default=1, help="瞬时性错误后指数退避的基础等待秒数。")
+    parser.add_argument("--concurrency", type=int, default=int(os.environ.get("MAX_CONCURRENCY") or 8),
+                        help="同时进行的API请求数上限。设为1时逐篇处理。")
+    parser.add_argument("--cache", type=str,
+                        default=os.environ.get("LLM_CACHE_PATH") or os.path.join(script_dir, "..", ".cache", "llm_responses.sqlite"),
+                        help="LLM响应缓存 (SQLite) 文件路径。")
+    parser.add_argument("--no-cache", action="store_true", help="禁用LLM响应缓存。")
+    parser.add_argument("--cache-max-age-days", type=float, default=30, help="缓存条目的最长保留天数。")
+    parser.add_argument("--batch-size", type=int, default=int(os.environ.get("BATCH_SIZE") or 1),
+                        help="每个请求最多包含的论文数 (批量模式)。实际数量还会根据模型输出上限自动缩小。设为1时逐篇请求。")
+    parser.add_argument("--resume", action="store_true", help="从上次中断处继续：跳过输出日志中已成功的论文。")
+    parser.add_argument("--fsync-every", type=int, default=20, help="每写入多少条结果强制刷盘一次。")
+    parser.add_argument("--no-reuse", action="store_true", help="禁用跨日复用往日已增强论文的结果。")
+    parser.add_argument("--store", type=str, nargs="?", const="",
+                        help="跨日复用时改从论文汇总库 (paper_store.py) 按ID查询历史结果，处理完成后导入本次输出，可指定数据库路径。"
+                             "默认直接扫描历史文件。")
+    parser.add_argument("--cache-max-size-mb", type=float, default=200, help="缓存总大小上限 (MB)，超出时淘汰最久未访问的条目。")
+    return parser.parse_args(argv)
 
 def is_response_valid(result: Structure):
     """验证响应，确保所有字段都为非空字符串。"""
@@ -48,15 +88,266 @@ def is_response_valid(result: Structure):
             return False
     return True
 
-def main():
-    """主函数，运行增强过程。"""
-    args = parse_args()
+def output_token_limit(model_name):
+    """返回模型的输出token上限，可通过 MODEL_OUTPUT_TOKEN_LIMIT 环境变量统一覆盖。"""
+    if os.environ.get("MODEL_OUTPUT_TOKEN_LIMIT"):
+        return int(os.environ["MODEL_OUTPUT_TOKEN_LIMIT"])
+    matches = [prefix for prefix in MODEL_OUTPUT_TOKEN_LIMITS if model_name.startswith(prefix)]
+    if not matches:
+        return DEFAULT_OUTPUT_TOKEN_LIMIT
+    return MODEL_OUTPUT_TOKEN_LIMITS[max(matches, key=len)]
+
+def build_cascade_plan(api_keys, model_names):
+    """
+    构建级联调用计划。
+    策略: 优先使用最高优先级的模型，轮询所有密钥。
+    """
+    cascade_plan = []
+    # 外层循环遍历模型列表 (Outer loop for models)
+    for model_name in model_names:
+        # 内层循环遍历密钥列表 (Inner loop for keys)
+        for i, api_key in enumerate(api_keys):
+            cascade_plan.append({
+                "key_name": f"密钥_{i+1}",
+                "api_key": api_key,
+                "model_name": model_name
+            })
+    return cascade_plan
+
+class EnhanceContext:
+    """一次增强运行中所有并发任务共享的状态。"""
+
+    def __init__(self, cascade_plan, model_chains, batch_chains, scheduler, language, args,
+                 cache=None, prompt_fp=None):
+        self.cascade_plan = cascade_plan
+        self.model_chains = model_chains
+        self.batch_chains = batch_chains
+        self.scheduler = scheduler
+        self.language = language
+        self.args = args
+        self.cache = cache
+        self.prompt_fp = prompt_fp
+
+async def invoke_with_cascade(label, chains, inputs, accept, ctx):
+    """
+    通过调度器选择 (密钥, 模型) 并调用模型，直到 accept(response) 返回非 None 的结果。
+    返回 (结果, 所用任务)；所有任务均失败时返回 (None, None)。
+    """
+    args = ctx.args
+    scheduler = ctx.scheduler
+    tried = set()
+    attempts = {}
+
+    while True:
+        index = await scheduler.acquire(tried)
+        if index is None:
+            return None, None
+        task = ctx.cascade_plan[index]
+        chain = chains.get((task["api_key"], task["model_name"]))
+        if not chain:
+            print(f"  ! 跳过已失败的任务: <{task['key_name']}> - {task['model_name']}", file=sys.stderr)
+            scheduler.disable(index, "初始化失败")
+            continue
+
+        attempts[index] = attempts.get(index, 0) + 1
+        attempt = attempts[index]
+        if attempt >= args.retries:
+            # 在该任务上的重试次数已用完，下次选择其他任务
+            tried.add(index)
+        print(f"  [{label}] 使用: <{task['key_name']}> - {task['model_name']} (尝试 {attempt}/{args.retries})", file=sys.stderr)
+        started = time.monotonic()
+        try:
+            response_object = await chain.ainvoke(inputs)
+            result = accept(response_object) if response_object else None
+            if result is not None:
+                scheduler.report_success(index, time.monotonic() - started)
+                print(f"  [{label}] > 尝试成功", file=sys.stderr)
+                return result, task
+            scheduler.report_failure(index)
+
+        except google_exceptions.ResourceExhausted as e:
+            # 限流不计入本篇的重试次数：槽位进入冷却，冷却结束后会自动回到可用池
+            attempts[index] -= 1
+            tried.discard(index)
+            cooldown = scheduler.report_quota_error(index, e)
+            if cooldown is None:
+                print(f"  ! 配额耗尽，本次运行不再使用: <{task['key_name']}> - {task['model_name']}", file=sys.stderr)
+            else:
+                print(f"  ! 触发限流: <{task['key_name']}> - {task['model_name']}，冷却 {cooldown:.0f} 秒", file=sys.stderr)
+
+        except google_exceptions.NotFound:
+            print(f"  ! 模型未找到: <{task['key_name']}> - {task['model_name']}", file=sys.stderr)
+            scheduler.disable(index, "模型未找到")
+
+        except Exception as e:
+            scheduler.report_failure(index)
+            print(f"  [{label}] > 发生瞬时性错误: {e}", file=sys.stderr)
+            if attempt < args.retries:
+                await asyncio.sleep(backoff_delay(attempt, args.timeout, MAX_BACKOFF_SECONDS))
+
+def lookup_cache(d, ctx):
+    """按模型优先级在缓存中查找该论文已有的有效结果。"""
+    if not ctx.cache:
+        return None
+    for model_name in dict.fromkeys(task["model_name"] for task in ctx.cascade_plan):
+        payload = ctx.cache.get(ResponseCache.make_key(d, model_name, ctx.prompt_fp))
+        if payload and is_response_valid(Structure(**payload)):
+            ctx.cache.hits += 1
+            return payload
+    ctx.cache.misses += 1
+    return None
+
+def store_cache(d, model_name, result, ctx):
+    if ctx.cache:
+        ctx.cache.put(ResponseCache.make_key(d, model_name, ctx.prompt_fp), d['id'], model_name, result)
+
+async def enhance_paper(d, ctx):
+    """为单篇论文调用模型，按级联计划依次尝试，返回 Structure 字典或 None。"""
+    cached = lookup_cache(d, ctx)
+    if cached:
+        print(f"  [{d['id']}] > 命中缓存", file=sys.stderr)
+        return cached
+    return await _request_paper(d, ctx)
+
+async def _request_paper(d, ctx):
+    def accept(response_object):
+        return response_object.model_dump() if is_response_valid(response_object) else None
+
+    result, task = await invoke_with_cascade(d['id'], ctx.model_chains, {
+        "title": d['title'],
+        "content": d['summary'],
+        "language": ctx.language
+    }, accept, ctx)
+    if result:
+        store_cache(d, task["model_name"], result, ctx)
+    return result
+
+def format_batch(papers):
+    """将多篇论文拼接为批量提示词中的 {papers} 部分。"""
+    return "\n\n".join(
+        f"### Paper id: {d['id']}\nTitle: {d['title']}\nAbstract: {d['summary']}" for d in papers
+    )
+
+async def enhance_batch(papers, ctx, on_result):
+    """
+    在一次请求中处理多篇论文。每篇结果都单独经过 is_response_valid 校验，
+    校验失败或缺失的论文会被对半拆分后重试，拆到单篇时退回单篇模式。
+    """
+    todo = []
+    for d in papers:
+        cached = lookup_cache(d, ctx)
+        if cached:
+            print(f"  [{d['id']}] > 命中缓存", file=sys.stderr)
+            on_result(d, cached)
+        else:
+            todo.append(d)
+    await _enhance_uncached_batch(todo, ctx, on_result)
+
+async def _enhance_uncached_batch(papers, ctx, on_result):
+    if not papers:
+        return
+    if len(papers) == 1:
+        on_result(papers[0], await _request_paper(papers[0], ctx))
+        return
+
+    wanted = {d['id'] for d in papers}
+    fields = Structure.model_fields.keys()
+
+    def accept(response_object):
+        items = {}
+        for item in response_object.papers:
+            if item.id in wanted and item.id not in items and is_response_valid(item):
+                items[item.id] = {field: getattr(item, field) for field in fields}
+        return items
+
+    label = f"批量 {papers[0]['id']} 等 {len(papers)} 篇"
+    results, task = await invoke_with_cascade(label, ctx.batch_chains, {
+        "papers": format_batch(papers),
+        "language": ctx.language
+    }, accept, ctx)
+    results = results or {}
+
+    failed = []
+    for d in papers:
+        result = results.get(d['id'])
+        if result:
+            store_cache(d, task["model_name"], result, ctx)
+            on_result(d, result)
+        else:
+            failed.append(d)
+    if failed:
+        print(f"  [{label}] > {len(failed)} 篇结果无效或缺失，拆分后重试", file=sys.stderr)
+        half = (len(failed) + 1) // 2
+        await _enhance_uncached_batch(failed[:half], ctx, on_result)
+        await _enhance_uncached_batch(failed[half:], ctx, on_result)
+
+def estimate_output_tokens(d):
+    """粗略估计单篇论文的输出token数：摘要翻译约与原文等长，其余字段约600个token。"""
+    return len(d.get('summary') or '') // 4 + 600
+
+def make_batches(papers, batch_size, output_token_limit):
+    """
+    将论文按顺序分组。每组最多 batch_size 篇，且预计输出不超过模型输出上限的80%，
+    因此摘要较长的论文会自动分到更小的组。
+    """
+    budget = output_token_limit * 0.8
+    batches, current, current_tokens = [], [], 0
+    for d in papers:
+        tokens = estimate_output_tokens(d)
+        if current and (len(current) >= batch_size or current_tokens + tokens > budget):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(d)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+async def run_enhancement(batches, ctx, on_result):
+    """
+    以有限并发处理所有批次。每篇论文完成后立即调用 on_result(paper, result)，
+    随后释放对该批次的引用，避免整批结果常驻内存。
+    """
+    queue = asyncio.Queue()
+    for idx in range(len(batches)):
+        queue.put_nowait(idx)
+    total = sum(len(batch) for batch in batches)
+    done = 0
+
+    def report(d, result):
+        nonlocal done
+        done += 1
+        print(f"\n已完成 {done}/{total}: {d['id']}", file=sys.stderr)
+        on_result(d, result)
+
+    async def worker():
+        while True:
+            try:
+                idx = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            batch = batches[idx]
+            if len(batch) == 1:
+                report(batch[0], await enhance_paper(batch[0], ctx))
+            else:
+                await enhance_batch(batch, ctx, report)
+            batches[idx] = None
+
+    await asyncio.gather(*(worker() for _ in range(max(1, ctx.args.concurrency))))
+
+def main(argv=None):
+    """主函数，运行增强过程。pipeline.py 在同一进程中调用时以 argv 传入参数，并使用返回的输出文件内容 (论文记录列表)。"""
+    args = parse_args(argv)
     
     # --- [核心改造] 加载统一的密钥和模型优先级列表 ---
     google_api_keys_str = os.environ.get("GOOGLE_API_KEYS")
     model_priority_list_str = os.environ.get("MODEL_PRIORITY_LIST")
-    # [新] 从环境变量加载API调用间隔，默认为6秒以遵循10 RPM的限制
-    api_call_interval = int(os.environ.get("API_CALL_INTERVAL", 6))
+    # [新] 从环境变量加载API调用间隔，默认为6秒以遵循10 RPM的限制。
+    # 该间隔现在作用于每个 (密钥, 模型) 组合的令牌桶，而不是全局串行等待。
+    api_call_interval = float(os.environ.get("API_CALL_INTERVAL") or 6)
+    default_rpm = float(os.environ.get("MODEL_RPM") or 60.0 / max(api_call_interval, 0.01))
+    default_rpd = int(os.environ["MODEL_RPD"]) if os.environ.get("MODEL_RPD") else None
+    limits_for = parse_rate_limits(default_rpm, default_rpd)
 
 
     if not google_api_keys_str or not model_priority_list_str:
@@ -71,17 +362,7 @@ def main():
         sys.exit(1)
         
     # --- [核心改造] 构建级联调用计划 ---
-    # 策略: 优先使用最高优先级的模型，轮询所有密钥。
-    cascade_plan = []
-    # 外层循环遍历模型列表 (Outer loop for models)
-    for model_name in model_names:
-        # 内层循环遍历密钥列表 (Inner loop for keys)
-        for i, api_key in enumerate(api_keys):
-            cascade_plan.append({
-                "key_name": f"密钥_{i+1}",
-                "api_key": api_key,
-                "model_name": model_name
-            })
+    cascade_plan = build_cascade_plan(api_keys, model_names)
             
     if not cascade_plan:
         print("错误: 无法根据环境变量构建有效的调用计划。", file=sys.stderr)
@@ -89,7 +370,8 @@ def main():
         
     print("--- 调用计划已构建 ---", file=sys.stderr)
     for i, task in enumerate(cascade_plan):
-        print(f"  优先级 {i+1}: <{task['key_name']}> - {task['model_name']}", file=sys.stderr)
+        rpm, rpd = limits_for(task['model_name'])
+        print(f"  优先级 {i+1}: <{task['key_name']}> - {task['model_name']} (RPM {rpm:g}, RPD {rpd or '不限'})", file=sys.stderr)
     print("----------------------", file=sys.stderr)
 
 
@@ -107,13 +389,49 @@ def main():
     data = unique_data
     print(f"从 {args.data} 加载了 {len(data)} 篇不重复的论文", file=sys.stderr)
 
+    # --- 流式输出: 每篇论文完成后立即写入日志，崩溃后可用 --resume 继续 ---
+    fields = list(Structure.model_fields.keys())
+    output_filename = args.data.replace('.jsonl', f'_AI_enhanced_{language}.jsonl')
+    ordered_ids = [d['id'] for d in data]
+    journal = EnhancementJournal(output_filename, args.fsync_every)
+    completed = journal.open(resume=args.resume, is_complete=lambda record: is_enhancement_valid(record.get('AI'), fields))
+    if args.resume:
+        print(f"断点续跑: 日志中已有 {len(completed)} 篇论文处理成功，将跳过这些论文。", file=sys.stderr)
+        data = [d for d in data if d['id'] not in completed]
+
+    # --- 跨日复用阶段: 周末等重复上榜的论文直接沿用往日的增强结果 ---
+    data_dir = os.path.dirname(os.path.abspath(args.data))
+    store = None
+    if args.store is not None and not args.no_reuse:
+        from paper_store import PaperStore, STORE_PATH
+
+        store = PaperStore(args.store or STORE_PATH)
+        ingested, _ = store.ingest_dir(data_dir)
+        print(f"论文汇总库: {store.path} (新导入 {ingested} 个文件，共 {store.stats()['papers']} 篇论文)", file=sys.stderr)
+
+    reused = set()
+    if not args.no_reuse:
+        reused, previous_count = reuse_enhancements(data, data_dir, language, fields, store)
+        print(f"跨日复用: 找到 {previous_count} 篇历史增强记录，复用 {len(reused)} 篇，"
+              f"节省了约 {len(reused)} 次API调用。", file=sys.stderr)
+        for idx in sorted(reused):
+            journal.write(data[idx])
+    pending = [d for idx, d in enumerate(data) if idx not in reused]
+    del data
+
     prompt_template = ChatPromptTemplate.from_messages([
         ("system", system_prompt_template),
         ("human", template_content)
     ])
+    batch_prompt_template = ChatPromptTemplate.from_messages([
+        ("system", system_prompt_template),
+        ("human", batch_template_content)
+    ])
 
-    # 预先初始化所有需要的调用链
+    # 预先初始化所有需要的调用链；调度器为每个 (密钥, 模型) 组合维护独立的令牌桶和健康状态
+    scheduler = KeyScheduler(cascade_plan, limits_for)
     model_chains = {}
+    batch_chains = {}
     for task in cascade_plan:
         key = (task["api_key"], task["model_name"])
         if key in model_chains: continue
@@ -122,86 +440,66 @@ def main():
             structured_llm = llm.with_structured_output(Structure)
             chain = prompt_template | structured_llm
             model_chains[key] = chain
+            if args.batch_size > 1:
+                batch_chains[key] = batch_prompt_template | llm.with_structured_output(BatchStructure)
             print(f"模型已为<{task['key_name']}>成功设置: {task['model_name']}", file=sys.stderr)
         except Exception as e:
             model_chains[key] = None
             print(f"警告：无法为<{task['key_name']}>初始化模型 {task['model_name']}。错误：{e}", file=sys.stderr)
 
-    enhanced_data = []
-    total_failures = 0
-    
-    current_task_index = 0
+    cache = None
+    prompt_fp = None
+    if not args.no_cache:
+        cache = ResponseCache(args.cache, args.cache_max_age_days, args.cache_max_size_mb)
+        prompt_fp = ResponseCache.prompt_fingerprint(
+            [template_content, batch_template_content], system_prompt_template, language, Structure.model_json_schema()
+        )
+        print(f"LLM响应缓存: {args.cache} ({cache.stats()['entries']} 条)", file=sys.stderr)
 
-    for idx, d in enumerate(data):
-        print(f"\n正在处理 {idx + 1}/{len(data)}: {d['id']}", file=sys.stderr)
-        final_result = None
-        
-        # 保存当前任务索引，以便在论文级别进行重置
-        paper_start_task_index = current_task_index
-        
-        while paper_start_task_index < len(cascade_plan):
-            task = cascade_plan[paper_start_task_index]
-            key = (task["api_key"], task["model_name"])
-            chain = model_chains.get(key)
-
-            if not chain:
-                print(f"  ! 跳过已失败的任务: <{task['key_name']}> - {task['model_name']}", file=sys.stderr)
-                paper_start_task_index += 1
-                # 更新全局任务索引
-                current_task_index = paper_start_task_index
-                continue
-
-            for attempt in range(args.retries):
-                print(f"  使用: <{task['key_name']}> - {task['model_name']} (尝试 {attempt + 1}/{args.retries})", file=sys.stderr)
-                try:
-                    response_object = chain.invoke({
-                        "title": d['title'],
-                        "content": d['summary'],
-                        "language": language
-                    })
-                    if response_object and is_response_valid(response_object):
-                        final_result = response_object.model_dump()
-                        print("  > 尝试成功", file=sys.stderr)
-                        break 
-
-                # **核心升级**: 将 NotFound 和 ResourceExhausted 视为同类永久性错误
-                except (google_exceptions.ResourceExhausted, google_exceptions.NotFound) as e:
-                    error_type = "配额耗尽" if isinstance(e, google_exceptions.ResourceExhausted) else "模型未找到"
-                    print(f"  ! {error_type}: <{task['key_name']}> - {task['model_name']}", file=sys.stderr)
-                    # 永久切换到下一个任务
-                    paper_start_task_index += 1
-                    # 更新全局任务索引
-                    current_task_index = paper_start_task_index
-                    # 跳出重试循环，让外层while循环决定下一步
-                    break 
-
-                except Exception as e:
-                    print(f"  > 发生瞬时性错误: {e}", file=sys.stderr)
-                    if attempt < args.retries - 1:
-                        time.sleep(args.timeout)
-            
-            if final_result:
-                break
-        
+    failed_ids = []
+
+    def on_result(d, final_result):
         if not final_result:
-            total_failures += 1
+            failed_ids.append(d['id'])
             print(f"  处理 {d['id']} 失败。所有可用任务均已尝试失败。", file=sys.stderr)
-            error_message = "错误：AI分析失败。"
-            d['AI'] = {field: error_message for field in Structure.model_fields.keys()}
+            d['AI'] = {field: FAILURE_MESSAGE for field in fields}
         else:
             d['AI'] = final_result
-            
-        enhanced_data.append(d)
-        # [核心改造] 使用可配置的延迟，确保不超过API频率限制
-        print(f"  ...等待 {api_call_interval} 秒...", file=sys.stderr)
-        time.sleep(api_call_interval)
+        journal.write(d)
 
-    output_filename = args.data.replace('.jsonl', f'_AI_enhanced_{language}.jsonl')
-    with open(output_filename, "w", encoding="utf-8") as f:
-        for d_item in enhanced_data:
-            f.write(json.dumps(d_item, ensure_ascii=False) + "\n")
+    ctx = EnhanceContext(cascade_plan, model_chains, batch_chains, scheduler, language, args, cache, prompt_fp)
+    if args.batch_size > 1:
+        # 以计划中输出上限最小的模型为准，保证降级到任何模型时批次都放得下
+        token_limit = min(output_token_limit(task["model_name"]) for task in cascade_plan)
+        batches = make_batches(pending, args.batch_size, token_limit)
+        print(f"批量模式: {len(pending)} 篇论文分为 {len(batches)} 个请求 (每批最多 {args.batch_size} 篇)", file=sys.stderr)
+    else:
+        batches = [[d] for d in pending]
+    del pending
+
+    print(f"并发上限: {args.concurrency}", file=sys.stderr)
+    try:
+        asyncio.run(run_enhancement(batches, ctx, on_result))
+    except BaseException:
+        journal.close()
+        print(f"\n处理中断。已完成的结果保存在 {journal.path}，可使用 --resume 继续。", file=sys.stderr)
+        raise
+    finally:
+        print("--- 调度统计 ---", file=sys.stderr)
+        for line in scheduler.summary():
+            print(f"  {line}", file=sys.stderr)
+        if cache:
+            stats = cache.stats()
+            print(f"缓存统计: 命中 {stats['hits']} 次，未命中 {stats['misses']} 次，当前共 {stats['entries']} 条。", file=sys.stderr)
+            cache.close()
 
-    print(f"\n处理完成。成功处理: {len(enhanced_data) - total_failures}/{len(enhanced_data)}。输出文件: {output_filename}")
+    lines = []
+    total = journal.finalize(ordered_ids, lines)
+    print(f"\n处理完成。成功处理: {total - len(failed_ids)}/{total}。输出文件: {output_filename}")
+    if store:
+        store.ingest_file(output_filename)
+        store.close()
+    return [json.loads(line) for line in lines]
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,105 @@
+import json
+import os
+
+
+class EnhancementJournal:
+    """
+    增强结果的追加式日志 (append-only journal)。
+    每完成一篇论文就立即追加一行 JSON，并每 fsync_every 条强制刷盘一次，
+    进程崩溃或被取消时最多丢失最后一批尚未刷盘的记录。
+    运行结束后按输入顺序重排为最终输出文件，并删除日志。
+    """
+
+    def __init__(self, output_path, fsync_every=20):
+        self.output_path = output_path
+        self.path = output_path + ".journal"
+        self.fsync_every = max(1, fsync_every)
+        self.offsets = {}
+        self.completed = set()
+        self._pending_sync = 0
+        self._file = None
+
+    def open(self, resume=False, is_complete=None):
+        """
+        打开日志。resume 为 True 时读取已有日志 (以及上次已完成的输出文件)，
+        is_complete(record) 为 True 的论文会记入 completed，无需再次处理。
+        """
+        if not resume and os.path.exists(self.path):
+            os.remove(self.path)
+        if resume and not os.path.exists(self.path) and os.path.exists(self.output_path):
+            # 上一次运行已生成完整输出，将其作为日志的起点
+            with open(self.output_path, "rb") as src, open(self.path, "wb") as dst:
+                for line in src:
+                    dst.write(line)
+        if resume and os.path.exists(self.path):
+            self._load(is_complete)
+        self._file = open(self.path, "ab")
+        return self.completed
+
+    def _load(self, is_complete):
+        valid_end = 0
+        with open(self.path, "rb") as f:
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line:
+                    break
+                if not line.endswith(b"\n"):
+                    # 崩溃时写了一半的最后一行
+                    break
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                valid_end = f.tell()
+                self.offsets[record["id"]] = offset
+                if is_complete is None or is_complete(record):
+                    self.completed.add(record["id"])
+                else:
+                    self.completed.discard(record["id"])
+        # 截掉不完整的尾部，保证后续追加的记录从新的一行开始
+        with open(self.path, "r+b") as f:
+            f.truncate(valid_end)
+
+    def write(self, record):
+        self.offsets[record["id"]] = self._file.tell()
+        self._file.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        self._pending_sync += 1
+        if self._pending_sync >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending_sync = 0
+
+    def finalize(self, ordered_ids, lines=None):
+        """
+        按 ordered_ids 的顺序将日志重排为最终输出文件，原子替换后删除日志。返回写入的记录数。
+        lines 为列表时同时把写入的各行按顺序追加到其中。
+        """
+        self.sync()
+        self._file.close()
+        tmp_path = self.output_path + ".tmp"
+        written = 0
+        with open(self.path, "rb") as src, open(tmp_path, "wb") as dst:
+            for paper_id in ordered_ids:
+                offset = self.offsets.get(paper_id)
+                if offset is None:
+                    continue
+                src.seek(offset)
+                line = src.readline()
+                dst.write(line)
+                if lines is not None:
+                    lines.append(line)
+                written += 1
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_path, self.output_path)
+        os.remove(self.path)
+        return written
+
+    def close(self):
+        if self._file and not self._file.closed:
+            self.sync()
+            self._file.close()
@@ -0,0 +1,68 @@
+import os
+import time
+
+
+class TokenBucket:
+    """
+    单个 (密钥, 模型) 组合的令牌桶。
+    同时限制每分钟请求数 (RPM) 和每日请求数 (RPD)，rpd 为 None 时不限制每日请求数。
+    """
+
+    def __init__(self, rpm, rpd=None, burst=1):
+        self.rpm = max(rpm, 0.01)
+        self.rpd = rpd
+        # 桶容量默认为1，即严格按照 60/rpm 秒的间隔放行，避免在同一分钟窗口内突发超限
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.used_today = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rpm / 60.0)
+        self.updated_at = now
+
+    @property
+    def exhausted(self):
+        """当日配额是否已用完。"""
+        return self.rpd is not None and self.used_today >= self.rpd
+
+    def wait_time(self):
+        """距离下一个令牌可用还需等待的秒数 (0 表示立即可用)。"""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) * 60.0 / self.rpm
+
+    def try_acquire(self):
+        """尝试立即取得一个令牌，成功返回 True。"""
+        if self.exhausted or self.wait_time() > 0:
+            return False
+        self.tokens -= 1
+        self.used_today += 1
+        return True
+
+
+def parse_rate_limits(default_rpm, default_rpd=None):
+    """
+    解析各模型的速率限制。
+    环境变量 MODEL_RATE_LIMITS 的格式为 "模型名=RPM/RPD,模型名=RPM"，未列出的模型使用默认值。
+    返回一个函数: model_name -> (rpm, rpd)。
+    """
+    overrides = {}
+    for entry in os.environ.get("MODEL_RATE_LIMITS", "").split(','):
+        if '=' not in entry:
+            continue
+        name, limits = entry.split('=', 1)
+        rpm_str, _, rpd_str = limits.partition('/')
+        try:
+            rpm = float(rpm_str) if rpm_str.strip() else default_rpm
+            rpd = int(rpd_str) if rpd_str.strip() else default_rpd
+        except ValueError:
+            continue
+        overrides[name.strip()] = (rpm, rpd)
+
+    def limits_for(model_name):
+        return overrides.get(model_name, (default_rpm, default_rpd))
+
+    return limits_for
@@ -0,0 +1,84 @@
+import re
+
+from ai.structure import Structure
+from archive import list_sources, read_source
+
+VERSION_RE = re.compile(r'v(\d+)$')
+FAILURE_MESSAGE = "错误：AI分析失败。"
+# 完整的 AI 结果应有的字段：缺少任何一个字段或含有失败占位文本的结果不算完整
+AI_FIELDS = tuple(Structure.model_fields)
+
+
+def is_enhancement_valid(ai, fields):
+    """检查历史增强结果是否完整：每个字段都是非空字符串，且不是失败占位文本。"""
+    if not isinstance(ai, dict):
+        return False
+    for field in fields:
+        value = ai.get(field)
+        if not isinstance(value, str) or not value.strip() or value == FAILURE_MESSAGE:
+            return False
+    return True
+
+
+def _version(paper):
+    for key in ("pdf_url", "url"):
+        match = VERSION_RE.search(paper.get(key) or "")
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def is_same_version(paper, previous):
+    """
+    判断论文自上次增强以来是否未被更新。
+    优先比较arXiv的 updated 日期；缺失时比较链接中的版本号；都缺失时比较摘要原文。
+    """
+    if paper.get("updated") and previous.get("updated"):
+        return paper["updated"] == previous["updated"]
+    version, previous_version = _version(paper), _version(previous)
+    if version is not None and previous_version is not None:
+        return version == previous_version
+    return paper.get("title") == previous.get("title") and paper.get("summary") == previous.get("summary")
+
+
+def find_previous_enhancements(data_dir, language, wanted_ids, fields):
+    """
+    在 data_dir 下所有 *_AI_enhanced_{language}.jsonl 文件 (包括已归档月份中的，见 archive.py) 中查找 wanted_ids 的历史增强结果。
+    文件按日期从新到旧扫描，只解析ID在剩余集合中的行，找齐所有ID后提前结束。返回 {id: 历史记录}。
+    """
+    remaining = set(wanted_ids)
+    found = {}
+    suffix = f"_AI_enhanced_{language}.jsonl"
+    sources = [(name, path) for name, path in list_sources(data_dir).items() if name.endswith(suffix)]
+    for name, path in reversed(sources):
+        if not remaining:
+            break
+        for record in read_source(name, path, remaining):
+            if record is not None and is_enhancement_valid(record.get("AI"), fields):
+                found[record["id"]] = record
+                remaining.discard(record["id"])
+    return found
+
+
+def reuse_enhancements(data, data_dir, language, fields, store=None):
+    """
+    复用阶段：为已在往日增强过且版本未变的论文直接拷贝 AI 结果。
+    提供了论文汇总库 store (见 paper_store.py) 时直接按ID查询，否则扫描 data_dir 下的历史文件。
+    返回 (已复用的论文索引集合, 找到的历史记录数)。
+    """
+    wanted_ids = [d["id"] for d in data]
+    if store is not None:
+        previous = {
+            paper_id: record
+            for paper_id, record in store.enhancements(wanted_ids, language).items()
+            if is_enhancement_valid(record.get("AI"), fields)
+        }
+    else:
+        previous = find_previous_enhancements(data_dir, language, wanted_ids, fields)
+    reused = set()
+    for idx, d in enumerate(data):
+        record = previous.get(d["id"])
+        if record and is_same_version(d, record):
+            d["AI"] = {field: record["AI"][field] for field in fields}
+            reused.add(idx)
+    return reused, len(previous)
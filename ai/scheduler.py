@@ -0,0 +1,140 @@
+import asyncio
+import random
+import re
+import time
+
+from rate_limiter import TokenBucket
+
+# Gemini 的配额错误中携带的重试提示，例如 "retry_delay { seconds: 37 }" 或 "retryDelay": "37s"
+RETRY_DELAY_RE = re.compile(r'retry_?delay\W+(?:seconds:\s*)?(\d+(?:\.\d+)?)', re.IGNORECASE)
+# 每日配额耗尽时错误信息中的配额ID包含 "PerDay"
+PER_DAY_RE = re.compile(r'PerDay', re.IGNORECASE)
+
+
+def retry_after_hint(error):
+    """从异常中解析服务端建议的重试等待秒数，没有提示时返回 None。"""
+    match = RETRY_DELAY_RE.search(str(error))
+    return float(match.group(1)) if match else None
+
+
+def backoff_delay(attempt, base, cap):
+    """带完全抖动 (full jitter) 的指数退避：在 [0, min(cap, base * 2^(attempt-1))] 内随机取值。"""
+    return random.uniform(0, min(cap, base * 2 ** max(attempt - 1, 0)))
+
+
+class SlotState:
+    """单个 (密钥, 模型) 调用槽位的健康状态。"""
+
+    def __init__(self, task, bucket):
+        self.task = task
+        self.bucket = bucket
+        self.cooldown_until = 0.0
+        self.quota_errors = 0  # 连续配额错误次数，成功一次即清零
+        self.successes = 0
+        self.failures = 0
+        self.latency = None  # 成功请求耗时的指数滑动平均 (秒)
+        self.dead_reason = None  # 模型不存在、初始化失败或当日配额耗尽
+
+    @property
+    def success_rate(self):
+        # 加一平滑，避免新槽位因样本过少而被误判
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+    def available(self, now):
+        return self.dead_reason is None and not self.bucket.exhausted and now >= self.cooldown_until
+
+
+class KeyScheduler:
+    """
+    自适应的密钥/模型调度器。
+    为每个 (密钥, 模型) 记录配额状态、冷却截止时间、成功率和延迟；
+    遇到限流时按服务端提示或指数退避进入冷却，冷却结束后自动回到可用池，
+    每次总是选择优先级最高且健康的槽位。
+    """
+
+    def __init__(self, cascade_plan, limits_for, base_cooldown=60.0, max_cooldown=3600.0, max_quota_errors=6):
+        self.cascade_plan = cascade_plan
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.max_quota_errors = max_quota_errors
+        self.slots = []
+        buckets = {}
+        for task in cascade_plan:
+            key = (task["api_key"], task["model_name"])
+            if key not in buckets:
+                rpm, rpd = limits_for(task["model_name"])
+                buckets[key] = TokenBucket(rpm, rpd)
+            self.slots.append(SlotState(task, buckets[key]))
+
+    def disable(self, index, reason):
+        self.slots[index].dead_reason = reason
+
+    async def acquire(self, tried=()):
+        """
+        选择一个槽位并占用一个令牌。
+        在优先级最高、当前健康的模型层级内选择最快拿到令牌的槽位 (同等情况下成功率高、延迟低者优先)；
+        所有槽位都在冷却时等待最早结束的冷却。返回槽位索引，没有任何可用槽位时返回 None。
+        """
+        while True:
+            now = time.monotonic()
+            alive = [
+                i for i, slot in enumerate(self.slots)
+                if i not in tried and slot.dead_reason is None and not slot.bucket.exhausted
+            ]
+            if not alive:
+                return None
+            healthy = [i for i in alive if self.slots[i].available(now)]
+            if not healthy:
+                await asyncio.sleep(min(self.slots[i].cooldown_until for i in alive) - now)
+                continue
+            tier_model = self.slots[healthy[0]].task["model_name"]
+            tier = [i for i in healthy if self.slots[i].task["model_name"] == tier_model]
+            wait, _, _, index = min(
+                (self.slots[i].bucket.wait_time(), -self.slots[i].success_rate, self.slots[i].latency or 0, i)
+                for i in tier
+            )
+            if wait <= 0 and self.slots[index].bucket.try_acquire():
+                return index
+            await asyncio.sleep(wait)
+
+    def report_success(self, index, latency):
+        slot = self.slots[index]
+        slot.successes += 1
+        slot.quota_errors = 0
+        slot.latency = latency if slot.latency is None else 0.8 * slot.latency + 0.2 * latency
+
+    def report_failure(self, index):
+        self.slots[index].failures += 1
+
+    def report_quota_error(self, index, error):
+        """
+        处理限流错误，返回冷却秒数。
+        每日配额耗尽或连续多次限流时，该槽位在本次运行中不再使用。
+        """
+        slot = self.slots[index]
+        slot.failures += 1
+        slot.quota_errors += 1
+        if PER_DAY_RE.search(str(error)) or slot.quota_errors >= self.max_quota_errors:
+            slot.dead_reason = "当日配额耗尽"
+            return None
+        hint = retry_after_hint(error)
+        if hint is not None:
+            cooldown = hint
+        else:
+            cooldown = min(self.max_cooldown, self.base_cooldown * 2 ** (slot.quota_errors - 1))
+        cooldown *= random.uniform(1.0, 1.2)
+        slot.cooldown_until = max(slot.cooldown_until, time.monotonic() + cooldown)
+        return cooldown
+
+    def summary(self):
+        """返回每个槽位的统计信息，用于运行结束时输出。"""
+        lines = []
+        for slot in self.slots:
+            task = slot.task
+            status = slot.dead_reason or "可用"
+            latency = f"{slot.latency:.1f}s" if slot.latency is not None else "-"
+            lines.append(
+                f"<{task['key_name']}> - {task['model_name']}: 成功 {slot.successes}，失败 {slot.failures}，"
+                f"平均延迟 {latency}，今日请求 {slot.bucket.used_today}，状态 {status}"
+            )
+        return lines
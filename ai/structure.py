@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 class Structure(BaseModel):
     """
@@ -15,4 +15,17 @@ class Structure(BaseModel):
     summary: Optional[str] = Field(default=None, description="generate a new, concise summary of the paper based on its abstract")
     keywords: Optional[str] = Field(default=None, description="Extract 3 to 5 keywords from the abstract, separated by commas.")
     # **新增**: AI点评字段
-    comments: Optional[str] = Field(default=None, description="add some insightful comments about this paper, focusing on its innovation, importance, or limitations")
\ No newline at end of file
+    comments: Optional[str] = Field(default=None, description="add some insightful comments about this paper, focusing on its innovation, importance, or limitations")
+
+class PaperStructure(Structure):
+    """
+    批量模式下单篇论文的结果，通过 id 与输入论文对应。
+    """
+    id: str = Field(description="The arXiv id of the paper, copied exactly from the input.")
+
+
+class BatchStructure(BaseModel):
+    """
+    批量模式的输出：一次请求中包含多篇论文的结构化结果。
+    """
+    papers: List[PaperStructure] = Field(default_factory=list, description="One entry for every input paper, in the same order as the input.")
@@ -0,0 +1,399 @@
+"""
+已经结束的月份的压缩列式归档。
+
+data/ 下的每日文件 (YYYY-MM-DD.jsonl 与 YYYY-MM-DD_AI_enhanced_<语言>.jsonl) 只增不减，且同一篇论文会在多天的文件中重复出现。
+compact 把一个月份的全部每日文件合并为一个 data/archive/YYYY-MM.zip 并删除这些文件；每日报告 (.md) 保留在原处，
+README 中的链接指向它们。
+
+归档是标准库 zipfile 读写的 zip 文件，每一列是一个单独压缩的成员，读取一列只解压这一列 (以及很小的行结构成员)：
+    manifest.json           {"format": "columnar-v2", "month": "2025-03", "rows": N, "languages": ["Chinese"],
+                             "shapes": {"record": [[键, ...], ...], "AI_Chinese": [[键, ...], ...], ...},
+                             "sources": {源文件名: [行号 或 [行号, 记录变体, AI 变体], ...]}}
+    shapes/<组>.json        每行的键集合在 shapes[组] 中的下标，没有这一组数据的行为 -1；它决定这一行有哪些列以及键的顺序
+    <组>/<字段>.json        这一组中某个字段的取值，只包含有这个字段的行，按行号顺序
+组 record 是论文的原始记录 (不含 AI 字段)，组 AI_<语言> 是该语言的 AI 增强结果，每篇论文只占一行 (按论文ID去重)：
+与 build_database.py 一致，保留 updated 最新的版本，相同时保留列表日期较晚的版本，再相同时以增强后的文件为准；
+各语言的 AI 结果优先取完整的结果 (失败或为空的结果不会取代完整的结果)，再按同样的规则取最新的一次。
+column 和 records 只读取这些去重后的行。
+
+同一篇论文在不同源文件中的记录不一定相同 (修订前后的版本、各次增强的结果、分类的变化)，
+与去重后的行不同的记录存入变体组 record_variant 与 AI_<语言>_variant (格式相同，按变体编号排列)。
+sources 按原顺序记录每个源文件的各条记录：与去重后的行相同时只记行号，否则记 [行号, 记录变体, AI 变体]，
+变体为 -1 表示与去重后的行相同，AI 变体为 -2 表示这条记录没有 AI 字段；
+记录变体中含有 AI 字段时它就是完整的原始记录。因此每个源文件都可以逐条、按原有的键顺序还原。
+
+list_sources 与 read_source 对每日文件和归档一视同仁，读取数据的脚本都通过它们访问源文件；
+已归档月份之后又出现的同名每日文件优先于归档中的版本，再次 compact 时合并进归档。
+    python archive.py compact [--before YYYY-MM] [--keep]
+    python archive.py column 2025-03 keywords --language Chinese
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import zipfile
+from datetime import date
+from functools import lru_cache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DATA_DIR = "data"
+ARCHIVE_DIR = "archive"
+FORMAT = "columnar-v2"
+MANIFEST = "manifest.json"
+RECORD_GROUP = "record"
+VARIANT_SUFFIX = "_variant"
+# sources 中的变体编号：-1 表示与去重后的行相同，-2 表示没有 AI 字段
+SAME, NO_AI = -1, -2
+SOURCE_RE = re.compile(r'(\d{4}-\d{2}-\d{2})(?:_AI_enhanced_(\w+))?\.jsonl$')
+# 每行 JSONL 都以 {"id": "..."} 开头，按ID筛选时用正则直接取出ID，只对需要的行做完整的 JSON 解析
+ID_PREFIX_RE = re.compile(r'^\{"id":\s*"([^"]+)"')
+
+
+def json_loads(data):
+    """
+    解析一行 JSON。安装了 orjson 时用它解析 (快数倍)，它拒绝的输入 (如孤立的代理项、NaN) 交给标准库，
+    因此两种后端得到相同的记录 (唯一的差别是超出 64 位的整数会被 orjson 解析为浮点数，论文数据中没有这样的数值)。
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+def ai_group(language):
+    return f"AI_{language}"
+
+
+def archive_path(data_dir, month):
+    return os.path.join(data_dir, ARCHIVE_DIR, f"{month}.zip")
+
+
+class MonthArchive:
+    """一个月份的归档。记录在第一次需要时整体解码并缓存，按列读取时只解压对应的成员。"""
+
+    def __init__(self, path):
+        self.path = path
+        manifest = json_loads(self._member(MANIFEST))
+        if manifest.get("format") != FORMAT:
+            raise ValueError(f"{path} 不是 {FORMAT} 格式的归档")
+        self.month = manifest["month"]
+        self.rows = manifest["rows"]
+        self.languages = manifest["languages"]
+        self.shapes = manifest["shapes"]
+        self.sources = manifest["sources"]
+        self._records = None
+        self._variants = None
+
+    def _member(self, name):
+        with zipfile.ZipFile(self.path) as zf:
+            return zf.read(name)
+
+    def _group(self, group, fields=None):
+        """返回这一组每行的字典 (没有数据的行为 None)；fields 限定只解压这些列。不存在的组返回 None。"""
+        shapes = self.shapes.get(group)
+        if shapes is None:
+            return None
+        fields = [field for field in dict.fromkeys(key for shape in shapes for key in shape) if fields is None or field in fields]
+        with zipfile.ZipFile(self.path) as zf:
+            shape_column = json_loads(zf.read(f"shapes/{group}.json"))
+            columns = {field: iter(json_loads(zf.read(f"{group}/{field}.json"))) for field in fields}
+        rows = []
+        for shape in shape_column:
+            if shape < 0:
+                rows.append(None)
+            else:
+                rows.append({key: next(columns[key]) for key in shapes[shape] if key in columns})
+        return rows
+
+    def column(self, field, language=None):
+        """读取一列，返回按行号排列的取值 (没有这个字段的行为 None)；language 给出时读取该语言的 AI 字段。"""
+        rows = self._group(ai_group(language) if language else RECORD_GROUP, {field})
+        if rows is None:
+            return [None] * self.rows
+        return [row.get(field) if row is not None else None for row in rows]
+
+    def records(self):
+        """全部去重后的行的 (原始记录, {语言: AI 结果})。"""
+        if self._records is None:
+            records = self._group(RECORD_GROUP)
+            languages = {language: self._group(ai_group(language)) or [None] * self.rows for language in self.languages}
+            self._records = [
+                (record, {language: rows[row] for language, rows in languages.items() if rows[row] is not None})
+                for row, record in enumerate(records)
+            ]
+        return self._records
+
+    def variants(self):
+        """(记录变体列表, {语言: AI 变体列表})。"""
+        if self._variants is None:
+            self._variants = (
+                self._group(RECORD_GROUP + VARIANT_SUFFIX) or [],
+                {language: self._group(ai_group(language) + VARIANT_SUFFIX) or [] for language in self.languages},
+            )
+        return self._variants
+
+    def read(self, name, ids=None):
+        """按原顺序逐条产出源文件 name 中的记录；ids 不为 None 时只产出ID在其中的记录。"""
+        entries = self.sources[name]
+        if ids is not None:
+            id_column = self.column("id")
+            entries = [entry for entry in entries if id_column[entry if isinstance(entry, int) else entry[0]] in ids]
+            if not entries:
+                return
+        language = SOURCE_RE.search(name).group(2)
+        records = self.records()
+        for entry in entries:
+            row, record_variant, ai_variant = (entry, SAME, SAME) if isinstance(entry, int) else entry
+            record, ai = records[row]
+            if record_variant != SAME:
+                record = self.variants()[0][record_variant]
+            if ai_variant == SAME:
+                ai = ai.get(language) if language else None
+            elif ai_variant == NO_AI:
+                ai = None
+            else:
+                ai = self.variants()[1][language][ai_variant]
+            record = dict(record)
+            if ai is not None:
+                record["AI"] = dict(ai)
+            yield record
+
+
+@lru_cache(maxsize=2)
+def _open_archive(path, size, mtime_ns):
+    return MonthArchive(path)
+
+
+def open_archive(path):
+    """打开归档；同一个进程中连续读取同一归档的多个源文件时复用已解码的记录。"""
+    stat = os.stat(path)
+    return _open_archive(path, stat.st_size, stat.st_mtime_ns)
+
+
+def list_sources(data_dir=DATA_DIR):
+    """返回 {源文件名: 所在文件的路径}，按文件名排序。已归档的源文件指向月份归档，同名的每日文件优先。"""
+    sources = {}
+    for path in sorted(glob.glob(os.path.join(data_dir, ARCHIVE_DIR, "*.zip"))):
+        for name in open_archive(path).sources:
+            sources[name] = path
+    for path in glob.glob(os.path.join(data_dir, "*.jsonl")):
+        if SOURCE_RE.fullmatch(os.path.basename(path)):
+            sources[os.path.basename(path)] = path
+    return dict(sorted(sources.items()))
+
+
+def read_source(name, path, ids=None):
+    """
+    按原顺序逐条产出源文件 name (位于 path，见 list_sources) 中的记录，每日文件中无法解析的行产出 None。
+    ids 不为 None 时只产出ID在其中的记录，每日文件按行首的ID筛选，不解析其余的行。
+    """
+    if path.endswith(".zip"):
+        yield from open_archive(path).read(name, ids)
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if ids is not None:
+                match = ID_PREFIX_RE.match(line)
+                if not match or match.group(1) not in ids:
+                    continue
+            try:
+                yield json_loads(line)
+            except json.JSONDecodeError:
+                yield None
+
+
+def encode_columns(zf, group, rows):
+    """把一组的行 (字典或 None) 按列写入归档，返回这一组的键集合列表。"""
+    shapes = {}
+    shape_column = []
+    columns = {}
+    for row in rows:
+        if row is None:
+            shape_column.append(-1)
+            continue
+        shape_column.append(shapes.setdefault(tuple(row), len(shapes)))
+        for key, value in row.items():
+            columns.setdefault(key, []).append(value)
+    write_member(zf, f"shapes/{group}.json", shape_column)
+    for field, values in columns.items():
+        write_member(zf, f"{group}/{field}.json", values)
+    return [list(shape) for shape in shapes]
+
+
+def write_member(zf, name, obj):
+    zf.writestr(name, json.dumps(obj, ensure_ascii=False, separators=(',', ':')))
+
+
+def _dump(obj):
+    """保留键顺序的序列化，用于判断两条记录是否完全相同。"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode("utf-8")
+
+
+def compact(data_dir, month, keep=False):
+    """
+    把 month 的全部源文件 (每日文件以及已有的归档) 合并写入月份归档，返回 (源文件数, 论文数, 变体数)。
+    写入后逐个源文件校验：从归档还原的记录必须与原文件的记录逐条完全相同 (包括键的顺序)，否则不替换归档。
+    源文件中有无法解析或缺少ID的行时抛出 RuntimeError，不写入归档、不删除任何文件。
+    """
+    from ai.reuse import AI_FIELDS, is_enhancement_valid
+
+    sources = {name: path for name, path in list_sources(data_dir).items() if name[:7] == month}
+    originals = {}
+    bad_lines = {}
+    for name, path in sources.items():
+        originals[name] = []
+        for record in read_source(name, path):
+            if not isinstance(record, dict) or not record.get("id"):
+                bad_lines[name] = bad_lines.get(name, 0) + 1
+            else:
+                originals[name].append(record)
+    if bad_lines:
+        details = ", ".join(f"{name} {count} 行" for name, count in bad_lines.items())
+        raise RuntimeError(f"月份 {month} 有无法解析或缺少ID的行，没有归档: {details}")
+
+    # 去重后的行：记录按 (updated, 列表日期, 是否增强) 取最新，AI 结果先取完整的，再按同样的键取最新
+    index = {}
+    records, keys = [], []
+    ai_rows, ai_keys = {}, {}
+    for name, originals_in_source in originals.items():
+        listed, language = SOURCE_RE.search(name).groups()
+        for original in originals_in_source:
+            record = dict(original)
+            ai = record.pop("AI", None)
+            row = index.setdefault(record["id"], len(index))
+            if row == len(records):
+                records.append(None)
+                keys.append(None)
+            key = (record.get("updated") or listed, listed, language is not None)
+            if keys[row] is None or key >= keys[row]:
+                records[row], keys[row] = record, key
+            if language is not None and isinstance(ai, dict):
+                ai_key = (is_enhancement_valid(ai, AI_FIELDS),) + key
+                rows, row_keys = ai_rows.setdefault(language, {}), ai_keys.setdefault(language, {})
+                if row not in row_keys or ai_key >= row_keys[row]:
+                    rows[row], row_keys[row] = ai, ai_key
+
+    # 各源文件的记录与去重后的行不同时存为变体；相同的变体只存一次
+    record_dumps = [_dump(record) for record in records]
+    ai_dumps = {language: {row: _dump(ai) for row, ai in rows.items()} for language, rows in ai_rows.items()}
+    record_variants, ai_variants = [], {}
+    variant_index = {}
+
+    def add_variant(rows, language, value):
+        key = (language, _dump(value))
+        if key not in variant_index:
+            variant_index[key] = len(rows)
+            rows.append(value)
+        return variant_index[key]
+
+    listings = {}
+    for name, originals_in_source in originals.items():
+        language = SOURCE_RE.search(name).group(2)
+        listing = listings[name] = []
+        for original in originals_in_source:
+            record = dict(original)
+            ai = record.pop("AI", None)
+            row = index[record["id"]]
+            record_variant = SAME if _dump(record) == record_dumps[row] else add_variant(record_variants, None, record)
+            restored = dict(record)
+            if language is None or ai is None:
+                ai_variant = SAME if language is None else NO_AI
+            elif isinstance(ai, dict):
+                restored["AI"] = ai
+                ai_variant = SAME if ai_dumps.get(language, {}).get(row) == _dump(ai) else \
+                    add_variant(ai_variants.setdefault(language, []), language, ai)
+            if _dump(restored) != _dump(original):
+                # AI 字段不在末尾、不是字典或出现在未增强的文件中：整条原始记录作为记录变体
+                record_variant = add_variant(record_variants, None, original)
+                ai_variant = SAME if language is None else NO_AI
+            listing.append(row if record_variant == SAME and ai_variant == SAME else [row, record_variant, ai_variant])
+
+    path = archive_path(data_dir, month)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    languages = sorted(set(ai_rows) | set(ai_variants))
+    with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
+        shapes = {RECORD_GROUP: encode_columns(zf, RECORD_GROUP, records)}
+        if record_variants:
+            shapes[RECORD_GROUP + VARIANT_SUFFIX] = encode_columns(zf, RECORD_GROUP + VARIANT_SUFFIX, record_variants)
+        for language in languages:
+            group = ai_group(language)
+            rows = ai_rows.get(language, {})
+            shapes[group] = encode_columns(zf, group, [rows.get(row) for row in range(len(records))])
+            if ai_variants.get(language):
+                shapes[group + VARIANT_SUFFIX] = encode_columns(zf, group + VARIANT_SUFFIX, ai_variants[language])
+        write_member(zf, MANIFEST, {
+            "format": FORMAT, "month": month, "rows": len(records), "languages": languages,
+            "shapes": shapes, "sources": listings,
+        })
+
+    archive = MonthArchive(tmp_path)
+    for name, originals_in_source in originals.items():
+        if [_dump(record) for record in archive.read(name)] != [_dump(record) for record in originals_in_source]:
+            os.remove(tmp_path)
+            raise RuntimeError(f"归档 {path} 无法还原源文件 {name}，没有归档")
+    os.replace(tmp_path, path)
+    if not keep:
+        for source_path in set(sources.values()):
+            if source_path != path:
+                os.remove(source_path)
+    return len(sources), len(records), len(record_variants) + sum(map(len, ai_variants.values()))
+
+
+def closed_months(data_dir, before):
+    """有未归档的每日文件、且早于 before (YYYY-MM) 的月份。"""
+    return sorted({
+        name[:7] for name, path in list_sources(data_dir).items()
+        if name[:7] < before and not path.endswith(".zip")
+    })
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="每日 JSONL 文件的月份归档")
+    parser.add_argument("--data", default=DATA_DIR, help="数据目录")
+    sub = parser.add_subparsers(dest="command", required=True)
+    compact_parser = sub.add_parser("compact", help="把已经结束的月份合并为压缩的列式归档")
+    compact_parser.add_argument("--before", default=date.today().strftime("%Y-%m"), help="归档早于这个月份 (YYYY-MM) 的数据，默认为当前月份")
+    compact_parser.add_argument("--keep", action="store_true", help="保留已归档的每日文件")
+    column_parser = sub.add_parser("column", help="输出一个月份中某一列的取值")
+    column_parser.add_argument("month")
+    column_parser.add_argument("field")
+    column_parser.add_argument("--language", help="读取该语言的 AI 字段")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "compact":
+        months = closed_months(args.data, args.before)
+        if not months:
+            print("没有需要归档的月份。")
+        failed = False
+        for month in months:
+            try:
+                source_count, paper_count, variant_count = compact(args.data, month, args.keep)
+            except RuntimeError as e:
+                print(f"警告: {e}", file=sys.stderr)
+                failed = True
+                continue
+            print(f"归档月份 {month}: {source_count} 个源文件，{paper_count} 篇论文，{variant_count} 个变体 -> {archive_path(args.data, month)}")
+        if failed:
+            sys.exit(1)
+    else:
+        archive = open_archive(archive_path(args.data, args.month))
+        for paper_id, value in zip(archive.column("id"), archive.column(args.field, args.language)):
+            if value is not None:
+                print(f"{paper_id}\t{json.dumps(value, ensure_ascii=False)}")
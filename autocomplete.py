@@ -0,0 +1,105 @@
+"""
+搜索框自动补全用的词典，由 build_database.py 与搜索索引一起生成，docs/postings.js 中的 TermDictionary 在浏览器中查询。
+
+term_blocks.json 是块清单，块按词项排序、首尾相接：
+    {"format": "front-coded", "k": 10, "termCount": N,
+     "blocks": [{"file": "terms/terms-0000.json", "first": 首词项, "last": 末词项}]}
+每个块 terms/terms-NNNN.json：
+    {"terms": [共享前缀长度, 后缀, 文档频率, ...], "top": {前缀: [词项, 文档频率, ...]}}
+    terms 是前缀压缩 (front coding) 的词项列表，每三个元素一组：与前一个词项共享的前缀长度
+    (按 UTF-16 码元计，与 JavaScript 字符串一致；块内第一个词项为 0)、剩余的后缀、文档频率。
+    词项范围跨越块边界的前缀 (如 "co") 在范围开始的那个块中预先算好按文档频率排序的前 k 个补全，放在 top 中。
+
+查询前缀 p 时，在块清单中二分找到第一个末词项 >= p 的块并下载：p 在 top 中则直接返回，
+否则 p 的词项范围完全落在这个块中，解码后取文档频率最高的 k 个。
+    python autocomplete.py diff
+"""
+import bisect
+import heapq
+import json
+import os
+import sys
+
+FORMAT = "front-coded"
+BLOCK_TERMS = 1024
+TOP_K = 10
+
+
+def _utf16_len(text):
+    return len(text.encode('utf-16-le')) // 2
+
+
+def _utf16_prefix(text, length):
+    return text.encode('utf-16-le')[:2 * length].decode('utf-16-le')
+
+
+def common_prefix(a, b):
+    return os.path.commonprefix([a, b])
+
+
+def front_code(terms):
+    """[(词项, 文档频率)] -> [共享前缀长度, 后缀, 文档频率, ...]"""
+    coded = []
+    previous = ""
+    for term, df in terms:
+        shared = common_prefix(previous, term)
+        coded.extend((_utf16_len(shared), term[len(shared):], df))
+        previous = term
+    return coded
+
+
+def front_decode(coded):
+    """front_code 的逆过程。"""
+    terms = []
+    previous = ""
+    for i in range(0, len(coded), 3):
+        shared, suffix, df = coded[i:i + 3]
+        previous = _utf16_prefix(previous, shared) + suffix
+        terms.append((previous, df))
+    return terms
+
+
+def top_completions(terms, prefix, k=TOP_K):
+    """在按词项排序的 [(词项, 文档频率)] 中取以 prefix 开头、文档频率最高的 k 个 (频率相同时按词项排序)。"""
+    start = bisect.bisect_left(terms, (prefix,))
+    end = bisect.bisect_left(terms, (prefix + "\uffff",), lo=start)
+    return heapq.nsmallest(k, terms[start:end], key=lambda item: (-item[1], item[0]))
+
+
+def build_blocks(vocabulary, block_terms=BLOCK_TERMS, k=TOP_K):
+    """vocabulary 是按词项排序的 [(词项, 文档频率)]；逐块返回 (首词项, 末词项, 块数据)。"""
+    blocks = [vocabulary[i:i + block_terms] for i in range(0, len(vocabulary), block_terms)]
+    for i, block in enumerate(blocks):
+        top = {}
+        if i + 1 < len(blocks):
+            # 同时是本块末词项与下一块首词项前缀的那些前缀，其范围跨越了块边界；
+            # 已经是上一块末词项前缀的，范围从更早的块开始，由那个块负责
+            spanning = common_prefix(block[-1][0], blocks[i + 1][0][0])
+            started = common_prefix(blocks[i - 1][-1][0], block[0][0]) if i else ""
+            for n in range(1, len(spanning) + 1):
+                prefix = spanning[:n]
+                if not started.startswith(prefix):
+                    top[prefix] = [value for item in top_completions(vocabulary, prefix, k) for value in item]
+        yield block[0][0], block[-1][0], {"terms": front_code(block), "top": top}
+
+
+def complete(data_dir, prefix, k=TOP_K):
+    """用构建出的词典补全 prefix，返回 [(词项, 文档频率)] (浏览器端 TermDictionary.complete 的 Python 版本)。"""
+    with open(os.path.join(data_dir, "term_blocks.json"), 'r', encoding='utf-8') as f:
+        blocks = json.load(f)["blocks"]
+    index = bisect.bisect_left([block["last"] for block in blocks], prefix)
+    if not prefix or index == len(blocks):
+        return []
+    with open(os.path.join(data_dir, blocks[index]["file"]), 'r', encoding='utf-8') as f:
+        block = json.load(f)
+    if prefix in block["top"]:
+        top = block["top"][prefix]
+        return [(top[i], top[i + 1]) for i in range(0, len(top), 2)][:k]
+    return top_completions(front_decode(block["terms"]), prefix, k)
+
+
+if __name__ == "__main__":
+    from build_database import OUTPUT_DIR
+
+    for term, df in complete(OUTPUT_DIR, sys.argv[1].lower(), int(sys.argv[2]) if len(sys.argv) > 2 else TOP_K):
+        print(f"{term}\t{df}")
@@ -1,163 +1,762 @@
-import os
-import glob
-import json
-import re
-from collections import defaultdict
-
-# 定义一个简单的英文停用词列表，用于构建搜索索引时忽略这些常见词
-STOP_WORDS = set([
-    "a", "an", "the", "and", "or", "in", "on", "of", "for", "to", "with",
-    "is", "are", "was", "were", "it", "its", "i", "you", "he", "she", "we", "they",
-    "as", "at", "by", "from", "that", "this", "which", "who", "what", "where",
-    "when", "why", "how", "not", "no", "but", "if", "so", "then", "just", "very"
-])
-
-def build_database_from_jsonl():
-    """
-    构建数据库的主函数。
-    它直接从 'data' 目录下的 *_AI_enhanced_Chinese.jsonl 文件中读取结构化数据，然后生成：
-    1. 按月份分片的数据文件 (database-YYYY-MM.json)
-    2. 一个清单文件 (index.json)
-    3. 一个专用的搜索索引文件 (search_index.json)
-    4. 一个全新的分类索引文件 (category_index.json)
-    """
-    monthly_data = defaultdict(list)
-    search_index = defaultdict(set)
-    category_index = defaultdict(set) # 新增：初始化分类索引
-    total_paper_count = 0
-    skipped_paper_count = 0
-
-    output_dir = "docs/data"
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-        print(f"创建目录: {output_dir}")
-
-    jsonl_files = glob.glob("data/*_AI_enhanced_Chinese.jsonl")
-    if not jsonl_files:
-        print("错误: 在 'data' 目录下没有找到任何 '_AI_enhanced_Chinese.jsonl' 文件。")
-        return
-
-    print(f"找到 {len(jsonl_files)} 个 .jsonl 数据源文件。开始处理...")
-
-    for jsonl_file in jsonl_files:
-        base_name = os.path.basename(jsonl_file)
-        date_from_filename_match = re.match(r'(\d{4}-\d{2}-\d{2})', base_name)
-        if not date_from_filename_match:
-            print(f"警告: 无法从文件名 {base_name} 中提取日期，已跳过。")
-            continue
-        file_date = date_from_filename_match.group(1)
-
-        with open(jsonl_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                try:
-                    raw_data = json.loads(line)
-
-                    # 核心验证逻辑：只要求论文有ID
-                    paper_id = raw_data.get("id")
-                    if not paper_id:
-                        skipped_paper_count += 1
-                        continue
-
-                    ai_enhanced_info = raw_data.get("AI", {})
-                    
-                    # 关键修正：正确处理keywords字段，将其从字符串分割为数组
-                    keywords_str = ai_enhanced_info.get("keywords", "")
-                    keywords_list = []
-                    if keywords_str and isinstance(keywords_str, str):
-                        # 分割字符串并去除每个关键词两端的空格
-                        keywords_list = [kw.strip() for kw in keywords_str.split(',') if kw.strip()]
-
-                    # --- 全面、安全地获取所有数据 ---
-                    paper_data = {
-                        "id": paper_id,
-                        "title": raw_data.get("title", "无标题"),
-                        # "date": file_date,
-                        "date": raw_data.get("date", file_date), # 使用文件日期作为默认值
-                        "url": raw_data.get("abs", "#"),
-                        "pdf_url": raw_data.get("pdf", "#"), # 直接获取PDF链接
-                        "authors": ", ".join(raw_data.get("authors", [])),
-                        "abstract": raw_data.get("summary", ""),
-                        "comment": raw_data.get("comment", ""),
-                        "categories": raw_data.get("categories", []),
-                        "updated": raw_data.get("updated", file_date), # 使用文件日期作为默认值
-                        
-                        # 从AI对象中提取所有丰富信息，并修正字段名
-                        "zh_title": ai_enhanced_info.get("title_translation"),
-                        "translation": ai_enhanced_info.get("translation"), # 摘要翻译
-                        "keywords": keywords_list, # 使用处理后的数组
-                        "tldr": ai_enhanced_info.get("tldr"),
-                        "comments": ai_enhanced_info.get("comments"), # AI点评
-                        "motivation": ai_enhanced_info.get("motivation"),
-                        "method": ai_enhanced_info.get("method"),
-                        "results": ai_enhanced_info.get("result"), # 研究结果
-                        "conclusion": ai_enhanced_info.get("conclusion") # 兼容result字段
-                    }
-                    
-                    year_month = file_date[:7]
-                    monthly_data[year_month].append(paper_data)
-                    total_paper_count += 1
-
-                    # --- 构建搜索索引 ---
-                    text_to_index = (paper_data.get("title", "") + " " + paper_data.get("abstract", "")).lower()
-                    tokens = re.findall(r'\b[a-z]{3,}\b', text_to_index)
-                    for token in tokens:
-                        if token not in STOP_WORDS:
-                            search_index[token].add(paper_id)
-                    
-                    if paper_data.get("keywords"):
-                        for keyword in paper_data.get("keywords"):
-                            if keyword:
-                                search_index[keyword.lower()].add(paper_id)
-
-                    # 新增：构建分类索引
-                    if paper_data.get("categories"):
-                        for category in paper_data.get("categories"):
-                            category_index[category].add(paper_id)
-
-                except (json.JSONDecodeError, AttributeError):
-                    skipped_paper_count += 1
-                    continue
-
-    if total_paper_count > 0:
-        print(f"处理完成 {total_paper_count} 篇论文。")
-        if skipped_paper_count > 0:
-            print(f"因缺少ID或格式错误，跳过了 {skipped_paper_count} 篇论文。")
-    else:
-        print("警告: 未能成功处理任何论文。")
-        return
-
-    # --- 开始写入文件 ---
-    for month, papers in monthly_data.items():
-        sorted_papers = sorted(papers, key=lambda p: p['date'], reverse=True)
-        month_file_path = os.path.join(output_dir, f"database-{month}.json")
-        with open(month_file_path, 'w', encoding='utf-8') as f:
-            json.dump(sorted_papers, f, indent=2, ensure_ascii=False)
-    print(f"成功写入 {len(monthly_data)} 个月度数据分片文件。")
-
-    available_months = sorted(monthly_data.keys(), reverse=True)
-    manifest = {"availableMonths": available_months, "totalPaperCount": total_paper_count}
-    manifest_file_path = os.path.join(output_dir, "index.json")
-    with open(manifest_file_path, 'w', encoding='utf-8') as f:
-        json.dump(manifest, f, indent=2, ensure_ascii=False)
-    print("成功写入清单文件 index.json。")
-
-    final_search_index = {token: list(ids) for token, ids in search_index.items()}
-    search_index_file_path = os.path.join(output_dir, "search_index.json")
-    with open(search_index_file_path, 'w', encoding='utf-8') as f:
-        json.dump(final_search_index, f, ensure_ascii=False)
-    print("成功写入搜索索引文件 search_index.json。")
-    
-    # 新增：写入分类索引文件
-    final_category_index = {category: list(ids) for category, ids in category_index.items()}
-    category_index_file_path = os.path.join(output_dir, "category_index.json")
-    with open(category_index_file_path, 'w', encoding='utf-8') as f:
-        json.dump(final_category_index, f, ensure_ascii=False)
-    print("成功写入分类索引文件 category_index.json。")
-    
-    old_db_path = "docs/database.json"
-    if os.path.exists(old_db_path):
-        os.remove(old_db_path)
-        print(f"已删除旧的数据文件: {old_db_path}")
-
-if __name__ == "__main__":
-    build_database_from_jsonl()
\ No newline at end of file
+import os
+import glob
+import json
+import hashlib
+import argparse
+import heapq
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from itertools import chain, groupby
+
+from archive import DATA_DIR, SOURCE_RE, json_loads, list_sources, read_source
+from autocomplete import FORMAT as TERMS_FORMAT, TOP_K as TERMS_TOP_K, build_blocks
+from postings import FORMAT as POSTINGS_FORMAT, SCORED_FORMAT, encode_postings, encode_scored_postings
+from publish import PUBLISH_DIR, publish
+from ranking import CJK_MAX_POSTINGS, CJK_STOP_BIGRAMS, FIELDS, field_scales, field_terms, is_cjk_bigram, term_impacts
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 增量构建缓存：记录每个源文件的指纹，以及每个月份的索引倒排表
+BUILD_CACHE_DIR = os.path.join(".cache", "build")
+MANIFEST_PATH = os.path.join(BUILD_CACHE_DIR, "manifest.json")
+# 构建产物先以固定文件名写入这里，再由 publish.py 发布到 docs/data
+OUTPUT_DIR = os.path.join(BUILD_CACHE_DIR, "site")
+PUBLISH_RECORD_PATH = os.path.join(BUILD_CACHE_DIR, "published.json")
+# 修改解析或索引逻辑后递增此版本号，使已有的构建缓存全部失效
+BUILD_VERSION = 8
+# 每个月份缓存的有序 run：docs 记录论文ID所在的月份、更新时间、列表日期和各字段长度，用于去重并分配整数文档ID；
+# search 记录各字段的词频，用于计算 BM25；category 对应 category_index.json
+POSTING_KINDS = ("docs", "search", "category")
+# 搜索索引分片：每个分片的目标体积 (编码后的倒排表字节数) 与存放目录
+SEARCH_SHARD_BYTES = 128 * 1024
+SEARCH_SHARD_DIR = "search"
+TERM_BLOCK_DIR = "terms"
+# 月份分片只保留列表视图需要的字段，其余的长文本字段按论文ID分桶写入详情文件，展开卡片时才加载
+LIST_FIELDS = ("id", "title", "zh_title", "authors", "date", "dates", "categories", "keywords", "tldr", "comment", "comments")
+DETAIL_DIR = "details"
+# 每个详情桶的目标体积，桶数取不小于 (当月详情总字节数 / 目标体积) 的 2 的幂
+DETAIL_BUCKET_BYTES = 256 * 1024
+# 网站使用的增强数据的语言
+LANGUAGE = "Chinese"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true", help="忽略构建缓存，重新处理所有数据文件")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="并行重建月份的进程数 (默认为 CPU 核数)")
+    return parser.parse_args()
+
+
+def json_line(obj):
+    """
+    把构建目录内部的 JSONL 缓存 (倒排表 run、月份论文记录) 的一行编码为 UTF-8 字节。
+    两种后端的输出格式略有不同，但读回的结果相同；orjson 无法编码的值 (如孤立的代理项) 交给标准库。
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj) + b"\n"
+        except orjson.JSONEncodeError:
+            pass
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode('utf-8')
+
+
+def normalize_paper(raw_data, file_date):
+    """把一行 _AI_enhanced_ 数据转换为网站使用的论文记录。缺少ID时返回 None。"""
+    # 核心验证逻辑：只要求论文有ID
+    paper_id = raw_data.get("id")
+    if not paper_id:
+        return None
+
+    ai_enhanced_info = raw_data.get("AI", {})
+
+    # 关键修正：正确处理keywords字段，将其从字符串分割为数组
+    keywords_str = ai_enhanced_info.get("keywords", "")
+    keywords_list = []
+    if keywords_str and isinstance(keywords_str, str):
+        # 分割字符串并去除每个关键词两端的空格
+        keywords_list = [kw.strip() for kw in keywords_str.split(',') if kw.strip()]
+
+    # --- 全面、安全地获取所有数据 ---
+    return {
+        "id": paper_id,
+        "title": raw_data.get("title", "无标题"),
+        # "date": file_date,
+        "date": raw_data.get("date", file_date), # 使用文件日期作为默认值
+        "url": raw_data.get("abs", "#"),
+        "pdf_url": raw_data.get("pdf", "#"), # 直接获取PDF链接
+        "authors": ", ".join(raw_data.get("authors", [])),
+        "abstract": raw_data.get("summary", ""),
+        "comment": raw_data.get("comment", ""),
+        "categories": raw_data.get("categories", []),
+        "updated": raw_data.get("updated", file_date), # 使用文件日期作为默认值
+        "dates": [file_date], # 论文出现在哪些日期的列表中，去重时合并
+
+        # 从AI对象中提取所有丰富信息，并修正字段名
+        "zh_title": ai_enhanced_info.get("title_translation"),
+        "translation": ai_enhanced_info.get("translation"), # 摘要翻译
+        "keywords": keywords_list, # 使用处理后的数组
+        "tldr": ai_enhanced_info.get("tldr"),
+        "comments": ai_enhanced_info.get("comments"), # AI点评
+        "motivation": ai_enhanced_info.get("motivation"),
+        "method": ai_enhanced_info.get("method"),
+        "results": ai_enhanced_info.get("result"), # 研究结果
+        "conclusion": ai_enhanced_info.get("conclusion") # 兼容result字段
+    }
+
+
+def unique_papers(papers):
+    """
+    按论文ID去重 (一次哈希遍历)：同一篇论文出现多次时保留 updated 最新的版本，相同时保留较晚出现的那一次，
+    并把各次出现的列表日期合并到 dates 字段。papers 需按列表日期顺序给出，返回 {论文ID: 记录}。
+    """
+    latest = {}
+    for paper in papers:
+        current = latest.get(paper["id"])
+        if current is not None:
+            dates = sorted(set(current["dates"]) | set(paper["dates"]))
+            if paper["updated"] < current["updated"]:
+                current["dates"] = dates
+                continue
+            paper["dates"] = dates
+        latest[paper["id"]] = paper
+    return latest
+
+
+def index_paper(paper_data, search_index, tf_rows):
+    """
+    把论文加入当月的搜索倒排表，返回各字段的长度 (词项数)。
+    各字段词频组成的元组大多相同 (如只在摘要中出现一次)，经 tf_rows 去重后共享同一个对象，以节省内存。
+    """
+    paper_id = paper_data["id"]
+
+    # --- 构建搜索索引：记录英文标题、摘要、关键词以及中文字段各自的词频 ---
+    fields = field_terms(paper_data)
+    counts = {}
+    for i, terms in enumerate(fields):
+        for term, count in Counter(terms).items():
+            tfs = counts.get(term)
+            if tfs is None:
+                tfs = counts[term] = [0] * len(FIELDS)
+            tfs[i] = count
+    for term, tfs in counts.items():
+        tfs = tuple(tfs)
+        search_index[term][paper_id] = tf_rows.setdefault(tfs, tfs)
+    return [len(terms) for terms in fields]
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path, previous):
+    """
+    返回文件的 (大小, 修改时间, 内容哈希)。
+    大小和修改时间与上次一致时直接沿用上次的哈希；
+    否则重新计算哈希 (例如 CI 重新检出仓库后修改时间都会变化，但内容未变)。
+    """
+    stat = os.stat(path)
+    if previous and previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns:
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": previous["sha256"]}
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_sha256(path)}
+
+
+def write_json_atomic(path, obj, **kwargs):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(obj, f, ensure_ascii=False, **kwargs)
+    os.replace(tmp_path, path)
+
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return None
+    try:
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if manifest.get("version") != BUILD_VERSION:
+        return None
+    return manifest
+
+
+def month_shard_path(month):
+    return os.path.join(OUTPUT_DIR, f"database-{month}.json")
+
+
+def month_papers_path(month):
+    return os.path.join(BUILD_CACHE_DIR, f"papers-{month}.jsonl")
+
+
+def month_details_path(month):
+    return os.path.join(OUTPUT_DIR, f"details-{month}.json")
+
+
+def month_details_dir(month):
+    return os.path.join(OUTPUT_DIR, DETAIL_DIR, month)
+
+
+def detail_bucket(paper_id, bucket_count):
+    """论文详情所在的桶：论文ID的 32 位 FNV-1a 哈希对桶数取模 (与 docs/index.html 中的 detailBucket 一致)。"""
+    h = 0x811C9DC5
+    for ch in paper_id:
+        h = ((h ^ ord(ch)) * 0x01000193) & 0xFFFFFFFF
+    return h % bucket_count
+
+
+def write_month_details(month, papers):
+    """
+    把当月论文的详情字段 (LIST_FIELDS 以外的字段) 写成按论文ID分桶的详情文件 details/YYYY-MM/details-NNN.json，
+    每个桶是 {论文ID: {字段: 值}}；桶清单 details-YYYY-MM.json 为 {"hash": "fnv1a-32", "buckets": [{"file": ...}]}。
+    """
+    encoded = {
+        paper["id"]: json.dumps({key: value for key, value in paper.items() if key not in LIST_FIELDS}, ensure_ascii=False, separators=(',', ':'))
+        for paper in papers
+    }
+    total_bytes = sum(len(text) for text in encoded.values())
+    bucket_count = 1
+    while bucket_count * DETAIL_BUCKET_BYTES < total_bytes:
+        bucket_count *= 2
+
+    buckets = [[] for _ in range(bucket_count)]
+    for paper_id in encoded:
+        buckets[detail_bucket(paper_id, bucket_count)].append(paper_id)
+
+    details_dir = month_details_dir(month)
+    if os.path.exists(details_dir):
+        shutil.rmtree(details_dir)
+    os.makedirs(details_dir)
+    files = []
+    for i, paper_ids in enumerate(buckets):
+        name = f"{DETAIL_DIR}/{month}/details-{i:03d}.json"
+        with open(os.path.join(OUTPUT_DIR, name), 'w', encoding='utf-8') as f:
+            f.write("{" + ",".join(json.dumps(paper_id) + ":" + encoded[paper_id] for paper_id in paper_ids) + "}")
+        files.append({"file": name})
+    write_json_atomic(month_details_path(month), {"hash": "fnv1a-32", "buckets": files}, separators=(',', ':'))
+
+
+def month_postings_path(month, kind):
+    return os.path.join(BUILD_CACHE_DIR, f"postings-{month}.{kind}.jsonl")
+
+
+def write_json_array_stream(path, items):
+    """
+    逐条写出 JSON 数组，输出与 json.dump(items, separators=(',', ':')) 相同，
+    但不会先把整个数组编码成一个大字符串。
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write("[")
+        for i, item in enumerate(items):
+            if i:
+                f.write(",")
+            f.write(json.dumps(item, ensure_ascii=False, separators=(',', ':')))
+        f.write("]")
+    os.replace(tmp_path, path)
+
+
+def write_postings_run(path, index):
+    """
+    把一个月的倒排表按词项排序后写成有序的 run 文件，每行一个 [词项, 有序条目列表]。
+    条目是论文ID，或者带附加数据的 [论文ID, 数据...] (倒排表的值为 {论文ID: [数据...]} 时)。
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        for token in sorted(index):
+            postings = index[token]
+            if isinstance(postings, dict):
+                entries = [[key, *values] for key, values in sorted(postings.items())]
+            else:
+                entries = sorted(postings)
+            f.write(json_line([token, entries]))
+    os.replace(tmp_path, path)
+
+
+def read_postings_run(f, run_index):
+    for line in f:
+        token, entries = json_loads(line)
+        yield token, run_index, entries
+
+
+def merge_postings_runs(paths):
+    """
+    对多个有序 run 做多路归并 (外部排序的合并阶段)，按词项顺序逐个产出 (词项, [(run序号, 条目列表), ...])。
+    run 按月份顺序传入，任一时刻内存中只保留每个 run 的当前行和一个词项的倒排表。
+    """
+    with ExitStack() as stack:
+        runs = [
+            read_postings_run(stack.enter_context(open(path, 'rb')), run_index)
+            for run_index, path in enumerate(paths)
+        ]
+        for token, lines in groupby(heapq.merge(*runs, key=itemgetter(0)), key=itemgetter(0)):
+            yield token, [(run_index, entries) for _, run_index, entries in lines]
+
+
+def union_postings(merged):
+    """把各月份的论文ID取并集 (分类索引收录论文出现过的所有分类)。"""
+    for token, lines in merged:
+        if len(lines) == 1:
+            yield token, lines[0][1]
+        else:
+            yield token, sorted(set(chain.from_iterable(entries for _, entries in lines)))
+
+
+def canonical_postings(merged, doc_ids, canonical_runs):
+    """
+    同一篇论文出现在多个月份时，只保留它在规范月份 (最晚出现的月份) 中的条目，
+    这样词频与文档长度来自同一个版本，旧版本独有的词项也不会残留在索引中。
+    """
+    for token, lines in merged:
+        entries = [
+            entry
+            for run_index, run_entries in lines
+            for entry in run_entries
+            if canonical_runs[doc_ids[entry[0]]] == run_index
+        ]
+        if len(lines) > 1:
+            entries.sort(key=itemgetter(0))
+        if entries:
+            yield token, entries
+
+
+def assign_doc_ids(months):
+    """
+    按 arXiv ID 顺序为全部论文分配连续的整数文档ID，并写出文档表 docs.json (格式见 postings.py)。
+    同一篇论文出现在多个月份时，与 unique_papers 的规则相同，updated 最新的版本所在的月份为规范月份
+    (相同时取较晚的月份)，文档表指向这个月份分片。
+    返回 ({arXiv ID: docid}, 每个 docid 的 BM25F 字段系数, 每个 docid 规范月份的 run 序号,
+    {出现在多个月份的论文ID: (各月份的 run 序号, 规范月份的 run 序号, 合并后的列表日期)})。
+    """
+    ordered_months = sorted(months)
+    doc_ids = {}
+    paper_months = []
+    doc_lengths = []
+    shared = {}
+    runs = [month_postings_path(month, "docs") for month in ordered_months]
+    for paper_id, lines in merge_postings_runs(runs):
+        run_index, entries = lines[0]
+        if len(lines) > 1:
+            for other_index, other_entries in lines[1:]:
+                if other_entries[0][1] >= entries[0][1]:
+                    run_index, entries = other_index, other_entries
+            dates = sorted(set(chain.from_iterable(other_entries[0][2] for _, other_entries in lines)))
+            shared[paper_id] = ([other_index for other_index, _ in lines], run_index, dates)
+        doc_ids[paper_id] = len(doc_ids)
+        paper_months.append(run_index)
+        doc_lengths.append(entries[0][3:])
+    doc_table = {"months": ordered_months, "ids": list(doc_ids), "month": paper_months}
+    write_json_atomic(os.path.join(OUTPUT_DIR, "docs.json"), doc_table, separators=(',', ':'))
+    avg_lengths = [sum(field) / len(doc_lengths) if doc_lengths else 0 for field in zip(*doc_lengths)]
+    return doc_ids, [field_scales(lengths, avg_lengths) for lengths in doc_lengths], paper_months, shared
+
+
+def write_month_shards(months, rebuilt, shared):
+    """
+    写出各月份的数据分片与详情文件，每篇论文只出现在它的规范月份中，dates 为它在全部月份中的列表日期。
+    月份是否需要重写取决于它是否重建过，以及它与其他月份共有的论文 (归属或列表日期) 是否变化，
+    后者的摘要记录在 months[月份]["shared"] 中。同时把每个月份实际发布的论文数记录在 months[月份]["published"] 中。
+    """
+    ordered_months = sorted(months)
+    month_shared = defaultdict(dict)
+    for paper_id, (run_indexes, canonical_run, dates) in shared.items():
+        for run_index in run_indexes:
+            month_shared[ordered_months[run_index]][paper_id] = (run_index == canonical_run, dates)
+
+    for month in ordered_months:
+        info = months[month]
+        entries = month_shared.get(month, {})
+        digest = hashlib.sha256(json.dumps(sorted(entries.items()), ensure_ascii=False).encode('utf-8')).hexdigest()
+        published = info["count"] - sum(1 for canonical, _ in entries.values() if not canonical)
+        if (
+            month not in rebuilt
+            and info.get("shared") == digest
+            and (published == 0 or os.path.exists(month_shard_path(month)))
+        ):
+            continue
+        if published == 0:
+            remove_month_outputs(month)
+        else:
+            papers = []
+            with open(month_papers_path(month), 'rb') as f:
+                for line in f:
+                    paper = json_loads(line)
+                    canonical, dates = entries.get(paper["id"], (True, None))
+                    if canonical:
+                        if dates is not None:
+                            paper["dates"] = dates
+                        papers.append(paper)
+            write_json_array_stream(month_shard_path(month), ({key: paper[key] for key in LIST_FIELDS} for paper in papers))
+            write_month_details(month, papers)
+        info["shared"] = digest
+        info["published"] = published
+
+
+def encode_index(postings, doc_ids):
+    """把 (词项, 有序arXiv ID列表) 映射为 docid 后做差分 + varint + base64 编码。"""
+    for token, ids in postings:
+        # 倒排表已按 arXiv ID 排序，docid 也按 arXiv ID 分配，因此映射后仍然升序
+        yield token, encode_postings(doc_ids[paper_id] for paper_id in ids)
+
+
+def write_postings_index(path, postings, doc_ids):
+    """流式写出索引文件，每个词项的倒排表都以紧凑编码存储。"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({"format": POSTINGS_FORMAT, "docCount": len(doc_ids)}, separators=(',', ':'))[:-1] + ',"postings":{')
+        for i, (token, encoded) in enumerate(encode_index(postings, doc_ids)):
+            if i:
+                f.write(",")
+            f.write(json.dumps(token, ensure_ascii=False) + ':"' + encoded + '"')
+        f.write("}}")
+    os.replace(tmp_path, path)
+
+
+def write_search_shards(postings, doc_ids, doc_scales, vocabulary):
+    """
+    按词项顺序把搜索索引切分成多个分片，每个分片累计的倒排表体积约为 SEARCH_SHARD_BYTES，
+    因此常见前缀 (如 "co"、"re") 会被拆开，稀疏的前缀会被合并。
+    分片清单 search_shards.json 记录每个分片的首末词项，客户端只需下载查询词前缀所在的分片。
+    每个倒排表还带有逐篇的量化 BM25F 权重 (impact)，用于在浏览器中排序 (见 ranking.py)。
+    出现在超过 CJK_MAX_POSTINGS 篇论文中的中文二元组只保留 impact 最高的那些论文，
+    这些词项的完整文档频率 (用于计算 idf) 与停用二元组一起记录在分片清单中。
+    所有词项及其文档频率按顺序追加到 vocabulary 中，供生成自动补全词典使用。返回分片数。
+    """
+    shard_dir = os.path.join(OUTPUT_DIR, SEARCH_SHARD_DIR)
+    os.makedirs(shard_dir, exist_ok=True)
+    shards = []
+    current = {"format": SCORED_FORMAT, "postings": {}}
+    current_bytes = 0
+    capped_terms = {}
+
+    def flush():
+        nonlocal current, current_bytes
+        if not current["postings"]:
+            return
+        name = f"{SEARCH_SHARD_DIR}/search-{len(shards):04d}.json"
+        write_json_atomic(os.path.join(OUTPUT_DIR, name), current, separators=(',', ':'))
+        tokens = list(current["postings"])
+        shards.append({"file": name, "first": tokens[0], "last": tokens[-1], "bytes": current_bytes})
+        current = {"format": SCORED_FORMAT, "postings": {}}
+        current_bytes = 0
+
+    for token, entries in postings:
+        vocabulary.append((token, len(entries)))
+        term_doc_ids = [doc_ids[entry[0]] for entry in entries]
+        impacts = term_impacts((entry[1:] for entry in entries), (doc_scales[doc_id] for doc_id in term_doc_ids))
+        if len(term_doc_ids) > CJK_MAX_POSTINGS and is_cjk_bigram(token):
+            top = sorted(range(len(impacts)), key=lambda i: (-impacts[i], term_doc_ids[i]))[:CJK_MAX_POSTINGS]
+            top.sort(key=term_doc_ids.__getitem__)
+            term_doc_ids = [term_doc_ids[i] for i in top]
+            impacts = [impacts[i] for i in top]
+            capped_terms[token] = len(entries)
+        encoded = encode_scored_postings(term_doc_ids, impacts)
+        current["postings"][token] = encoded
+        current_bytes += len(token) + len(encoded)
+        if current_bytes >= SEARCH_SHARD_BYTES:
+            flush()
+    flush()
+
+    # 清理上次构建留下的多余分片
+    live = {os.path.basename(shard["file"]) for shard in shards}
+    for path in glob.glob(os.path.join(shard_dir, "search-*.json")):
+        if os.path.basename(path) not in live:
+            os.remove(path)
+
+    manifest = {
+        "format": POSTINGS_FORMAT,
+        "docCount": len(doc_ids),
+        "stopTerms": sorted(CJK_STOP_BIGRAMS),
+        "cappedTerms": capped_terms,
+        "shards": shards,
+    }
+    write_json_atomic(os.path.join(OUTPUT_DIR, "search_shards.json"), manifest, indent=2)
+    return len(shards)
+
+
+def write_term_blocks(vocabulary):
+    """
+    把按词项排序的 [(词项, 文档频率)] 写成前缀压缩、分块的自动补全词典 (格式见 autocomplete.py)，
+    客户端补全一个前缀只需在块清单 term_blocks.json 中二分查找并下载一个块。返回块数。
+    """
+    block_dir = os.path.join(OUTPUT_DIR, TERM_BLOCK_DIR)
+    os.makedirs(block_dir, exist_ok=True)
+    blocks = []
+    for first, last, data in build_blocks(vocabulary):
+        name = f"{TERM_BLOCK_DIR}/terms-{len(blocks):04d}.json"
+        write_json_atomic(os.path.join(OUTPUT_DIR, name), data, separators=(',', ':'))
+        blocks.append({"file": name, "first": first, "last": last})
+
+    # 清理上次构建留下的多余块
+    live = {os.path.basename(block["file"]) for block in blocks}
+    for path in glob.glob(os.path.join(block_dir, "terms-*.json")):
+        if os.path.basename(path) not in live:
+            os.remove(path)
+
+    manifest = {"format": TERMS_FORMAT, "k": TERMS_TOP_K, "termCount": len(vocabulary), "blocks": blocks}
+    write_json_atomic(os.path.join(OUTPUT_DIR, "term_blocks.json"), manifest, indent=2)
+    return len(blocks)
+
+
+def build_month(month, files):
+    """
+    重新读取某个月份的全部源文件，把去重后的论文记录和该月的倒排表 (有序 run) 缓存到构建目录；
+    数据分片在全部月份去重后由 write_month_shards 写出。内存占用只与这一个月的数据量有关。返回 (论文数, 跳过数)。
+    """
+    papers = []
+    doc_index = {}
+    search_index = defaultdict(dict)
+    tf_rows = {}
+    category_index = defaultdict(set)
+    skipped_paper_count = 0
+
+    for name, path, file_date in files:
+        for raw_data in read_source(name, path):
+            try:
+                paper_data = normalize_paper(raw_data, file_date)
+                if paper_data is None:
+                    skipped_paper_count += 1
+                    continue
+                papers.append(paper_data)
+
+                # 新增：构建分类索引
+                if paper_data.get("categories"):
+                    for category in paper_data.get("categories"):
+                        category_index[category].add(paper_data["id"])
+            except AttributeError:
+                # 无法解析的行 (None) 或不是对象的行
+                skipped_paper_count += 1
+                continue
+
+    # 同一篇论文在本月重复出现时只保留一条记录，搜索索引只收录这个版本；分类索引收录各次出现的分类
+    latest = unique_papers(papers)
+    for paper_id, paper_data in latest.items():
+        lengths = index_paper(paper_data, search_index, tf_rows)
+        doc_index[paper_id] = {month: [paper_data["updated"], paper_data["dates"], *lengths]}
+
+    papers = sorted(latest.values(), key=lambda p: p['date'], reverse=True)
+    tmp_path = month_papers_path(month) + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        for paper in papers:
+            f.write(json_line(paper))
+    os.replace(tmp_path, month_papers_path(month))
+
+    write_postings_run(month_postings_path(month, "docs"), doc_index)
+    write_postings_run(month_postings_path(month, "search"), search_index)
+    write_postings_run(month_postings_path(month, "category"), category_index)
+    return len(papers), skipped_paper_count
+
+
+def build_months(month_files, months, jobs):
+    """
+    重建 months 中的各个月份，按月份顺序逐个产出 (月份, 论文数, 跳过数)。
+    各月份互不依赖，只写自己的论文记录缓存和倒排表 run，jobs > 1 时在进程池中并行解析与建索引，
+    再由主进程多路归并各月份的 run，输出与逐月串行构建逐字节相同。
+    """
+    files = [month_files[month] for month in months]
+    if jobs <= 1 or len(months) <= 1:
+        results = map(build_month, months, files)
+        for month, (count, skipped) in zip(months, results):
+            yield month, count, skipped
+        return
+    # 每个进程同时只处理一个月份，内存占用约为单个月份的 jobs 倍
+    with ProcessPoolExecutor(max_workers=min(jobs, len(months))) as executor:
+        for month, (count, skipped) in zip(months, executor.map(build_month, months, files)):
+            yield month, count, skipped
+
+
+def remove_month_outputs(month):
+    for path in (month_shard_path(month), month_details_path(month)):
+        if os.path.exists(path):
+            os.remove(path)
+    if os.path.exists(month_details_dir(month)):
+        shutil.rmtree(month_details_dir(month))
+
+
+def remove_month(month):
+    remove_month_outputs(month)
+    for path in [month_papers_path(month)] + [month_postings_path(month, kind) for kind in POSTING_KINDS]:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def enhanced_sources(language=LANGUAGE):
+    """返回按日期排序的 [(源文件名, 所在文件的路径, 文件日期)]，包括已归档月份中的文件 (见 archive.py)。"""
+    sources = []
+    for name, path in list_sources().items():
+        match = SOURCE_RE.fullmatch(name)
+        if match.group(2) == language:
+            sources.append((name, path, match.group(1)))
+    return sources
+
+
+def iter_papers(language=LANGUAGE):
+    """按文件日期顺序逐篇产出所有论文的网站记录 (跳过无法解析的行)。"""
+    for name, path, file_date in enhanced_sources(language):
+        for raw_data in read_source(name, path):
+            try:
+                paper_data = normalize_paper(raw_data, file_date)
+            except AttributeError:
+                continue
+            if paper_data is not None:
+                yield paper_data
+
+
+def build_database_from_jsonl(full=False, jobs=1):
+    """
+    构建数据库的主函数。
+    它从 'data' 目录下的 *_AI_enhanced_Chinese.jsonl 文件 (以及已归档月份中的这些文件，见 archive.py) 中读取结构化数据，然后生成：
+    1. 按月份分片的数据文件：只含列表视图字段的 database-YYYY-MM.json，
+       以及按论文ID分桶的详情文件 details/YYYY-MM/details-NNN.json 及其桶清单 details-YYYY-MM.json。
+       同一篇论文出现在多个每日文件中时全库只保留一条记录 (updated 最新的版本)，
+       放在它所在的月份分片中，dates 字段记录它出现过的全部列表日期
+    2. 一个清单文件 (index.json)
+    3. 按词项前缀切分的搜索索引分片 (search/search-NNNN.json) 及其清单 (search_shards.json)
+    4. 一个全新的分类索引文件 (category_index.json)
+    5. 整数文档ID到论文的文档表 (docs.json)，两个索引中的倒排表均以文档ID紧凑编码 (见 postings.py)
+    6. 前缀压缩、分块的自动补全词典 (terms/terms-NNNN.json) 及其块清单 (term_blocks.json，见 autocomplete.py)
+    这些文件以固定文件名写入构建目录 (.cache/build/site)，最后由 publish.py 以压缩空白、带内容哈希的文件名
+    (连同 .gz/.br 预压缩版本) 发布到 docs/data，入口清单 index.json 给出发布后的文件名。
+
+    构建是增量的：清单 (.cache/build/manifest.json) 记录了每个源文件的大小、修改时间和内容哈希，
+    只有新增、修改或删除了源文件的月份才会重新读取，其余月份直接复用缓存的论文记录和倒排表；
+    数据分片只在月份重建过、或与其他月份共有的论文发生变化时重写。
+    需要重建的月份由 jobs 个进程并行处理。
+    """
+    if not os.path.exists(OUTPUT_DIR):
+        os.makedirs(OUTPUT_DIR)
+        print(f"创建目录: {OUTPUT_DIR}")
+    os.makedirs(BUILD_CACHE_DIR, exist_ok=True)
+
+    sources = enhanced_sources()
+    if not sources:
+        print(f"错误: 在 'data' 目录及其归档中没有找到任何 '_AI_enhanced_{LANGUAGE}.jsonl' 文件。")
+        return
+
+    print(f"找到 {len(sources)} 个 .jsonl 数据源文件。开始处理...")
+
+    previous = None if full else load_manifest()
+    previous_files = previous["files"] if previous else {}
+    previous_months = previous["months"] if previous else {}
+    if previous is None:
+        # 全量重建：清理旧版本留下的倒排表缓存
+        for path in glob.glob(os.path.join(BUILD_CACHE_DIR, "postings-*")) + glob.glob(os.path.join(BUILD_CACHE_DIR, "papers-*")):
+            os.remove(path)
+
+    files = {}
+    month_files = defaultdict(list)
+    affected_months = set()
+    # 同一个月份归档中的源文件共用归档文件的指纹，只计算一次
+    fingerprints = {}
+    for name, path, file_date in sources:
+        jsonl_file = os.path.join(DATA_DIR, name)
+        year_month = file_date[:7]
+
+        old_entry = previous_files.get(jsonl_file)
+        if path not in fingerprints:
+            fingerprints[path] = file_fingerprint(path, old_entry)
+        fingerprint = fingerprints[path]
+        files[jsonl_file] = dict(fingerprint, month=year_month)
+        month_files[year_month].append((name, path, file_date))
+        if not old_entry or old_entry["sha256"] != fingerprint["sha256"]:
+            affected_months.add(year_month)
+
+    # 源文件被删除的月份也需要重建 (或整月移除)
+    for jsonl_file, old_entry in previous_files.items():
+        if jsonl_file not in files:
+            affected_months.add(old_entry["month"])
+
+    # 缓存或输出缺失的月份同样需要重建
+    for month in month_files:
+        info = previous_months.get(month)
+        if (
+            info is None
+            or not os.path.exists(month_papers_path(month))
+            or not all(os.path.exists(month_postings_path(month, kind)) for kind in POSTING_KINDS)
+            or (info.get("published", info["count"]) > 0 and not (os.path.exists(month_shard_path(month)) and os.path.exists(month_details_path(month))))
+        ):
+            affected_months.add(month)
+
+    months = {month: info for month, info in previous_months.items() if month in month_files}
+    for month in sorted(affected_months - set(month_files)):
+        remove_month(month)
+        print(f"月份 {month} 已没有数据文件，已移除其分片。")
+    for month, count, skipped in build_months(month_files, sorted(affected_months & set(month_files)), jobs):
+        months[month] = {"count": count, "skipped": skipped}
+        print(f"重建月份 {month}: {count} 篇论文。")
+
+    total_paper_count = sum(info["count"] for info in months.values())
+    skipped_paper_count = sum(info["skipped"] for info in months.values())
+    if total_paper_count > 0:
+        print(f"处理完成 {total_paper_count} 篇论文 (重建 {len(affected_months)} 个月份，复用 {len(month_files) - len(affected_months & set(month_files))} 个月份)。")
+        if skipped_paper_count > 0:
+            print(f"因缺少ID或格式错误，跳过了 {skipped_paper_count} 篇论文。")
+    else:
+        print("警告: 未能成功处理任何论文。")
+        return
+
+    index_paths = [os.path.join(OUTPUT_DIR, name) for name in ("index.json", "docs.json", "search_shards.json", "term_blocks.json", "category_index.json")]
+    if affected_months or not all(os.path.exists(path) for path in index_paths):
+        write_indexes(months, affected_months)
+    else:
+        print("数据文件没有变化，索引保持不变。")
+
+    write_json_atomic(MANIFEST_PATH, {"version": BUILD_VERSION, "files": files, "months": months})
+
+    written, reused, removed = publish(OUTPUT_DIR, record_path=PUBLISH_RECORD_PATH)
+    print(f"发布到 {PUBLISH_DIR}: 写出 {written} 个文件，复用 {reused} 个，删除 {removed} 个旧文件。")
+
+    old_db_path = "docs/database.json"
+    if os.path.exists(old_db_path):
+        os.remove(old_db_path)
+        print(f"已删除旧的数据文件: {old_db_path}")
+
+
+def write_indexes(months, rebuilt):
+    """
+    由各月份缓存的有序 run 多路归并出文档表、全局的搜索索引与分类索引，按全局去重的结果写出月份分片，
+    最后写出清单文件。rebuilt 是本次重建过的月份。
+
+    只有月份分片按 rebuilt 增量重写；搜索索引分片、自动补全词典和分类索引每次都完整地重新生成
+    (内容不变的文件由 publish.py 复用，不会重新发布)。按词项范围只重写变化的分片省不下多少：
+    BM25F 的字段系数依赖全库的平均字段长度，docid 依赖全库的 arXiv ID 顺序，任何新增论文都会改变它们；
+    即使冻结这两者，一天新增的论文 (2025-06-29 的 449 篇) 也会触及全部 96 个分片和 86% 的倒排表条目。
+    """
+    doc_ids, doc_scales, canonical_runs, shared = assign_doc_ids(months)
+    print(f"成功写入文档表 docs.json ({len(doc_ids)} 篇论文，其中 {len(shared)} 篇出现在多个月份)。")
+    write_month_shards(months, rebuilt, shared)
+
+    runs = [month_postings_path(month, "search") for month in sorted(months)]
+    vocabulary = []
+    shard_count = write_search_shards(canonical_postings(merge_postings_runs(runs), doc_ids, canonical_runs), doc_ids, doc_scales, vocabulary)
+    print(f"成功写入搜索索引分片清单 search_shards.json ({shard_count} 个分片)。")
+    block_count = write_term_blocks(vocabulary)
+    print(f"成功写入自动补全词典 term_blocks.json ({len(vocabulary)} 个词项, {block_count} 个块)。")
+    # 旧版本的完整搜索索引已被分片取代
+    old_search_index_path = os.path.join(OUTPUT_DIR, "search_index.json")
+    if os.path.exists(old_search_index_path):
+        os.remove(old_search_index_path)
+
+    # 新增：写入分类索引文件
+    runs = [month_postings_path(month, "category") for month in sorted(months)]
+    write_postings_index(os.path.join(OUTPUT_DIR, "category_index.json"), union_postings(merge_postings_runs(runs)), doc_ids)
+    print("成功写入分类索引文件 category_index.json。")
+
+    available_months = sorted((month for month, info in months.items() if info["published"] > 0), reverse=True)
+    manifest = {"availableMonths": available_months, "totalPaperCount": len(doc_ids)}
+    write_json_atomic(os.path.join(OUTPUT_DIR, "index.json"), manifest, indent=2)
+    print("成功写入清单文件 index.json。")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    build_database_from_jsonl(full=args.full, jobs=args.jobs)
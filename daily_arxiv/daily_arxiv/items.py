@@ -10,6 +10,8 @@ class ArxivItem(scrapy.Item):
     cate = scrapy.Field()
     # **新增**: 存储从arXiv API获取的作者备注
     comment = scrapy.Field()
+    # 论文出现过的所有列表分类 (跨分类去重后保留)
+    list_categories = scrapy.Field()
     date = scrapy.Field()
     updated = scrapy.Field()
     AI = scrapy.Field()
\ No newline at end of file
@@ -0,0 +1,98 @@
+import re
+
+# 列表页中的条目完整时可以跳过arXiv API，缺少这些字段的条目交给 ArxivPipeline 查询补全
+REQUIRED_FIELDS = ("title", "authors", "summary", "categories")
+
+VERSIONED_ID_RE = re.compile(r'(\d{4}\.\d{4,5}v\d+)')
+CATEGORY_RE = re.compile(r'\(([^()]+)\)\s*$')
+
+
+def _text(selector, descriptor=None):
+    """取出节点的全部文本并合并空白，去掉 "Title:" 之类的描述前缀。"""
+    if selector is None:
+        return None
+    text = " ".join((selector.xpath("string(.)").get() or "").split())
+    if descriptor and text.startswith(descriptor):
+        text = text[len(descriptor):].strip()
+    return text or None
+
+
+def _first(selection):
+    return selection[0] if selection else None
+
+
+def paper_ids_before_replacements(response):
+    """
+    返回列表页中 (dt, dd) 条目对，跳过 "Replacements" 部分。
+    页面顶部的目录链接 (#itemN) 中最后一项是替换版本的起点。
+    """
+    anchors = []
+    for li in response.css("div[id=dlpage] ul li"):
+        anchors.append(int(li.css("a::attr(href)").get().split("item")[-1]))
+    entries = []
+    for dt in response.css("dl dt"):
+        if (
+            anchors
+            and int(dt.css("a[name^='item']::attr(name)").get().split("item")[-1]) >= anchors[-1]
+        ):
+            continue
+        entries.append((dt, _first(dt.xpath("following-sibling::dd[1]"))))
+    return entries
+
+
+def parse_entry(dt, dd):
+    """
+    从一个列表条目中解析出 ArxivItem 的字段。
+    列表页不包含发表和更新日期，无法解析的字段不会出现在结果中。
+    """
+    paper_id = dt.css("a[title='Abstract']::attr(href)").get().split("/")[-1]
+    item = {"id": paper_id}
+    if dd is None:
+        return item
+
+    versioned = None
+    for href in dt.css("a::attr(href)").getall():
+        match = VERSIONED_ID_RE.search(href)
+        if match:
+            versioned = match.group(1)
+            break
+    item["pdf_url"] = f"http://arxiv.org/pdf/{versioned or paper_id}"
+    item["url"] = f"http://arxiv.org/abs/{versioned or paper_id}"
+
+    title = _text(_first(dd.css("div.list-title")), "Title:")
+    if title:
+        item["title"] = title
+
+    authors = [" ".join(name.split()) for name in dd.css("div.list-authors a::text").getall()]
+    if authors:
+        item["authors"] = authors
+
+    summary = dd.css("p.mathjax").xpath("string(.)").get()
+    if summary and summary.strip():
+        item["summary"] = summary.strip()
+
+    item["comment"] = _text(_first(dd.css("div.list-comments")), "Comments:")
+
+    subjects = _text(_first(dd.css("div.list-subjects")), "Subjects:")
+    if subjects:
+        categories = []
+        for subject in subjects.split(";"):
+            match = CATEGORY_RE.search(subject.strip())
+            if match:
+                categories.append(match.group(1))
+        primary = _text(_first(dd.css("div.list-subjects span.primary-subject")))
+        primary_match = CATEGORY_RE.search(primary or "")
+        if categories:
+            item["categories"] = categories
+            item["cate"] = primary_match.group(1) if primary_match else categories[0]
+    return item
+
+
+def is_complete(item):
+    return all(item.get(field) for field in REQUIRED_FIELDS)
+
+
+def parse_listing(response):
+    """解析 /list/{cat}/new 页面，按页面顺序返回论文条目。"""
+    return [parse_entry(dt, dd) for dt, dd in paper_ids_before_replacements(response)]
+
@@ -1,11 +1,15 @@
 from itemadapter import ItemAdapter
 from scrapy.exceptions import DropItem
 import arxiv
+import asyncio
 import os
+import re
+
+from daily_arxiv.listing import is_complete
 
 class ArxivPipeline:
 
-    def __init__(self):
+    def __init__(self, batch_size=100, flush_delay=1.0):
         # 初始化客户端，并设置礼貌的抓取延迟和重试次数
         self.client = arxiv.Client(
             page_size = 100,
@@ -14,32 +18,109 @@ class ArxivPipeline:
         )
         self.preference = os.environ.get('CATEGORIES', 'cs.CV, cs.CL').split(',')
         self.preference = list(map(lambda x: x.strip(), self.preference))
+        # 批量查询：缓存待查询的论文，凑满一批 (或等待 flush_delay 秒) 后用一次 id_list 请求取回元数据
+        self.batch_size = batch_size
+        self.flush_delay = flush_delay
+        self.buffer = []
+        self.flush_handle = None
+        self.fetch_lock = None
+        self.tasks = set()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            batch_size=crawler.settings.getint("ARXIV_BATCH_SIZE", 100),
+            flush_delay=crawler.settings.getfloat("ARXIV_BATCH_FLUSH_DELAY", 1.0),
+        )
+
+    async def process_item(self, item, spider):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.buffer.append((item, future))
+        if len(self.buffer) >= self.batch_size:
+            self.flush(spider)
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.flush_delay, self.flush, spider)
+        return await future
+
+    async def close_spider(self, spider):
+        self.flush(spider)
+        # 等待还在查询中的批次，否则爬虫关闭时它们的条目会丢失
+        while self.tasks:
+            await asyncio.gather(*self.tasks)
 
-    def process_item(self, item, spider):
+    def flush(self, spider):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        if not self.buffer:
+            return
+        batch, self.buffer = self.buffer, []
+        # 保留任务的引用，避免任务在运行中被垃圾回收
+        task = asyncio.ensure_future(self.resolve_batch(batch, spider))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def resolve_batch(self, batch, spider):
+        """
+        查询一批论文并按原顺序完成各自的 future，未在结果中出现或处理出错的论文被丢弃。
+        列表页模式下已解析完整的条目直接放行，只有缺少字段的条目才会查询API。
+        """
         try:
-            search = arxiv.Search(id_list=[item["id"]])
-            result = next(self.client.results(search), None)
-            
-            if result:
-                item["title"] = result.title
-                item["authors"] = [author.name for author in result.authors]
-                item["summary"] = result.summary
-                # **新增**: 提取并保存arXiv官方的comment字段
-                item["comment"] = result.comment
-                # **新增**: 提取并保存arXiv官方的PDF链接
-                item["pdf_url"] = result.pdf_url
-                # **新增**: 提取并保存arXiv官方的categories字段
-                item["categories"] = result.categories
-                item["cate"] = result.primary_category
-                # 使用PDF链接作为URL，更直接
-                # 转换为abs链接
-                item["url"] = result.pdf_url.replace('arxiv.org/pdf/', 'arxiv.org/abs/') 
-                item["date"] = result.published.date().isoformat() if result.published else None
-                item["updated"] = result.updated.date().isoformat() if result.updated else None
-                return item
-            else:
-                raise DropItem(f"Paper with ID {item['id']} not found on arXiv.")
-
-        except Exception as e:
-            spider.logger.error(f"Failed to process paper {item['id']}: {e}")
-            raise DropItem(f"Failed to process paper {item['id']} due to an error.")
\ No newline at end of file
+            if self.fetch_lock is None:
+                self.fetch_lock = asyncio.Lock()
+            ids = [item["id"] for item, _ in batch if not is_complete(item)]
+            # 逐批串行查询，保证条目按抓取顺序输出，也避免对arXiv API并发请求
+            async with self.fetch_lock:
+                try:
+                    results = await asyncio.to_thread(self.fetch_results, ids) if ids else {}
+                except Exception as e:
+                    spider.logger.error(f"Failed to fetch batch of {len(ids)} papers: {e}")
+                    return
+            if ids:
+                spider.logger.info(f"Fetched metadata for {len(results)}/{len(ids)} papers in one batch.")
+            for item, future in batch:
+                # 单篇论文出错只丢弃这一篇，不影响同批的其他论文
+                try:
+                    if not is_complete(item):
+                        result = results.get(self.base_id(item["id"]))
+                        if not result:
+                            future.set_exception(DropItem(f"Paper with ID {item['id']} not found on arXiv."))
+                            continue
+                        self.fill_item(item, result)
+                    future.set_result(item)
+                except Exception as e:
+                    spider.logger.error(f"Failed to process paper {item['id']}: {e}")
+                    if not future.done():
+                        future.set_exception(DropItem(f"Failed to process paper {item['id']} due to an error."))
+        finally:
+            # 查询失败或任务被取消时，还没有结果的论文一律丢弃，不让 process_item 一直等待
+            for item, future in batch:
+                if not future.done():
+                    future.set_exception(DropItem(f"Failed to process paper {item['id']} due to an error."))
+
+    @staticmethod
+    def base_id(paper_id):
+        """去掉版本号后缀，例如 2506.20770v2 -> 2506.20770。"""
+        return re.sub(r'v\d+$', '', paper_id)
+
+    def fetch_results(self, ids):
+        search = arxiv.Search(id_list=ids, max_results=len(ids))
+        return {self.base_id(result.get_short_id()): result for result in self.client.results(search)}
+
+    def fill_item(self, item, result):
+        item["title"] = result.title
+        item["authors"] = [author.name for author in result.authors]
+        item["summary"] = result.summary
+        # **新增**: 提取并保存arXiv官方的comment字段
+        item["comment"] = result.comment
+        # **新增**: 提取并保存arXiv官方的PDF链接
+        item["pdf_url"] = result.pdf_url
+        # **新增**: 提取并保存arXiv官方的categories字段
+        item["categories"] = result.categories
+        item["cate"] = result.primary_category
+        # 使用PDF链接作为URL，更直接
+        # 转换为abs链接
+        item["url"] = result.pdf_url.replace('arxiv.org/pdf/', 'arxiv.org/abs/')
+        item["date"] = result.published.date().isoformat() if result.published else None
+        item["updated"] = result.updated.date().isoformat() if result.updated else None
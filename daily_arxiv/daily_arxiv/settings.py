@@ -67,6 +67,12 @@ ITEM_PIPELINES = {
    "daily_arxiv.pipelines.ArxivPipeline": 300,
 }
 
+# ArxivPipeline 每次 id_list 查询包含的论文数，以及凑不满一批时的最长等待秒数
+ARXIV_BATCH_SIZE = 100
+ARXIV_BATCH_FLUSH_DELAY = 1.0
+# 允许同时处理的条目数需不小于批大小，否则批次永远凑不满
+CONCURRENT_ITEMS = 200
+
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
 #AUTOTHROTTLE_ENABLED = True
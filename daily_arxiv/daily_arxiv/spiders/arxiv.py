@@ -1,35 +1,81 @@
 import scrapy
 import os
 
+from daily_arxiv.listing import paper_ids_before_replacements, parse_entry
+
 
 class ArxivSpider(scrapy.Spider):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, mode=None, **kwargs):
         super().__init__(*args, **kwargs)
         categories = os.environ.get("CATEGORIES", "cs.CV")
         categories = categories.split(",")
-        categories = list(map(str.strip, categories))
+        categories = list(dict.fromkeys(filter(None, map(str.strip, categories))))
         self.start_urls = [
             f"https://arxiv.org/list/{cat}/new" for cat in categories
         ]  # 起始URL（计算机科学领域的最新论文）
+        # 抓取模式: "api" 只从列表页提取ID，元数据由 ArxivPipeline 通过arXiv API获取；
+        # "listing" 直接从列表页解析完整条目，只有解析失败的字段才回退到API
+        self.mode = (mode or os.environ.get("CRAWL_MODE") or "api").strip().lower()
+        # 跨分类去重: 先收集所有分类列表页的条目，全部到齐后按 CATEGORIES 的顺序去重输出
+        self.listed = {}
+        self.remaining_pages = 0
 
     name = "arxiv"  # 爬虫名称
     allowed_domains = ["arxiv.org"]  # 允许爬取的域名
 
-    def parse(self, response):
-        # 提取每篇论文的信息
-        anchors = []
-        for li in response.css("div[id=dlpage] ul li"):
-            anchors.append(int(li.css("a::attr(href)").get().split("item")[-1]))
-
-        for paper in response.css("dl dt"):
-            if (
-                int(paper.css("a[name^='item']::attr(name)").get().split("item")[-1])
-                >= anchors[-1]
-            ):
-                continue
-
-            yield {
-                "id": paper.css("a[title='Abstract']::attr(href)")
-                .get()
-                .split("/")[-1],  # 提取论文链接
-            }
+    def start_requests(self):
+        self.remaining_pages = len(self.start_urls)
+        for url in self.start_urls:
+            # 条目按起始URL记录，重定向或URL规范化改变 response.url 时也能对应回分类
+            yield scrapy.Request(url, callback=self.parse, errback=self.on_listing_error, dont_filter=True,
+                                 cb_kwargs={"start_url": url})
+
+    async def start(self):
+        # Scrapy 2.13+ 使用 start()，旧版本仍调用 start_requests()
+        for request in self.start_requests():
+            yield request
+
+    @staticmethod
+    def category_of(url):
+        return url.split("/list/")[-1].split("/")[0]
+
+    def parse(self, response, start_url):
+        # 提取每篇论文的信息 (跳过 Replacements 部分)
+        entries = []
+        for dt, dd in paper_ids_before_replacements(response):
+            if self.mode == "listing":
+                entries.append(parse_entry(dt, dd))
+            else:
+                entries.append({
+                    "id": dt.css("a[title='Abstract']::attr(href)")
+                    .get()
+                    .split("/")[-1],  # 提取论文链接
+                })
+        self.listed[start_url] = entries
+        yield from self.finish_listing()
+
+    def on_listing_error(self, failure):
+        self.logger.error(f"Failed to fetch listing page {failure.request.url}: {failure.value}")
+        self.listed[failure.request.cb_kwargs["start_url"]] = []
+        yield from self.finish_listing()
+
+    def finish_listing(self):
+        """所有列表页都处理完后，输出去重后的论文，并在 list_categories 中记录它出现过的所有列表分类。"""
+        self.remaining_pages -= 1
+        if self.remaining_pages > 0:
+            return
+        papers = {}
+        total = 0
+        for url in self.start_urls:
+            category = self.category_of(url)
+            entries = self.listed.get(url, [])
+            if not entries:
+                self.logger.warning(f"No papers found in listing page {url} for category {category}.")
+            for entry in entries:
+                total += 1
+                paper = papers.setdefault(entry["id"], entry)
+                list_categories = paper.setdefault("list_categories", [])
+                if category not in list_categories:
+                    list_categories.append(category)
+        self.logger.info(f"Collected {len(papers)} unique papers from {total} listing entries.")
+        yield from papers.values()
@@ -0,0 +1,227 @@
+// 解码 build_database.py 生成的紧凑倒排表，格式说明见仓库根目录的 postings.py
+
+// 与 ranking.py 中的 IMPACT_LEVELS / CJK_RUN_RE 一致
+const IMPACT_LEVELS = 255;
+const CJK_RUN_RE = /[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+/g;
+
+// 把查询切分为词项：非汉字部分 (小写) 作为前缀，连续汉字切成二元组，单个汉字作为前缀 (与 ranking.py 中的 query_terms 一致)
+function queryTerms(query, stopTerms = new Set()) {
+    const terms = [];
+    const add = term => { if (term && !terms.includes(term)) terms.push(term); };
+    for (const token of query.toLowerCase().split(/\s+/)) {
+        let last = 0;
+        for (const match of token.matchAll(CJK_RUN_RE)) {
+            add(token.slice(last, match.index));
+            const run = match[0];
+            if (run.length === 1) add(run);
+            for (let i = 0; i + 1 < run.length; i++) {
+                const bigram = run.slice(i, i + 2);
+                if (!stopTerms.has(bigram)) add(bigram);
+            }
+            last = match.index + run.length;
+        }
+        add(token.slice(last));
+    }
+    return terms;
+}
+
+// 差分 + varint + base64 解码，返回升序的整数文档ID数组
+function decodePostings(encoded) {
+    const bytes = atob(encoded);
+    const docIds = [];
+    let value = 0, scale = 1, previous = 0;
+    for (let i = 0; i < bytes.length; i++) {
+        const byte = bytes.charCodeAt(i);
+        value += (byte & 0x7f) * scale;
+        if (byte & 0x80) { scale *= 128; continue; }
+        previous += value;
+        docIds.push(previous);
+        value = 0; scale = 1;
+    }
+    return docIds;
+}
+
+// 搜索索引分片的倒排表：varint 篇数 + 差分 varint 文档ID + 每篇一个字节的量化 BM25F 权重 (1..255)
+function decodeScoredPostings(encoded) {
+    const bytes = atob(encoded);
+    let pos = 0;
+    const readVarint = () => {
+        let value = 0, scale = 1, byte;
+        do {
+            byte = bytes.charCodeAt(pos++);
+            value += (byte & 0x7f) * scale;
+            scale *= 128;
+        } while (byte & 0x80);
+        return value;
+    };
+    const count = readVarint();
+    const docIds = new Array(count);
+    let previous = 0;
+    for (let i = 0; i < count; i++) docIds[i] = previous += readVarint();
+    const impacts = new Uint8Array(count);
+    for (let i = 0; i < count; i++) impacts[i] = bytes.charCodeAt(pos + i);
+    return { docIds, impacts };
+}
+
+function fetchJson(url) {
+    return fetch(url).then(response => {
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        return response.json();
+    });
+}
+
+// 与 ranking.py 中的 idf 一致
+function bm25Idf(df, docCount) {
+    return Math.log(1 + (docCount - df + 0.5) / (df + 0.5));
+}
+
+// docs.json: 文档ID -> arXiv ID / 所在月份分片
+class DocTable {
+    constructor(data) {
+        this.ids = data.ids;
+        this.months = data.months;
+        this.monthIndex = data.month;
+    }
+    paperId(docId) { return this.ids[docId]; }
+    month(docId) { return this.months[this.monthIndex[docId]]; }
+}
+
+// category_index.json: 词项 -> 编码后的倒排表，按需解码并缓存
+class PostingsIndex {
+    constructor(data) {
+        this.postings = data.postings || {};
+        this.docCount = data.docCount || 0;
+        this.decoded = new Map();
+    }
+    has(key) { return Object.prototype.hasOwnProperty.call(this.postings, key); }
+    keys() { return Object.keys(this.postings); }
+    docIds(key) {
+        if (!this.has(key)) return [];
+        if (!this.decoded.has(key)) this.decoded.set(key, decodePostings(this.postings[key]));
+        return this.decoded.get(key);
+    }
+}
+
+// search_shards.json: 按词项前缀切分的搜索索引，查询时只下载前缀所在的分片
+class ShardedIndex {
+    constructor(manifest, baseUrl = './data/') {
+        this.shards = manifest.shards || [];
+        this.docCount = manifest.docCount || 0;
+        this.stopTerms = new Set(manifest.stopTerms || []);
+        this.cappedTerms = new Map(Object.entries(manifest.cappedTerms || {}));
+        this.baseUrl = baseUrl;
+        this.loaded = new Map();
+    }
+    // 分片首尾相接且按词项排序：二分找到第一个末词项 >= prefix 的分片，再向后取到首词项超出前缀范围为止
+    shardsForPrefix(prefix) {
+        const upper = prefix + '\uffff';
+        let lo = 0, hi = this.shards.length;
+        while (lo < hi) {
+            const mid = (lo + hi) >> 1;
+            if (this.shards[mid].last < prefix) lo = mid + 1; else hi = mid;
+        }
+        const selected = [];
+        for (let i = lo; i < this.shards.length && this.shards[i].first <= upper; i++) selected.push(this.shards[i]);
+        return selected;
+    }
+    loadShard(shard) {
+        if (!this.loaded.has(shard.file)) {
+            const promise = fetchJson(this.baseUrl + shard.file).then(data => data.postings || {});
+            promise.catch(() => this.loaded.delete(shard.file));
+            this.loaded.set(shard.file, promise);
+        }
+        return this.loaded.get(shard.file);
+    }
+    // 返回所有以 prefix 开头的词项对应的 文档ID -> BM25 分数 (同一篇论文匹配多个词项时取最高分)
+    async scoresForPrefix(prefix) {
+        const shards = await Promise.all(this.shardsForPrefix(prefix).map(shard => this.loadShard(shard)));
+        const scores = new Map();
+        for (const postings of shards) {
+            for (const key in postings) {
+                if (!key.startsWith(prefix)) continue;
+                const { docIds, impacts } = decodeScoredPostings(postings[key]);
+                const idf = bm25Idf(this.cappedTerms.get(key) || docIds.length, this.docCount);
+                for (let i = 0; i < docIds.length; i++) {
+                    const score = idf * impacts[i] / IMPACT_LEVELS;
+                    if (score > (scores.get(docIds[i]) || 0)) scores.set(docIds[i], score);
+                }
+            }
+        }
+        return scores;
+    }
+    // 逐个查询词项计算分数，倒排表被截断的常见二元组标记为可选词项
+    async termScores(query) {
+        const terms = queryTerms(query, this.stopTerms);
+        const scores = await Promise.all(terms.map(term => this.scoresForPrefix(term)));
+        return terms.map((term, i) => ({ scores: scores[i], optional: this.cappedTerms.has(term) }));
+    }
+}
+
+// term_blocks.json: 前缀压缩的分块词典，用于搜索框自动补全 (格式见 autocomplete.py)
+class TermDictionary {
+    constructor(manifest, baseUrl = './data/') {
+        this.blocks = manifest.blocks || [];
+        this.k = manifest.k || 10;
+        this.baseUrl = baseUrl;
+        this.loaded = new Map();
+    }
+    // 第一个末词项 >= prefix 的块：以 prefix 开头的词项从这个块开始
+    blockForPrefix(prefix) {
+        let lo = 0, hi = this.blocks.length;
+        while (lo < hi) {
+            const mid = (lo + hi) >> 1;
+            if (this.blocks[mid].last < prefix) lo = mid + 1; else hi = mid;
+        }
+        return this.blocks[lo];
+    }
+    loadBlock(block) {
+        if (!this.loaded.has(block.file)) {
+            const promise = fetchJson(this.baseUrl + block.file);
+            promise.catch(() => this.loaded.delete(block.file));
+            this.loaded.set(block.file, promise);
+        }
+        return this.loaded.get(block.file);
+    }
+    // 返回以 prefix 开头、文档频率最高的 k 个 [词项, 文档频率] (与 autocomplete.py 中的 complete 一致)
+    async complete(prefix, k = this.k) {
+        const block = prefix ? this.blockForPrefix(prefix) : null;
+        if (!block) return [];
+        const data = await this.loadBlock(block);
+        const completions = [];
+        if (Object.prototype.hasOwnProperty.call(data.top, prefix)) {
+            const top = data.top[prefix];
+            for (let i = 0; i < top.length; i += 2) completions.push([top[i], top[i + 1]]);
+            return completions.slice(0, k);
+        }
+        let previous = '';
+        for (let i = 0; i < data.terms.length; i += 3) {
+            previous = previous.slice(0, data.terms[i]) + data.terms[i + 1];
+            if (previous.startsWith(prefix)) completions.push([previous, data.terms[i + 2]]);
+        }
+        return completions.sort((a, b) => b[1] - a[1] || (a[0] < b[0] ? -1 : a[0] > b[0] ? 1 : 0)).slice(0, k);
+    }
+}
+
+// 必选词项之间取交集并累加分数，可选词项只为已匹配的文档加分，全部是可选词项时取并集；
+// 返回按分数降序的前 k 个 [文档ID, 分数] (与 ranking.py 中的 rank 一致)
+function rankDocuments(termScores, k) {
+    let required = null;
+    const optional = new Map();
+    for (const { scores, optional: isOptional } of termScores) {
+        if (isOptional) {
+            for (const [docId, score] of scores) optional.set(docId, (optional.get(docId) || 0) + score);
+        } else if (required === null) {
+            required = new Map(scores);
+        } else {
+            const next = new Map();
+            for (const [docId, score] of scores) if (required.has(docId)) next.set(docId, required.get(docId) + score);
+            required = next;
+        }
+    }
+    let total = optional;
+    if (required !== null) {
+        total = new Map();
+        for (const [docId, score] of required) total.set(docId, score + (optional.get(docId) || 0));
+    }
+    return [...total].sort((a, b) => b[1] - a[1] || a[0] - b[0]).slice(0, k);
+}
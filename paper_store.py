@@ -0,0 +1,370 @@
+"""
+全部论文的 SQLite 汇总库，把 data/ 下按天存放、大量重复的 JSONL 合并为一份可查询的数据，供各脚本直接读取。
+
+表结构：
+    papers       每篇论文一行 (id 唯一)，保存原始记录 (不含 AI 字段)。同一篇论文出现多次时与 build_database.py 一致，
+                 保留 updated 最新的版本，相同时保留列表日期较晚的版本，再相同时以增强后的文件为准
+    listings     (论文ID, 列表日期, 源文件, 在源文件中的位置)，按日期建索引；同一天既有原始文件又有增强后的文件时取后者中的位置
+    categories   (论文ID, 分类, 源文件)，收录论文各次出现的全部分类，按分类建索引
+    ai_results   (论文ID, 语言, 源文件) 的 AI 增强结果，保留对应的原始记录以便判断版本是否变化；
+                 读取时完整有效 (complete) 的结果优先于缺字段或失败的结果，其次取 updated 最新的版本
+    papers_fts   FTS5 全文索引：英文标题、摘要、关键词，以及中文字段 (标题翻译、摘要翻译、TL;DR、关键词) 的汉字二元组
+    sources      已导入的源文件的指纹，导入是增量的，未变化的文件直接跳过
+listings、categories 与 ai_results 的每一行都记录来自哪个源文件：重新导入变化了的源文件时先删除它原有的行，
+不再出现在任何源文件中的论文随之删除。papers 中的记录只会被更新的版本取代，源文件改回旧版本时需要 --full 重新导入。
+
+JSONL 文件 (以及已归档月份的归档，见 archive.py) 仍然是提交到仓库的原始数据，数据库保存在 .cache 中，可以随时由它们重新导入：
+    python paper_store.py ingest [--full]
+    python paper_store.py search "diffusion" --category cs.CV --since 2025-05-01 --until 2025-05-31
+"""
+import argparse
+import json
+import os
+import sqlite3
+
+from ai.reuse import AI_FIELDS, is_enhancement_valid
+from archive import DATA_DIR, SOURCE_RE, list_sources, read_source
+from build_database import file_fingerprint
+from ranking import cjk_bigrams, is_cjk_bigram, query_terms
+
+STORE_PATH = os.environ.get("PAPER_STORE_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "papers.sqlite")
+# 全文检索各列的 BM25 权重，与 ranking.py 中的 FIELD_WEIGHTS 对应
+FTS_WEIGHTS = (3.0, 1.0, 2.0, 1.0)
+# 表结构变化时递增，旧版本的数据库在打开时清空重建 (它只是 JSONL 的缓存)
+SCHEMA_VERSION = 2
+TABLES = ("sources", "papers", "listings", "categories", "ai_results", "papers_fts")
+# 每篇论文在 ai_results 中的多个结果里取哪一个：完整的优先，其次 updated、列表日期最新，最后取文件名较大的源文件
+AI_ORDER = "complete DESC, updated DESC, listed DESC, source DESC"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS papers (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    updated TEXT NOT NULL,
+    listed TEXT NOT NULL,
+    enhanced INTEGER NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS listings (
+    paper_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    source TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (paper_id, date, source)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS listings_date ON listings (date, position);
+CREATE INDEX IF NOT EXISTS listings_source ON listings (source);
+CREATE TABLE IF NOT EXISTS categories (
+    paper_id TEXT NOT NULL,
+    category TEXT NOT NULL,
+    source TEXT NOT NULL,
+    PRIMARY KEY (paper_id, category, source)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS categories_category ON categories (category, paper_id);
+CREATE INDEX IF NOT EXISTS categories_source ON categories (source);
+CREATE TABLE IF NOT EXISTS ai_results (
+    paper_id TEXT NOT NULL,
+    language TEXT NOT NULL,
+    source TEXT NOT NULL,
+    complete INTEGER NOT NULL,
+    updated TEXT NOT NULL,
+    listed TEXT NOT NULL,
+    record TEXT NOT NULL,
+    ai TEXT NOT NULL,
+    PRIMARY KEY (paper_id, language, source)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ai_results_source ON ai_results (source);
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(title, abstract, keywords, zh);
+"""
+
+
+def record_categories(record):
+    return record.get("categories") or ([record["cate"]] if record.get("cate") else [])
+
+
+def fts_query(query):
+    """把搜索词转换为 FTS5 查询：与网站搜索相同的切分方式，英文词项和单个汉字按前缀匹配，各词项之间取交集。"""
+    parts = []
+    for term in query_terms(query):
+        phrase = '"' + term.replace('"', '""') + '"'
+        parts.append(phrase if is_cjk_bigram(term) else phrase + "*")
+    return " AND ".join(parts)
+
+
+class PaperStore:
+    """data/ 下全部 JSONL 的汇总库。"""
+
+    def __init__(self, path=STORE_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            with self.conn:
+                for table in TABLES:
+                    self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+        self.conn.executescript(SCHEMA)
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.commit()
+
+    # --- 导入 ---
+
+    def ingest_dir(self, data_dir=DATA_DIR, full=False):
+        """
+        增量导入 data_dir 下的每日文件 (YYYY-MM-DD.jsonl 与 YYYY-MM-DD_AI_enhanced_<语言>.jsonl)，
+        包括已归档月份中的这些文件；已不存在的源文件的数据随之删除。返回 (导入的文件数, 跳过的文件数)。
+        """
+        if full:
+            self.clear()
+        sources = list_sources(data_dir)
+        for (name,) in self.conn.execute("SELECT path FROM sources").fetchall():
+            if name not in sources:
+                with self.conn:
+                    self._reindex(self._remove_source(name))
+                    self.conn.execute("DELETE FROM sources WHERE path = ?", (name,))
+        ingested = 0
+        for name, path in sources.items():
+            if self.ingest_source(name, path):
+                ingested += 1
+        return ingested, len(sources) - ingested
+
+    def ingest_file(self, path):
+        """导入一个每日文件，见 ingest_source。"""
+        return self.ingest_source(os.path.basename(path), path)
+
+    def ingest_source(self, name, path):
+        """
+        导入源文件 name (位于 path，每日文件本身或月份归档)；所在文件自上次导入以来没有变化时直接跳过，返回是否导入。
+        在同一个事务中先删除这个源文件上次导入的行，再导入它现在的内容。
+        所有源文件都在同一个数据目录中，以文件名为键，与从哪个目录运行脚本无关。
+        """
+        match = SOURCE_RE.fullmatch(name)
+        if not match:
+            raise ValueError(f"无法从文件名 {name} 中识别日期")
+        listed, language = match.groups()
+        row = self.conn.execute("SELECT size, mtime_ns, sha256 FROM sources WHERE path = ?", (name,)).fetchone()
+        previous = dict(zip(("size", "mtime_ns", "sha256"), row)) if row else None
+        fingerprint = file_fingerprint(path, previous)
+        if previous == fingerprint:
+            return False
+        if previous and previous["sha256"] == fingerprint["sha256"]:
+            # 内容未变，只是修改时间变了 (如重新检出仓库)
+            self._record_source(name, fingerprint)
+            return False
+
+        with self.conn:
+            touched = self._remove_source(name)
+            for position, record in enumerate(read_source(name, path)):
+                if not isinstance(record, dict) or not record.get("id"):
+                    continue
+                self._add(record, name, listed, position, language)
+                touched.add(record["id"])
+            self._reindex(touched)
+            self._record_source(name, fingerprint)
+        return True
+
+    def _remove_source(self, name):
+        """删除源文件 name 导入的列表、分类和 AI 结果，返回涉及的论文ID。"""
+        paper_ids = {paper_id for (paper_id,) in self.conn.execute("SELECT paper_id FROM listings WHERE source = ?", (name,))}
+        for table in ("listings", "categories", "ai_results"):
+            self.conn.execute(f"DELETE FROM {table} WHERE source = ?", (name,))
+        return paper_ids
+
+    def _reindex(self, paper_ids):
+        """删除这些论文中已不在任何源文件中的论文，重建其余论文的全文索引。"""
+        orphans = set()
+        for paper_id in paper_ids:
+            if self.conn.execute("SELECT 1 FROM listings WHERE paper_id = ? LIMIT 1", (paper_id,)).fetchone() is None:
+                orphans.add(paper_id)
+                self.conn.execute("DELETE FROM papers_fts WHERE rowid = (SELECT rowid FROM papers WHERE id = ?)", (paper_id,))
+                self.conn.execute("DELETE FROM papers WHERE id = ?", (paper_id,))
+        self._index(paper_ids - orphans)
+
+    def _record_source(self, key, fingerprint):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sources (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+                (key, fingerprint["size"], fingerprint["mtime_ns"], fingerprint["sha256"]),
+            )
+
+    def _add(self, record, source, listed, position, language):
+        paper_id = record["id"]
+        ai = record.pop("AI", None)
+        updated = record.get("updated") or listed
+        text = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        enhanced = language is not None
+        self.conn.execute(
+            "INSERT INTO papers (id, updated, listed, enhanced, record) VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT (id) DO UPDATE SET"
+            " updated = excluded.updated, listed = excluded.listed, enhanced = excluded.enhanced, record = excluded.record"
+            " WHERE (excluded.updated, excluded.listed, excluded.enhanced) >= (papers.updated, papers.listed, papers.enhanced)",
+            (paper_id, updated, listed, enhanced, text),
+        )
+        # 同一篇论文在一个文件中出现多次时，原始文件取第一次的位置，增强后的文件取最后一次的位置
+        self.conn.execute(
+            f"INSERT OR {'REPLACE' if enhanced else 'IGNORE'} INTO listings (paper_id, date, source, position) VALUES (?, ?, ?, ?)",
+            (paper_id, listed, source, position),
+        )
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO categories (paper_id, category, source) VALUES (?, ?, ?)",
+            [(paper_id, category, source) for category in record_categories(record)],
+        )
+        if language and isinstance(ai, dict):
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ai_results (paper_id, language, source, complete, updated, listed, record, ai)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (paper_id, language, source, is_enhancement_valid(ai, AI_FIELDS), updated, listed, text,
+                 json.dumps(ai, ensure_ascii=False, separators=(',', ':'))),
+            )
+
+    def _index(self, paper_ids):
+        """重建这些论文的全文索引行 (rowid 与 papers 表一致)，AI 字段取各语言的结果。"""
+        for paper_id in paper_ids:
+            rowid, record = self.conn.execute("SELECT rowid, record FROM papers WHERE id = ?", (paper_id,)).fetchone()
+            record = json.loads(record)
+            keywords, zh = [], []
+            best = {}
+            for language, ai in self.conn.execute(f"SELECT language, ai FROM ai_results WHERE paper_id = ? ORDER BY language, {AI_ORDER}", (paper_id,)):
+                best.setdefault(language, ai)
+            for ai in best.values():
+                ai = json.loads(ai)
+                keywords.append(ai.get("keywords") or "")
+                for field in ("title_translation", "translation", "tldr", "keywords"):
+                    zh.extend(cjk_bigrams(ai.get(field) if isinstance(ai.get(field), str) else ""))
+            self.conn.execute("DELETE FROM papers_fts WHERE rowid = ?", (rowid,))
+            self.conn.execute(
+                "INSERT INTO papers_fts (rowid, title, abstract, keywords, zh) VALUES (?, ?, ?, ?, ?)",
+                (rowid, record.get("title") or "", record.get("summary") or "", " ".join(keywords), " ".join(zh)),
+            )
+
+    def clear(self):
+        with self.conn:
+            for table in TABLES:
+                self.conn.execute(f"DELETE FROM {table}")
+
+    # --- 读取 ---
+
+    def _with_ai(self, rows, language):
+        """(论文ID, 原始记录) -> 与 JSONL 中相同形式的记录，有 language 的 AI 结果时放在 AI 字段中。"""
+        rows = list(rows)
+        ai = {}
+        if language and rows:
+            for start in range(0, len(rows), 500):
+                chunk = [paper_id for paper_id, _ in rows[start:start + 500]]
+                ai.update(self.conn.execute(
+                    f"SELECT paper_id, ai FROM (SELECT paper_id, ai, ROW_NUMBER() OVER (PARTITION BY paper_id ORDER BY {AI_ORDER}) AS n"
+                    f" FROM ai_results WHERE language = ? AND paper_id IN ({','.join('?' * len(chunk))})) WHERE n = 1",
+                    (language, *chunk),
+                ))
+        records = []
+        for paper_id, record in rows:
+            record = json.loads(record)
+            if paper_id in ai:
+                record["AI"] = json.loads(ai[paper_id])
+            records.append(record)
+        return records
+
+    def get(self, paper_id, language=None):
+        rows = self.conn.execute("SELECT id, record FROM papers WHERE id = ?", (paper_id,)).fetchall()
+        records = self._with_ai(rows, language)
+        return records[0] if records else None
+
+    def listed_on(self, date, language=None):
+        """某一天列表中的论文，按当天文件中的顺序 (有增强后的文件时取其中的位置)。"""
+        # 增强后的文件名 (YYYY-MM-DD_AI_enhanced_<语言>.jsonl) 排在同一天的原始文件 (YYYY-MM-DD.jsonl) 之后
+        rows = self.conn.execute(
+            "SELECT id, record FROM (SELECT p.id, p.record, l.position,"
+            " ROW_NUMBER() OVER (PARTITION BY l.paper_id ORDER BY l.source DESC) AS n"
+            " FROM listings l JOIN papers p ON p.id = l.paper_id WHERE l.date = ?) WHERE n = 1 ORDER BY position",
+            (date,),
+        )
+        return self._with_ai(rows, language)
+
+    def enhancements(self, paper_ids, language):
+        """已有的完整 AI 增强结果：{论文ID: 增强时的记录 (含 AI 字段)}，用于跨日复用。"""
+        paper_ids = list(paper_ids)
+        found = {}
+        for start in range(0, len(paper_ids), 500):
+            chunk = paper_ids[start:start + 500]
+            for paper_id, record, ai in self.conn.execute(
+                f"SELECT paper_id, record, ai FROM (SELECT paper_id, record, ai, ROW_NUMBER() OVER (PARTITION BY paper_id ORDER BY {AI_ORDER}) AS n"
+                f" FROM ai_results WHERE language = ? AND complete AND paper_id IN ({','.join('?' * len(chunk))})) WHERE n = 1",
+                (language, *chunk),
+            ):
+                found[paper_id] = dict(json.loads(record), AI=json.loads(ai))
+        return found
+
+    def search(self, query=None, category=None, since=None, until=None, language=None, limit=100):
+        """
+        按全文、分类和列表日期范围查询论文。有 query 时按 BM25 相关度排序，否则按列表日期从新到旧。
+        例如上个月所有提到 diffusion 的 cs.CV 论文：search("diffusion", category="cs.CV", since="2025-05-01", until="2025-05-31")
+        """
+        joins, where, params = [], [], []
+        if query:
+            match = fts_query(query)
+            if not match:
+                return []
+            joins.append("JOIN papers_fts f ON f.rowid = p.rowid")
+            where.append("papers_fts MATCH ?")
+            params.append(match)
+        if category:
+            where.append("EXISTS (SELECT 1 FROM categories c WHERE c.paper_id = p.id AND c.category = ?)")
+            params.append(category)
+        if since or until:
+            where.append("EXISTS (SELECT 1 FROM listings l WHERE l.paper_id = p.id AND l.date BETWEEN ? AND ?)")
+            params.extend((since or "0000-00-00", until or "9999-99-99"))
+        order = f"bm25(papers_fts, {', '.join(map(str, FTS_WEIGHTS))})" if query else "p.listed DESC, p.id"
+        sql = f"SELECT p.id, p.record FROM papers p {' '.join(joins)}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order} LIMIT ?"
+        return self._with_ai(self.conn.execute(sql, (*params, limit)), language)
+
+    def stats(self):
+        """源文件数、论文数、(论文, 日期) 列表记录数和 (论文, 语言) AI 结果数。"""
+        queries = {
+            "sources": "SELECT COUNT(*) FROM sources",
+            "papers": "SELECT COUNT(*) FROM papers",
+            "listings": "SELECT COUNT(*) FROM (SELECT DISTINCT paper_id, date FROM listings)",
+            "ai_results": "SELECT COUNT(*) FROM (SELECT DISTINCT paper_id, language FROM ai_results)",
+        }
+        return {name: self.conn.execute(sql).fetchone()[0] for name, sql in queries.items()}
+
+    def close(self):
+        self.conn.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="论文汇总库 (SQLite/FTS5)。")
+    parser.add_argument("--store", default=STORE_PATH, help="数据库文件路径")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    ingest = subparsers.add_parser("ingest", help="导入 data 目录下的 JSONL 文件")
+    ingest.add_argument("--data", default=DATA_DIR, help="数据目录")
+    ingest.add_argument("--full", action="store_true", help="清空后重新导入全部文件")
+    search = subparsers.add_parser("search", help="查询论文")
+    search.add_argument("query", nargs="?", help="全文检索词")
+    search.add_argument("--category", help="分类，如 cs.CV")
+    search.add_argument("--since", help="最早的列表日期 (YYYY-MM-DD)")
+    search.add_argument("--until", help="最晚的列表日期 (YYYY-MM-DD)")
+    search.add_argument("--limit", type=int, default=20)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    store = PaperStore(args.store)
+    if args.command == "ingest":
+        ingested, skipped = store.ingest_dir(args.data, full=args.full)
+        stats = store.stats()
+        print(f"导入 {ingested} 个文件，跳过 {skipped} 个未变化的文件。共 {stats['papers']} 篇论文，{stats['listings']} 条列表记录，{stats['ai_results']} 条AI结果。")
+    else:
+        for record in store.search(args.query, args.category, args.since, args.until, limit=args.limit):
+            print(f"{record['id']}\t{record.get('title', '')}")
+    store.close()
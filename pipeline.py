@@ -0,0 +1,255 @@
+"""
+每日数据处理流程：抓取 -> AI 增强 -> [归档已结束的月份] -> 构建网站数据 -> 生成报告 -> 更新 README。
+
+各阶段在同一个进程中依次运行 (抓取除外，见 fetch)，重量级依赖只在阶段真正运行时才导入；
+增强后的论文和报告摘要经由 ctx 传给后续阶段，不再从文件读回 (这些阶段被跳过时才读取文件)。
+归档会删除每日文件，只在指定 --compact 时运行。
+每个阶段声明自己的输入与输出文件，像 make 一样：输出都存在且不早于任何输入时跳过这个阶段，
+因此某个阶段失败后重新运行，前面已经完成的阶段不再有任何开销。
+每次运行把各阶段的状态、耗时和峰值内存追加到运行日志 (.cache/pipeline/runs.jsonl)，每个阶段一行：
+    {"run": 运行开始时间, "date": 报告日期, "stage": 阶段名, "status": "ran" | "skipped" | "failed",
+     "seconds": 耗时, "peak_rss_mb": 峰值内存 (包括阶段中结束的子进程), "error": 失败原因}
+
+    python pipeline.py [--date YYYY-MM-DD] [--force [阶段 ...]] [--compact] [--dry-run]
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = "data"
+RUN_LOG_PATH = os.path.join(".cache", "pipeline", "runs.jsonl")
+PAPER_TEMPLATE_PATH = os.path.join("to_md", "paper_template.md")
+README_TEMPLATE_PATH = "readme_content_template.md"
+LANGUAGE = os.environ.get("LANGUAGE", "Chinese")
+
+
+# --- 峰值内存 ---
+
+def reset_peak_rss():
+    """把本进程的峰值内存 (VmHWM) 重置为当前值 (Linux 4.0+)，不支持时返回 False，峰值改为整个进程的历史峰值。"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """返回 (本进程的峰值内存, 已结束的子进程中最大的峰值内存)，单位 MB。"""
+    self_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    self_peak = int(line.split()[1]) / 1024
+                    break
+    except OSError:
+        pass
+    return self_peak, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+
+# --- 各阶段 ---
+
+class Stage:
+    """
+    一个阶段：inputs/outputs 返回输入和输出文件的路径列表，run 执行阶段。
+    pending 给出时代替按修改时间的比较，返回这个阶段是否还有工作要做。optional 的阶段只在明确指定时运行。
+    """
+
+    def __init__(self, name, run, inputs=None, outputs=None, pending=None, optional=False):
+        self.name = name
+        self.run = run
+        self.inputs = inputs or (lambda ctx: [])
+        self.outputs = outputs or (lambda ctx: [])
+        self.pending = pending
+        self.optional = optional
+
+    def is_stale(self, ctx):
+        if self.pending is not None:
+            return self.pending(ctx)
+        outputs = self.outputs(ctx)
+        if not outputs or not all(os.path.exists(path) for path in outputs):
+            return True
+        inputs = [path for path in self.inputs(ctx) if os.path.exists(path)]
+        if not inputs:
+            return False
+        return min(os.path.getmtime(path) for path in outputs) < max(os.path.getmtime(path) for path in inputs)
+
+
+def raw_path(ctx):
+    return os.path.join(DATA_DIR, f"{ctx['date']}.jsonl")
+
+
+def enhanced_path(ctx):
+    return os.path.join(DATA_DIR, f"{ctx['date']}_AI_enhanced_{LANGUAGE}.jsonl")
+
+
+def report_path(ctx):
+    return os.path.join(DATA_DIR, f"{ctx['date']}.md")
+
+
+def fetch(ctx):
+    """
+    抓取当天的论文。Scrapy 的 Twisted reactor 在一个进程中只能启动一次，且依赖 scrapy.cfg 所在目录，
+    因此这一阶段仍在子进程中运行；先写入临时文件，成功后再改名，中途失败不会留下看似完整的输出。
+    """
+    output = os.path.abspath(raw_path(ctx))
+    tmp_path = output + ".tmp"
+    subprocess.run(["scrapy", "crawl", "arxiv", "-O", f"{tmp_path}:jsonlines"], cwd="daily_arxiv", check=True)
+    os.replace(tmp_path, output)
+
+
+def enhance(ctx):
+    # enhance.py 以 ai/ 目录为模块搜索路径
+    sys.path.insert(0, os.path.join(ROOT, "ai"))
+    import enhance as enhance_module
+
+    ctx["records"] = enhance_module.main(["--data", raw_path(ctx), "--resume"])
+
+
+def compact_pending(ctx):
+    from archive import closed_months
+
+    ctx["closed_months"] = closed_months(DATA_DIR, ctx["date"][:7])
+    return bool(ctx["closed_months"])
+
+
+def compact(ctx):
+    from archive import compact as compact_month
+
+    for month in ctx["closed_months"]:
+        source_count, paper_count, variant_count = compact_month(DATA_DIR, month)
+        print(f"归档月份 {month}: {source_count} 个源文件，{paper_count} 篇论文，{variant_count} 个变体。")
+
+
+def source_files(ctx):
+    """全部源文件所在的文件 (每日文件与月份归档)。"""
+    from archive import list_sources
+
+    return sorted(set(list_sources(DATA_DIR).values()))
+
+
+def build(ctx):
+    from build_database import build_database_from_jsonl
+
+    build_database_from_jsonl(jobs=os.cpu_count() or 1)
+
+
+def build_outputs(ctx):
+    from build_database import MANIFEST_PATH
+
+    # 构建清单在每次构建结束时重写；发布的 index.json 内容不变时不会重写，不能用来判断是否最新
+    return [MANIFEST_PATH]
+
+
+def report(ctx):
+    from to_md.convert import compile_template, load_template, write_report
+
+    data = ctx.get("records")
+    if data is None:
+        # 增强阶段已是最新而被跳过
+        from archive import read_source
+
+        path = enhanced_path(ctx)
+        data = [record for record in read_source(os.path.basename(path), path) if record is not None]
+    summary = write_report(report_path(ctx), data, compile_template(load_template(PAPER_TEMPLATE_PATH)), ctx["date"])
+    ctx["summaries"] = {ctx["date"]: summary}
+    print(f"成功将 {len(data)} 篇论文转换为Markdown，并保存到 {report_path(ctx)}")
+
+
+def readme_inputs(ctx):
+    return [README_TEMPLATE_PATH] + glob.glob(os.path.join(DATA_DIR, "*.md")) + glob.glob(os.path.join(DATA_DIR, "*.summary.json"))
+
+
+def readme(ctx):
+    import update_readme
+
+    update_readme.main(ctx.get("summaries"))
+
+
+STAGES = [
+    Stage("fetch", fetch, outputs=lambda ctx: [raw_path(ctx)]),
+    Stage("enhance", enhance, inputs=lambda ctx: [raw_path(ctx)], outputs=lambda ctx: [enhanced_path(ctx)]),
+    Stage("compact", compact, pending=compact_pending, optional=True),
+    Stage("build", build, inputs=source_files, outputs=build_outputs),
+    Stage("report", report, inputs=lambda ctx: [enhanced_path(ctx), PAPER_TEMPLATE_PATH], outputs=lambda ctx: [report_path(ctx)]),
+    Stage("readme", readme, inputs=readme_inputs, outputs=lambda ctx: ["README.md"]),
+]
+STAGE_NAMES = [stage.name for stage in STAGES]
+
+
+def append_run_log(entry):
+    os.makedirs(os.path.dirname(RUN_LOG_PATH), exist_ok=True)
+    with open(RUN_LOG_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def run_pipeline(date_str, force=(), dry_run=False, enable=()):
+    """按顺序运行各阶段，force 中的阶段忽略是否最新，optional 的阶段只在 enable 或 force 中时运行。返回是否全部成功。"""
+    ctx = {"date": date_str}
+    started = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    for stage in STAGES:
+        if stage.optional and stage.name not in enable and stage.name not in force:
+            continue
+        entry = {"run": started, "date": date_str, "stage": stage.name}
+        if stage.name not in force and not stage.is_stale(ctx):
+            print(f"[{stage.name}] 已是最新，跳过。")
+            if not dry_run:
+                append_run_log(dict(entry, status="skipped", seconds=0))
+            continue
+        if dry_run:
+            print(f"[{stage.name}] 需要运行。")
+            continue
+
+        print(f"[{stage.name}] 开始...")
+        reset_peak_rss()
+        _, children_before = peak_rss_mb()
+        start = time.perf_counter()
+        error = None
+        try:
+            stage.run(ctx)
+            missing = [path for path in stage.outputs(ctx) if not os.path.exists(path)]
+            if missing:
+                error = f"阶段没有生成输出文件: {', '.join(missing)}"
+        except (Exception, SystemExit) as e:
+            error = f"{type(e).__name__}: {e}"
+        seconds = time.perf_counter() - start
+        self_peak, children_peak = peak_rss_mb()
+        # 子进程 (抓取、进程池) 的峰值只能取所有已结束子进程中的最大值，只有在本阶段中增大时才计入
+        peak = max(self_peak, children_peak if children_peak > children_before else 0)
+        entry.update(status="failed" if error else "ran", seconds=round(seconds, 3), peak_rss_mb=round(peak, 1))
+        if error:
+            entry["error"] = error
+        append_run_log(entry)
+        print(f"[{stage.name}] {'失败' if error else '完成'}: {seconds:.1f} 秒，峰值内存 {peak:.0f} MB。")
+        if error:
+            print(f"[{stage.name}] {error}", file=sys.stderr)
+            return False
+    return True
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="运行每日数据处理流程，跳过已是最新的阶段。")
+    parser.add_argument("--date", default=datetime.now(timezone.utc).strftime("%Y-%m-%d"), help="报告日期 (默认为当天的 UTC 日期)")
+    parser.add_argument("--force", nargs="*", choices=STAGE_NAMES, help="强制运行这些阶段 (不指定阶段时为全部阶段)")
+    parser.add_argument("--compact", action="store_true", help="把已经结束的月份归档 (会删除这些月份的每日文件，见 archive.py)")
+    parser.add_argument("--dry-run", action="store_true", help="只列出需要运行的阶段")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    # 不指定阶段的 --force 只强制默认运行的阶段，归档仍需 --compact
+    force = [stage.name for stage in STAGES if not stage.optional] if args.force == [] else (args.force or [])
+    enable = ["compact"] if args.compact else []
+    sys.exit(0 if run_pipeline(args.date, force, args.dry_run, enable) else 1)
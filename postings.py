@@ -0,0 +1,118 @@
+"""
+倒排表的紧凑编码，由 build_database.py 写出，docs/postings.js 在浏览器中解码。
+
+docs.json 是文档表 (发布到 docs/data 时文件名带有内容哈希，见 publish.py)：
+    {"months": ["2025-03", ...], "ids": ["2503.12345", ...], "month": [0, ...]}
+整数文档ID (docid) 就是数组下标：ids[docid] 是 arXiv ID，months[month[docid]] 是该论文所在的月份分片。
+docid 按 arXiv ID 排序分配，因此按 arXiv ID 排好序的倒排表同样按 docid 升序。
+
+category_index.json：
+    {"format": "delta-varint-base64", "docCount": N, "postings": {词项: 编码后的倒排表}}
+每个搜索索引分片 search/search-NNNN.json 的倒排表同时带有用于排序的逐篇权重 (见 ranking.py)：
+    {"format": "count-delta-varint-impact-base64", "postings": {词项: 编码后的倒排表}}
+search_shards.json 是搜索索引的分片清单，分片按词项排序、首尾相接：
+    {"format": ..., "docCount": N, "stopTerms": [...], "cappedTerms": {词项: 文档频率},
+     "shards": [{"file": ..., "first": 首词项, "last": 末词项, "bytes": ...}]}
+    stopTerms 是不进入索引的中文停用二元组；cappedTerms 是倒排表被截断的常见二元组及其完整的文档频率，
+    其余词项的文档频率就是倒排表的长度，idf 由文档频率与 docCount 算出。
+倒排表的编码方式：
+    1. docid 升序排列，依次写入与前一个 docid 的差值 (第一个值与 0 相减，即原值)；
+    2. 每个差值使用无符号 LEB128 varint 编码：每字节低 7 位存数据 (低位在前)，
+       最高位为 1 表示后面还有字节；
+    3. 搜索索引分片在最前面多写一个 varint 表示篇数，并在差值之后为每篇追加一个字节的量化 BM25F 权重
+       (impact, 1..255)，顺序与 docid 相同；
+    4. 得到的字节串用标准 base64 (带 = 填充) 编码为 JSON 字符串。
+"""
+import base64
+import bisect
+
+FORMAT = "delta-varint-base64"
+SCORED_FORMAT = "count-delta-varint-impact-base64"
+
+
+def _append_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _append_deltas(out, doc_ids):
+    previous = 0
+    first = True
+    for doc_id in doc_ids:
+        delta = doc_id - previous
+        if delta < 0 or (delta == 0 and not first):
+            raise ValueError("docid 必须严格升序")
+        previous = doc_id
+        first = False
+        if delta < 0x80:
+            out.append(delta)
+        else:
+            _append_varint(out, delta)
+
+
+def _read_varint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def encode_postings(doc_ids):
+    """把升序的 docid 列表编码为字符串。"""
+    out = bytearray()
+    _append_deltas(out, doc_ids)
+    return base64.b64encode(bytes(out)).decode('ascii')
+
+
+def decode_postings(text):
+    """encode_postings 的逆过程，返回升序的 docid 列表 (参考实现，与 docs/postings.js 一致)。"""
+    data = base64.b64decode(text)
+    doc_ids = []
+    previous = 0
+    pos = 0
+    while pos < len(data):
+        delta, pos = _read_varint(data, pos)
+        previous += delta
+        doc_ids.append(previous)
+    return doc_ids
+
+
+def encode_scored_postings(doc_ids, impacts):
+    """把升序的 docid 列表与对应的 impact (1..255) 编码为一个字符串。"""
+    out = bytearray()
+    _append_varint(out, len(doc_ids))
+    _append_deltas(out, doc_ids)
+    out += bytes(impacts)
+    return base64.b64encode(bytes(out)).decode('ascii')
+
+
+def decode_scored_postings(text):
+    """encode_scored_postings 的逆过程，返回 (docid 列表, impact 列表)。"""
+    data = base64.b64decode(text)
+    count, pos = _read_varint(data, 0)
+    doc_ids = []
+    previous = 0
+    for _ in range(count):
+        delta, pos = _read_varint(data, pos)
+        previous += delta
+        doc_ids.append(previous)
+    return doc_ids, list(data[pos:pos + count])
+
+
+def shards_for_prefix(shards, prefix):
+    """返回可能包含以 prefix 开头的词项的分片 (与 docs/postings.js 中的 ShardedIndex.shardsForPrefix 一致)。"""
+    upper = prefix + "\uffff"
+    start = bisect.bisect_left([shard["last"] for shard in shards], prefix)
+    selected = []
+    for shard in shards[start:]:
+        if shard["first"] > upper:
+            break
+        selected.append(shard)
+    return selected
@@ -0,0 +1,153 @@
+"""
+把 build_database.py 在构建目录中生成的数据发布到网站目录 docs/data。
+
+每个数据文件 (月份分片、文档表、分类索引、搜索索引分片、自动补全词典的块以及它们的清单) 都以
+压缩空白的 JSON 写出，文件名中带有内容哈希，例如 database-2025-06.3f2a9c0d1e4b.json，
+同时写出 .gz 和 .br 两种预压缩版本，供支持的服务器/CDN 直接返回。
+内容不变则文件名不变，已经存在的文件不会重写，因此浏览器与 CDN 可以永久缓存它们。
+
+唯一不带哈希的是入口清单 index.json，其中的 files 给出逻辑文件名到发布文件名的映射：
+    {"availableMonths": [...], "totalPaperCount": N, "files": {"docs.json": "docs.<hash>.json", ...}}
+search_shards.json、term_blocks.json 与 details-YYYY-MM.json 中各分片/块/桶的 file 字段同样改写为发布后的文件名。
+
+所有文件都先写入临时文件再原子替换。上一次发布的文件会保留一轮，
+让仍持有旧 index.json 的页面可以继续加载，更早的文件会被删除。
+    python publish.py
+"""
+import fnmatch
+import gzip
+import hashlib
+import json
+import os
+
+import brotli
+
+PUBLISH_DIR = "docs/data"
+HASH_LENGTH = 12
+COMPRESSED_SUFFIXES = (".gz", ".br")
+# brotli 的最高质量 (11) 压缩月份分片要慢 20 倍左右，体积只小不到 10%
+BROTLI_QUALITY = 9
+# 引用了其他数据文件的清单：清单文件名 (通配符) -> 引用列表所在的字段
+REFERENCING_MANIFESTS = {"search_shards.json": "shards", "term_blocks.json": "blocks", "details-*.json": "buckets"}
+
+
+def minify(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def write_bytes_atomic(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def compress(content, suffix):
+    # gzip 固定 mtime，保证相同内容得到相同的字节
+    if suffix == ".gz":
+        return gzip.compress(content, compresslevel=9, mtime=0)
+    return brotli.compress(content, quality=BROTLI_QUALITY)
+
+
+def hashed_name(name, content):
+    base, ext = os.path.splitext(name)
+    return f"{base}.{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}{ext}"
+
+
+class Publisher:
+    """把内容写到 publish_dir 下带哈希的文件名，并记录本次发布涉及的全部文件。"""
+
+    def __init__(self, publish_dir):
+        self.publish_dir = publish_dir
+        self.live = set()
+        self.written = 0
+        self.reused = 0
+
+    def put(self, name, content):
+        """发布 name 的内容，返回发布后的文件名 (相对于 publish_dir)。"""
+        published = hashed_name(name, content)
+        path = os.path.join(self.publish_dir, published)
+        if os.path.exists(path) and all(os.path.exists(path + suffix) for suffix in COMPRESSED_SUFFIXES):
+            self.reused += 1
+        else:
+            # 压缩版本先写，主文件最后写：主文件存在即表示这一组文件完整
+            for suffix in COMPRESSED_SUFFIXES:
+                write_bytes_atomic(path + suffix, compress(content, suffix))
+            write_bytes_atomic(path, content)
+            self.written += 1
+        self.live.add(published)
+        self.live.update(published + suffix for suffix in COMPRESSED_SUFFIXES)
+        return published
+
+    def put_if_changed(self, name, content):
+        """发布固定文件名的文件 (index.json)，内容不变时不重写。"""
+        path = os.path.join(self.publish_dir, name)
+        for suffix in ("",) + COMPRESSED_SUFFIXES:
+            data = compress(content, suffix) if suffix else content
+            self.live.add(name + suffix)
+            if os.path.exists(path + suffix):
+                with open(path + suffix, 'rb') as f:
+                    if f.read() == data:
+                        continue
+            write_bytes_atomic(path + suffix, data)
+
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def published_files(publish_dir):
+    """列出 publish_dir 下的全部文件 (相对路径)。"""
+    files = set()
+    for root, _, names in os.walk(publish_dir):
+        for name in names:
+            files.add(os.path.relpath(os.path.join(root, name), publish_dir).replace(os.sep, "/"))
+    return files
+
+
+def publish(site_dir, publish_dir=PUBLISH_DIR, record_path=None):
+    """
+    发布 site_dir 中的全部数据文件，返回 (写出的文件数, 复用的文件数, 删除的文件数)。
+    record_path 记录本次发布的文件列表，下一次发布时这些文件再保留一轮。
+    """
+    publisher = Publisher(publish_dir)
+    files = {}
+    for name in sorted(os.listdir(site_dir)):
+        if not name.endswith(".json") or name == "index.json":
+            continue
+        key = next((key for pattern, key in REFERENCING_MANIFESTS.items() if fnmatch.fnmatch(name, pattern)), None)
+        if key:
+            with open(os.path.join(site_dir, name), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            for entry in manifest[key]:
+                entry["file"] = publisher.put(entry["file"], read_bytes(os.path.join(site_dir, entry["file"])))
+            content = minify(manifest)
+        else:
+            content = read_bytes(os.path.join(site_dir, name))
+        files[name] = publisher.put(name, content)
+
+    with open(os.path.join(site_dir, "index.json"), 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    index["files"] = files
+    publisher.put_if_changed("index.json", minify(index))
+
+    keep = set(publisher.live)
+    if record_path and os.path.exists(record_path):
+        with open(record_path, 'r', encoding='utf-8') as f:
+            keep.update(json.load(f))
+    removed = 0
+    for name in published_files(publish_dir) - keep:
+        os.remove(os.path.join(publish_dir, name))
+        removed += 1
+    if record_path:
+        write_bytes_atomic(record_path, minify(sorted(publisher.live)))
+    return publisher.written, publisher.reused, removed
+
+
+if __name__ == "__main__":
+    from build_database import OUTPUT_DIR, PUBLISH_RECORD_PATH
+
+    written, reused, removed = publish(OUTPUT_DIR, record_path=PUBLISH_RECORD_PATH)
+    print(f"发布到 {PUBLISH_DIR}: 写出 {written} 个文件，复用 {reused} 个，删除 {removed} 个旧文件。")
@@ -0,0 +1,253 @@
+"""
+搜索索引的分词与 BM25 排序。
+
+英文字段按单词索引，中文字段 (AI 生成的标题翻译、摘要翻译、TL;DR 以及关键词) 按相邻汉字二元组索引。
+只起语法作用的二元组 (CJK_STOP_BIGRAMS) 不进入索引；出现在超过 CJK_MAX_POSTINGS 篇论文中的
+常见二元组只保留权重最高的那些论文，查询时作为可选词项 (只参与打分，不参与求交集)。
+
+build_database.py 为每个 (词项, 论文) 预先计算 BM25F 的词频部分，量化为 1..255 的一个字节 (impact)，
+写入搜索索引分片 (格式见 postings.py)；浏览器端由文档频率算出 idf，按
+    score(d) = Σ_查询词 max_以该词为前缀的词项 t idf(t) * impact(t, d) / 255
+对结果排序并取前 k 篇。
+
+ReferenceScorer 直接在原始论文上计算未量化的同一分数，可以用来检验发布的索引：
+    python ranking.py "diffusion model"
+"""
+import json
+import math
+import os
+import re
+import sys
+from operator import mul
+
+# 定义一个简单的英文停用词列表，用于构建搜索索引时忽略这些常见词
+STOP_WORDS = set([
+    "a", "an", "the", "and", "or", "in", "on", "of", "for", "to", "with",
+    "is", "are", "was", "were", "it", "its", "i", "you", "he", "she", "we", "they",
+    "as", "at", "by", "from", "that", "this", "which", "who", "what", "where",
+    "when", "why", "how", "not", "no", "but", "if", "so", "then", "just", "very"
+])
+
+TOKEN_RE = re.compile(r'\b[a-z]{3,}\b')
+CJK_RUN_RE = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+
+# 只起语法作用的常见二元组，不进入索引，查询时忽略
+CJK_STOP_BIGRAMS = frozenset([
+    "我们", "一种", "一个", "了一", "出了", "是一", "中的", "们的", "本文", "文提", "们提",
+    "这些", "这种", "以及", "并且", "此外", "然而", "其中", "从而", "的一", "在这",
+])
+# 常见二元组的倒排表长度上限
+CJK_MAX_POSTINGS = 500
+
+# BM25F 参数：各字段的权重与长度归一化系数
+FIELDS = ("title", "abstract", "keywords", "zh_title", "zh_text")
+FIELD_WEIGHTS = (3.0, 1.0, 2.0, 3.0, 1.0)
+FIELD_B = (0.75, 0.75, 0.5, 0.75, 0.75)
+K1 = 1.2
+IMPACT_LEVELS = 255
+
+
+def cjk_bigrams(text):
+    """把文本中连续的汉字切成相邻二元组 (单个孤立的汉字不索引)，跳过停用二元组。"""
+    bigrams = []
+    for run in CJK_RUN_RE.findall(text or ""):
+        for i in range(len(run) - 1):
+            bigram = run[i:i + 2]
+            if bigram not in CJK_STOP_BIGRAMS:
+                bigrams.append(bigram)
+    return bigrams
+
+
+def is_cjk_bigram(term):
+    return len(term) == 2 and CJK_RUN_RE.fullmatch(term) is not None
+
+
+def field_terms(paper):
+    """返回论文各字段的索引词项列表，顺序与 FIELDS 一致。"""
+    title = [t for t in TOKEN_RE.findall((paper.get("title") or "").lower()) if t not in STOP_WORDS]
+    abstract = [t for t in TOKEN_RE.findall((paper.get("abstract") or "").lower()) if t not in STOP_WORDS]
+    keywords = []
+    for kw in paper.get("keywords") or []:
+        if not kw:
+            continue
+        keywords.append(kw.lower())
+        # 中文关键词同时按二元组索引，这样可以搜到关键词的一部分
+        bigrams = cjk_bigrams(kw)
+        if bigrams != [kw]:
+            keywords.extend(bigrams)
+    zh_title = cjk_bigrams(paper.get("zh_title"))
+    zh_text = cjk_bigrams(paper.get("translation")) + cjk_bigrams(paper.get("tldr"))
+    return title, abstract, keywords, zh_title, zh_text
+
+
+def query_terms(query):
+    """
+    把查询切分为词项：英文等非汉字部分原样 (小写) 作为前缀，连续汉字切成二元组，单个汉字作为前缀。
+    与 docs/postings.js 中的 queryTerms 一致。
+    """
+    terms = []
+
+    def add(term):
+        if term and term not in terms:
+            terms.append(term)
+
+    for token in query.lower().split():
+        last = 0
+        for match in CJK_RUN_RE.finditer(token):
+            add(token[last:match.start()])
+            run = match.group()
+            if len(run) == 1:
+                add(run)
+            for i in range(len(run) - 1):
+                if run[i:i + 2] not in CJK_STOP_BIGRAMS:
+                    add(run[i:i + 2])
+            last = match.end()
+        add(token[last:])
+    return terms
+
+
+def idf(df, doc_count):
+    return math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+
+
+def field_scales(lengths, avg_lengths):
+    """每个字段的词频系数：字段权重除以长度归一化因子。与文档有关，与词项无关，可以预先计算。"""
+    return [
+        weight / (1 - b + b * (length / avg_length if avg_length else 1))
+        for length, avg_length, weight, b in zip(lengths, avg_lengths, FIELD_WEIGHTS, FIELD_B)
+    ]
+
+
+def term_weight(tfs, scales):
+    """BM25F 中与 idf 相乘的饱和词频部分，取值在 [0, 1) 之间。"""
+    tf = sum(field_tf * scale for field_tf, scale in zip(tfs, scales))
+    return tf / (K1 + tf)
+
+
+def quantize(weight):
+    return max(1, min(IMPACT_LEVELS, int(weight * IMPACT_LEVELS + 0.5)))
+
+
+def term_impacts(tf_rows, scale_rows):
+    """逐篇计算一个词项的量化权重，等价于 [quantize(term_weight(tfs, scales)) ...]，但在构建索引时快得多。"""
+    impacts = []
+    for tfs, scales in zip(tf_rows, scale_rows):
+        tf = sum(map(mul, tfs, scales))
+        impact = int(tf / (K1 + tf) * IMPACT_LEVELS + 0.5)
+        impacts.append(impact if impact > 1 else 1)
+    return impacts
+
+
+class ReferenceScorer:
+    """在原始论文记录上精确计算 BM25F 分数 (不量化)，匹配规则与浏览器端相同。"""
+
+    def __init__(self, papers):
+        """papers 是已按论文ID去重的记录 (见 build_database.unique_papers)，与构建脚本索引的版本一致。"""
+        self.docs = {}
+        self.postings = {}
+        for paper in papers:
+            fields = field_terms(paper)
+            self.docs[paper["id"]] = [len(terms) for terms in fields]
+            for i, terms in enumerate(fields):
+                for term in terms:
+                    tfs = self.postings.setdefault(term, {}).setdefault(paper["id"], [0] * len(FIELDS))
+                    tfs[i] += 1
+        self.doc_count = len(self.docs)
+        self.avg_lengths = [
+            sum(lengths[i] for lengths in self.docs.values()) / self.doc_count if self.doc_count else 0
+            for i in range(len(FIELDS))
+        ]
+
+    def token_scores(self, token):
+        """返回 ({论文ID: 分数}, 是否为可选词项)。"""
+        scores = {}
+        capped = False
+        for term, docs in self.postings.items():
+            if not term.startswith(token):
+                continue
+            term_idf = idf(len(docs), self.doc_count)
+            weights = {
+                paper_id: term_idf * term_weight(tfs, field_scales(self.docs[paper_id], self.avg_lengths))
+                for paper_id, tfs in docs.items()
+            }
+            if is_cjk_bigram(term) and len(weights) > CJK_MAX_POSTINGS:
+                top = sorted(weights, key=lambda paper_id: -weights[paper_id])[:CJK_MAX_POSTINGS]
+                weights = {paper_id: weights[paper_id] for paper_id in top}
+                capped = capped or term == token
+            for paper_id, score in weights.items():
+                if score > scores.get(paper_id, 0):
+                    scores[paper_id] = score
+        return scores, capped
+
+    def top_k(self, query, k=10):
+        return rank(query, self.token_scores, k)
+
+
+def rank(query, token_scores, k):
+    """
+    必选词项之间取交集并累加分数，可选词项 (被截断的常见二元组) 只为已匹配的论文加分；
+    全部是可选词项时取并集。返回按分数降序的前 k 个 (论文ID, 分数)。
+    """
+    required = None
+    optional = {}
+    for term in query_terms(query):
+        scores, capped = token_scores(term)
+        if capped:
+            for paper_id, score in scores.items():
+                optional[paper_id] = optional.get(paper_id, 0) + score
+        elif required is None:
+            required = scores
+        else:
+            required = {paper_id: required[paper_id] + score for paper_id, score in scores.items() if paper_id in required}
+    if required is None:
+        total = optional
+    else:
+        total = {paper_id: score + optional.get(paper_id, 0) for paper_id, score in required.items()}
+    ranked = sorted(total.items(), key=lambda item: (-item[1], item[0]))
+    return ranked[:k]
+
+
+def index_top_k(data_dir, query, k=10):
+    """用构建出的 docs.json 与搜索索引分片计算同样的排序 (浏览器端 ShardedIndex 的 Python 版本)。"""
+    from postings import decode_scored_postings, shards_for_prefix
+
+    with open(os.path.join(data_dir, "docs.json"), 'r', encoding='utf-8') as f:
+        paper_ids = json.load(f)["ids"]
+    with open(os.path.join(data_dir, "search_shards.json"), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    shards = manifest["shards"]
+    doc_count = manifest["docCount"]
+    capped_terms = manifest.get("cappedTerms", {})
+
+    def token_scores(token):
+        scores = {}
+        for shard in shards_for_prefix(shards, token):
+            with open(os.path.join(data_dir, shard["file"]), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for term, encoded in data["postings"].items():
+                if not term.startswith(token):
+                    continue
+                doc_ids, impacts = decode_scored_postings(encoded)
+                term_idf = idf(capped_terms.get(term, len(doc_ids)), doc_count)
+                for doc_id, impact in zip(doc_ids, impacts):
+                    score = term_idf * impact / IMPACT_LEVELS
+                    paper_id = paper_ids[doc_id]
+                    if score > scores.get(paper_id, 0):
+                        scores[paper_id] = score
+        return scores, token in capped_terms
+
+    return rank(query, token_scores, k)
+
+
+if __name__ == "__main__":
+    # 对比精确分数与发布索引 (量化后) 的排序: python ranking.py "diffusion model" [k]
+    from build_database import OUTPUT_DIR, iter_papers, unique_papers
+
+    query = sys.argv[1]
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    exact = ReferenceScorer(unique_papers(iter_papers()).values()).top_k(query, k)
+    published = index_top_k(OUTPUT_DIR, query, k)
+    for (exact_id, exact_score), (index_id, index_score) in zip(exact, published):
+        print(f"{exact_id}  {exact_score:.4f}    {index_id}  {index_score:.4f}")
+    overlap = len({paper_id for paper_id, _ in exact} & {paper_id for paper_id, _ in published})
+    print(f"前 {k} 篇重合: {overlap}/{len(exact)}")
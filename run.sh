@@ -1,12 +1,3 @@
-today=`date -u "+%Y-%m-%d"`
-cd daily_arxiv
-scrapy crawl arxiv -o ../data/${today}.jsonl
-
-cd ../ai
-python enhance.py --data ../data/${today}.jsonl
-
-cd ../to_md
-python convert.py --data ../data/${today}_AI_enhanced_${LANGUAGE}.jsonl
-
-cd ..
-python update_readme.py
+# 在本地运行与 GitHub Actions 相同的每日处理流程 (抓取、AI增强、归档、构建网站数据、生成报告、更新README)，
+# 已是最新的阶段会被跳过，可用 --force 强制重新运行，见 pipeline.py
+python pipeline.py "$@"
@@ -0,0 +1,91 @@
+"""
+测试共用的小型数据集：由固定种子生成的论文 (跨两个月份、有重复上榜和更新过的论文)，
+用 build_database.py 构建到临时目录中，供索引格式的测试读取。
+"""
+import json
+import os
+import random
+from collections import namedtuple
+
+import pytest
+
+ENGLISH_WORDS = (
+    "diffusion model models modeling language large vision visual transformer transformers graph graphs "
+    "learning learned network networks neural reinforcement policy robot robotic segmentation detection "
+    "generation generative video image images dataset benchmark benchmarks contrastive representation "
+    "retrieval reasoning agent agents planning depth stereo survival optimal transport attention sparse "
+    "efficient inference training pretraining alignment reward multimodal tactile medical cardiac"
+).split()
+CHINESE_CHARS = "图像生成视频检索推理强化学习网络注意力稀疏高效训练对齐奖励多模态触觉医学心脏分割检测基准数据集表示深度立体"
+# 每篇论文的摘要翻译中都有这个二元组，文档频率超过 CJK_MAX_POSTINGS，倒排表会被截断
+COMMON_BIGRAM = "模型"
+DATES = ("2025-03-30", "2025-03-31", "2025-04-01", "2025-04-02")
+PAPERS_PER_DAY = 160
+
+# site: 构建目录；papers: 去重后的论文记录；listed: 去重前各次上榜的记录
+BuiltSite = namedtuple("BuiltSite", "site papers listed")
+
+
+def _words(rng, low, high):
+    # 前面的词出现得更频繁，文档频率有高有低
+    weights = [1 / (rank + 1) for rank in range(len(ENGLISH_WORDS))]
+    return " ".join(rng.choices(ENGLISH_WORDS, weights, k=rng.randint(low, high)))
+
+
+def _chinese(rng, low, high):
+    return "".join(rng.choice(CHINESE_CHARS) for _ in range(rng.randint(low, high)))
+
+
+def make_paper(rng, paper_id, updated):
+    keywords = [rng.choice(ENGLISH_WORDS), _chinese(rng, 2, 4), f"{rng.choice(ENGLISH_WORDS)} {rng.choice(ENGLISH_WORDS)}"]
+    return {
+        "id": paper_id,
+        "title": _words(rng, 3, 9).title(),
+        "authors": [f"Author {rng.randint(1, 50)}" for _ in range(rng.randint(1, 4))],
+        "summary": _words(rng, 20, 80),
+        "categories": rng.sample(["cs.CV", "cs.CL", "cs.LG", "cs.RO", "eess.IV"], rng.randint(1, 3)),
+        "updated": updated,
+        "AI": {
+            "tldr": _chinese(rng, 8, 20),
+            "motivation": _chinese(rng, 8, 20),
+            "method": _chinese(rng, 8, 20),
+            "result": _chinese(rng, 8, 20),
+            "conclusion": _chinese(rng, 8, 20),
+            "title_translation": _chinese(rng, 4, 12),
+            "translation": _chinese(rng, 10, 40) + COMMON_BIGRAM + _chinese(rng, 0, 20),
+            "keywords": ", ".join(keywords),
+        },
+    }
+
+
+def write_dataset(data_dir, seed=0):
+    """写出各天的 _AI_enhanced_Chinese.jsonl。约十分之一的论文会在后面的日期再次上榜，其中一半是更新过的版本。"""
+    rng = random.Random(seed)
+    os.makedirs(data_dir, exist_ok=True)
+    previous = []
+    for day, date in enumerate(DATES):
+        papers = [make_paper(rng, f"{date[2:4]}{date[5:7]}.{day * PAPERS_PER_DAY + i:05d}", date) for i in range(PAPERS_PER_DAY)]
+        for paper in rng.sample(previous, min(len(previous), PAPERS_PER_DAY // 10)):
+            papers.append(make_paper(rng, paper["id"], date) if rng.random() < 0.5 else paper)
+        with open(os.path.join(data_dir, f"{date}_AI_enhanced_Chinese.jsonl"), "w", encoding="utf-8") as f:
+            for paper in papers:
+                f.write(json.dumps(paper, ensure_ascii=False) + "\n")
+        previous.extend(papers)
+
+
+@pytest.fixture(scope="session")
+def built_site(tmp_path_factory):
+    """在临时目录中构建小型数据集。"""
+    from build_database import OUTPUT_DIR, build_database_from_jsonl, iter_papers, unique_papers
+
+    root = tmp_path_factory.mktemp("site")
+    write_dataset(os.path.join(root, "data"))
+    cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        build_database_from_jsonl(full=True, jobs=1)
+        listed = list(iter_papers())
+    finally:
+        os.chdir(cwd)
+    papers = list(unique_papers(json.loads(json.dumps(listed))).values())
+    return BuiltSite(os.path.join(root, OUTPUT_DIR), papers, listed)
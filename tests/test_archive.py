@@ -0,0 +1,31 @@
+"""archive.py：月份归档能逐条还原各源文件，去重后的行取完整的 AI 结果。"""
+import json
+
+from ai.reuse import AI_FIELDS
+from archive import archive_path, compact, list_sources, open_archive, read_source
+
+
+def write_source(path, records):
+    path.write_text("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records), encoding="utf-8")
+
+
+def test_partial_ai_does_not_replace_complete_one(tmp_path):
+    complete_ai = {field: f"{field} 的内容" for field in AI_FIELDS}
+    # 后一天的结果缺少 tldr：只看已有的键时它也算完整，而且更新
+    partial_ai = {field: value for field, value in complete_ai.items() if field != "tldr"}
+    paper = {"id": "2503.00001", "title": "A Paper", "updated": "2025-03-01"}
+    sources = {
+        "2025-03-01_AI_enhanced_Chinese.jsonl": [{**paper, "AI": complete_ai}],
+        "2025-03-02_AI_enhanced_Chinese.jsonl": [{**paper, "AI": partial_ai}],
+        "2025-03-02.jsonl": [paper],
+    }
+    for name, records in sources.items():
+        write_source(tmp_path / name, records)
+
+    assert compact(str(tmp_path), "2025-03") == (3, 1, 1)
+    archive = open_archive(archive_path(str(tmp_path), "2025-03"))
+    assert archive.records() == [(paper, {"Chinese": complete_ai})]
+    restored = list_sources(str(tmp_path))
+    assert set(restored) == set(sources)
+    for name, records in sources.items():
+        assert list(read_source(name, restored[name])) == records
@@ -0,0 +1,62 @@
+"""autocomplete.py：前缀压缩的往返，以及分块词典的补全结果与逐个词项扫描一致。"""
+import json
+import os
+
+import pytest
+
+from autocomplete import build_blocks, complete, front_code, front_decode
+from ranking import ReferenceScorer
+
+
+@pytest.fixture(scope="module")
+def vocabulary(built_site):
+    # 词项的文档频率 = 包含它的去重后论文数
+    return sorted((term, len(papers)) for term, papers in ReferenceScorer(built_site.papers).postings.items())
+
+
+@pytest.fixture(scope="module")
+def expected(vocabulary):
+    """词汇表中所有 1 到 3 个字符的前缀 -> 逐个词项扫描得到的前 10 个补全。"""
+    matches = {}
+    for term, df in vocabulary:
+        for n in range(1, min(3, len(term)) + 1):
+            matches.setdefault(term[:n], []).append((term, df))
+    return {prefix: sorted(items, key=lambda item: (-item[1], item[0]))[:10] for prefix, items in matches.items()}
+
+
+@pytest.mark.parametrize("terms", [
+    [],
+    [("a", 1)],
+    [("co", 3), ("code", 2), ("coder", 1), ("cool", 5), ("d", 1)],
+    # 非 BMP 字符在 UTF-16 中占两个码元，共享前缀长度按码元计
+    [("𝔸", 1), ("𝔸𝔹", 2), ("𝔸𝔹c", 3), ("𝔸𝔻", 4), ("图", 5), ("图像", 6)],
+])
+def test_front_coding_round_trip(terms):
+    assert front_decode(front_code(terms)) == terms
+
+
+def test_front_coding_counts_utf16_units():
+    assert front_code([("𝔸𝔹", 1), ("𝔸𝔻", 2)]) == [0, "𝔸𝔹", 1, 2, "𝔻", 2]
+
+
+def test_complete_matches_prefix_scan(built_site, vocabulary, expected):
+    with open(os.path.join(built_site.site, "term_blocks.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert manifest["termCount"] == len(vocabulary)
+    assert len(manifest["blocks"]) > 1
+    for prefix, completions in expected.items():
+        assert complete(built_site.site, prefix) == completions, prefix
+    assert complete(built_site.site, "zzz") == complete(built_site.site, "") == []
+
+
+def test_small_blocks_match_prefix_scan(tmp_path, vocabulary, expected):
+    # 块很小时大多数短前缀都跨越块边界，走 top 中预先算好的结果
+    blocks = []
+    os.makedirs(tmp_path / "terms")
+    for first, last, data in build_blocks(vocabulary, block_terms=5):
+        name = f"terms/terms-{len(blocks):04d}.json"
+        (tmp_path / name).write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        blocks.append({"file": name, "first": first, "last": last})
+    (tmp_path / "term_blocks.json").write_text(json.dumps({"blocks": blocks}), encoding="utf-8")
+    for prefix, completions in expected.items():
+        assert complete(tmp_path, prefix) == completions, prefix
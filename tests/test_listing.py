@@ -0,0 +1,50 @@
+"""daily_arxiv/daily_arxiv/listing.py：用保存的列表页 (daily_arxiv/fixtures) 离线检查解析结果。"""
+import os
+
+from scrapy.http import HtmlResponse
+
+from daily_arxiv.listing import is_complete, parse_listing
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "..", "daily_arxiv", "fixtures", "list-cs.CV-new.html")
+
+
+def load_listing():
+    with open(FIXTURE, "rb") as f:
+        response = HtmlResponse(url="https://arxiv.org/list/cs.CV/new", body=f.read(), encoding="utf-8")
+    return parse_listing(response)
+
+
+def test_entries_in_page_order_without_replacements():
+    entries = load_listing()
+    # 新提交 3 篇 + 交叉列出 2 篇；替换版本 (2506.20786) 不收录
+    assert [entry["id"] for entry in entries] == ["2506.20741", "2506.20756", "2506.20757", "2506.20683", "2506.20703"]
+
+
+def test_categories_and_primary_category():
+    entries = {entry["id"]: entry for entry in load_listing()}
+    assert entries["2506.20741"]["categories"] == ["cs.CV"]
+    assert entries["2506.20757"]["categories"] == ["cs.CV", "cs.RO"]
+    # 交叉列出的论文的主分类不是 cs.CV
+    assert entries["2506.20683"]["categories"] == ["eess.IV", "cs.AI", "cs.CV", "eess.SP"]
+    assert entries["2506.20683"]["cate"] == "eess.IV"
+    assert entries["2506.20703"]["cate"] == "cs.GR"
+
+
+def test_fields_of_complete_entry():
+    entry = load_listing()[1]
+    assert entry["title"] == "StereoDiff: Stereo-Diffusion Synergy for Video Depth Estimation"
+    assert entry["authors"] == ["Haodong Li", "Chen Wang", "Jiahui Lei", "Kostas Daniilidis", "Lingjie Liu"]
+    assert entry["summary"].startswith("Recent video depth estimation methods")
+    assert entry["comment"] == "Work done in Nov. 2024. Project page: https://stereodiff.github.io/"
+    assert entry["pdf_url"] == "http://arxiv.org/pdf/2506.20756v1"
+    assert entry["url"] == "http://arxiv.org/abs/2506.20756v1"
+
+
+def test_incomplete_entry_is_left_for_api():
+    entries = {entry["id"]: entry for entry in load_listing()}
+    incomplete = entries["2506.20757"]
+    # 列表页中没有摘要：不能跳过 API，交给 ArxivPipeline 补全
+    assert "summary" not in incomplete
+    assert incomplete["comment"] is None
+    assert not is_complete(incomplete)
+    assert [paper_id for paper_id, entry in entries.items() if not is_complete(entry)] == ["2506.20757"]
@@ -0,0 +1,74 @@
+"""postings.py：倒排表编码的往返，以及构建出的分类索引和分片清单。"""
+import json
+import os
+import random
+
+import pytest
+
+from postings import (
+    decode_postings,
+    decode_scored_postings,
+    encode_postings,
+    encode_scored_postings,
+    shards_for_prefix,
+)
+
+# varint 在 7 位、14 位、21 位处换到更多字节
+VARINT_EDGES = [0, 1, 127, 128, 129, 16383, 16384, 2097151, 2097152, 2 ** 32]
+
+
+@pytest.mark.parametrize("doc_ids", [
+    [],
+    [0],
+    [5],
+    VARINT_EDGES,
+    list(range(1000)),
+    sorted(random.Random(1).sample(range(10 ** 6), 500)),
+])
+def test_postings_round_trip(doc_ids):
+    assert decode_postings(encode_postings(doc_ids)) == doc_ids
+
+
+def test_scored_postings_round_trip():
+    rng = random.Random(2)
+    for size in (0, 1, 2, 300):
+        doc_ids = sorted(rng.sample(range(50000), size))
+        impacts = [rng.randint(1, 255) for _ in doc_ids]
+        assert decode_scored_postings(encode_scored_postings(doc_ids, impacts)) == (doc_ids, impacts)
+
+
+@pytest.mark.parametrize("doc_ids", [[3, 3], [4, 2], [-1]])
+def test_rejects_unsorted_doc_ids(doc_ids):
+    with pytest.raises(ValueError):
+        encode_postings(doc_ids)
+
+
+def test_category_index(built_site):
+    with open(os.path.join(built_site.site, "docs.json"), encoding="utf-8") as f:
+        ids = json.load(f)["ids"]
+    with open(os.path.join(built_site.site, "category_index.json"), encoding="utf-8") as f:
+        index = json.load(f)
+    assert index["docCount"] == len(built_site.papers) == len(ids)
+    # 分类索引收录论文各次上榜时的全部分类 (去重前)
+    expected = {}
+    for paper in built_site.listed:
+        for category in paper["categories"]:
+            expected.setdefault(category, set()).add(paper["id"])
+    decoded = {category: [ids[doc_id] for doc_id in decode_postings(encoded)] for category, encoded in index["postings"].items()}
+    assert {category: set(paper_ids) for category, paper_ids in decoded.items()} == expected
+    assert all(paper_ids == sorted(paper_ids) for paper_ids in decoded.values())
+
+
+def test_shards_for_prefix_covers_all_matching_terms(built_site):
+    site = built_site.site
+    with open(os.path.join(site, "search_shards.json"), encoding="utf-8") as f:
+        shards = json.load(f)["shards"]
+    terms = {}
+    for shard in shards:
+        with open(os.path.join(site, shard["file"]), encoding="utf-8") as f:
+            for term in json.load(f)["postings"]:
+                terms[term] = shard["file"]
+    assert len(shards) > 1
+    for prefix in ["a", "co", "tra", "transformer", "图", "模型", "zzz"]:
+        selected = {shard["file"] for shard in shards_for_prefix(shards, prefix)}
+        assert {terms[term] for term in terms if term.startswith(prefix)} <= selected
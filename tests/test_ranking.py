@@ -0,0 +1,55 @@
+"""ranking.py：发布的搜索索引 (量化后的 BM25F) 与 ReferenceScorer 的精确分数给出相同的排序。"""
+import json
+import os
+
+import pytest
+
+from ranking import CJK_MAX_POSTINGS, IMPACT_LEVELS, ReferenceScorer, idf, index_top_k, query_terms
+from postings import decode_scored_postings, shards_for_prefix
+
+QUERIES = [
+    "diffusion", "diff", "graph neural", "transformer attention", "cardiac tactile",
+    "图像", "图", "模型", "模型 图像", "robot 学习", "nonexistent",
+]
+K = 10
+
+
+@pytest.fixture(scope="module")
+def scorer(built_site):
+    return ReferenceScorer(built_site.papers)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_top_k_matches_reference(built_site, scorer, query):
+    exact = dict(scorer.top_k(query, len(built_site.papers)))
+    published = index_top_k(built_site.site, query, K)
+    if not exact:
+        assert published == []
+        return
+    # 每个词项的 impact 量化到 1/255，分数误差不超过各词项最大 idf 的 1/255 之和
+    tolerance = len(query_terms(query)) * idf(1, len(built_site.papers)) / IMPACT_LEVELS
+    for paper_id, score in published:
+        assert score == pytest.approx(exact[paper_id], abs=tolerance)
+    # 分数明显高于发布的第 k 篇的论文都在结果中，结果的顺序与精确分数一致 (误差范围内的并列除外)
+    threshold = published[-1][1] if len(published) == K else 0
+    published_ids = [paper_id for paper_id, _ in published]
+    assert {paper_id for paper_id, score in exact.items() if score > threshold + 2 * tolerance} <= set(published_ids)
+    for higher, lower in zip(published_ids, published_ids[1:]):
+        assert exact[higher] >= exact[lower] - 2 * tolerance
+    assert len(published) == min(K, len(exact))
+
+
+def test_exact_order_on_well_separated_query(built_site, scorer):
+    assert [paper_id for paper_id, _ in index_top_k(built_site.site, "diffusion", K)] == \
+        [paper_id for paper_id, _ in scorer.top_k("diffusion", K)]
+
+
+def test_common_bigram_is_capped(built_site):
+    with open(os.path.join(built_site.site, "search_shards.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert manifest["cappedTerms"] == {"模型": len(built_site.papers)}
+    [shard] = shards_for_prefix(manifest["shards"], "模型")
+    with open(os.path.join(built_site.site, shard["file"]), encoding="utf-8") as f:
+        doc_ids, impacts = decode_scored_postings(json.load(f)["postings"]["模型"])
+    assert len(doc_ids) == CJK_MAX_POSTINGS
+    assert all(1 <= impact <= IMPACT_LEVELS for impact in impacts)
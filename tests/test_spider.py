@@ -0,0 +1,20 @@
+"""daily_arxiv/daily_arxiv/spiders/arxiv.py：列表页被重定向时，条目仍记在对应的分类下。"""
+from scrapy.http import HtmlResponse
+
+from daily_arxiv.spiders.arxiv import ArxivSpider
+from test_listing import FIXTURE
+
+
+def test_redirected_listing_is_keyed_by_start_url(monkeypatch):
+    monkeypatch.setenv("CATEGORIES", "cs.CV, cs.RO")
+    spider = ArxivSpider(mode="listing")
+    requests = list(spider.start_requests())
+    with open(FIXTURE, "rb") as f:
+        body = f.read()
+    papers = []
+    for request in requests:
+        # 响应的 URL 与请求不同 (如末尾多了斜杠)
+        response = HtmlResponse(url=request.url + "/", body=body, encoding="utf-8", request=request)
+        papers.extend(request.callback(response, **request.cb_kwargs))
+    assert [paper["id"] for paper in papers] == ["2506.20741", "2506.20756", "2506.20757", "2506.20683", "2506.20703"]
+    assert all(paper["list_categories"] == ["cs.CV", "cs.RO"] for paper in papers)
@@ -1,18 +1,41 @@
+import io
 import json
 import os
 import sys
 import argparse
 import re
-from collections import defaultdict
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
+# 论文汇总库 (paper_store.py) 与数据归档 (archive.py) 位于仓库根目录
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# 模板中的占位符 {键}，键名与 paper_context 返回的字典一致
+PLACEHOLDER_RE = re.compile(r'\{(\w+)\}')
+PLACEHOLDERS = (
+    "idx", "id", "title", "authors", "comment", "categories", "pdf_url", "cate", "url",
+    "title_translation", "keywords", "tldr", "motivation", "method", "conclusion",
+    "ai_comment", "results", "ai_Abstract", "abstract_translation",
+)
+# 每日摘要 (见 report_summary) 中保留的热门关键词数
+SUMMARY_KEYWORDS = 10
+
 def parse_arguments():
     """解析命令行参数，与 run.yml 工作流保持一致。"""
     parser = argparse.ArgumentParser(description="将JSONL文件转换为功能完善的Markdown报告。")
-    parser.add_argument("--input", type=str, required=True, help="输入的 JSONL 文件路径")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", type=str, help="输入的 JSONL 文件路径")
+    source.add_argument("--store", type=str, nargs="?", const="", help="改从论文汇总库 (paper_store.py) 读取报告日期当天的论文，可指定数据库路径")
+    source.add_argument("--all", action="store_true", help="重新生成数据目录中所有过期的报告 (增强后的 JSONL 或模板比报告新)")
     parser.add_argument("--template", type=str, required=True, help="单篇论文的模板文件路径")
-    parser.add_argument("--output", type=str, required=True, help="输出的 Markdown 文件路径")
-    return parser.parse_args()
+    parser.add_argument("--output", type=str, help="输出的 Markdown 文件路径 (--all 模式下不需要)")
+    parser.add_argument("--data", type=str, default="data", help="--all 模式下的数据目录")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="--all 模式下并行生成报告的进程数 (默认为 CPU 核数)")
+    args = parser.parse_args()
+    if not args.all and not args.output:
+        parser.error("使用 --input 或 --store 时必须指定 --output")
+    return args
 
 def load_jsonl_data(file_path):
     """从JSONL文件加载数据，处理文件不存在或为空的情况。"""
@@ -30,6 +53,18 @@ def load_jsonl_data(file_path):
         print(f"错误: 解析JSONL文件失败 {file_path}: {e}", file=sys.stderr)
         return None
 
+def load_store_data(store_path, date_str):
+    """从论文汇总库读取某一天列表中的论文 (附带 LANGUAGE 语言的 AI 结果)，记录形式与 JSONL 中相同。"""
+    from paper_store import PaperStore, STORE_PATH
+
+    store = PaperStore(store_path or STORE_PATH)
+    data = store.listed_on(date_str, os.environ.get('LANGUAGE', 'Chinese'))
+    store.close()
+    if not data:
+        print(f"信息: 论文汇总库中没有 {date_str} 的论文.", file=sys.stdout)
+        return None
+    return data
+
 def load_template(file_path):
     """加载模板文件，处理文件未找到的错误。"""
     try:
@@ -39,6 +74,30 @@ def load_template(file_path):
         print(f"错误: 模板文件未找到 {file_path}", file=sys.stderr)
         sys.exit(1)
 
+def compile_template(template):
+    """
+    把模板预先切分为片段列表 [文本, 键, 文本, 键, ..., 文本]：偶数位置是原样输出的文本，奇数位置是占位符的键。
+    不认识的 {...} 按原样保留在文本中。
+    """
+    segments = [""]
+    parts = PLACEHOLDER_RE.split(template)
+    for i, part in enumerate(parts):
+        if i % 2 == 0:
+            segments[-1] += part
+        elif part in PLACEHOLDERS:
+            segments.extend((part, ""))
+        else:
+            segments[-1] += f"{{{part}}}"
+    return segments
+
+def render_template(segments, context, out):
+    """按片段列表把一篇论文写入 out；值为 None 时写入空字符串。"""
+    for i, segment in enumerate(segments):
+        if i % 2:
+            out.write(str(context[segment] or ''))
+        else:
+            out.write(segment)
+
 def slugify(text):
     """为TOC创建健壮的、GitHub兼容的锚点链接。"""
     text = str(text).lower()
@@ -46,117 +105,189 @@ def slugify(text):
     text = re.sub(r'[\s]+', '-', text)
     return text
 
-def main():
-    """主函数，生成Markdown报告。"""
-    args = parse_arguments()
-    
-    date_match = re.search(r'(\d{4}-\d{2}-\d{2})', args.output)
-    date_str = date_match.group(1) if date_match else datetime.now().strftime('%Y-%m-%d')
+def category_rank(category, preference):
+    try:
+        return preference.index(category)
+    except ValueError:
+        return len(preference)
 
-    data = load_jsonl_data(args.input)
-    paper_template = load_template(args.template)
+def primary_category(paper):
+    return (paper.get("categories") or [paper.get("cate")])[0] or "Uncategorized"
 
-    if not data:
-        final_content = f"# AI-Enhanced arXiv Daily {date_str}\n\n"
-        final_content += "### 今日没有找到新论文。\n"
-        with open(args.output, "w", encoding='utf-8') as f:
-            f.write(final_content)
-        print(f"成功生成报告 (无新论文): {args.output}")
-        sys.exit(0)
+def paper_context(idx, paper):
+    """单篇论文卡片的模板上下文，键名与 paper_template.md 中的占位符一致。"""
+    ai_data = paper.get('AI', {})
+
+    # 兼容 "categories" 和 "cate" 字段
+    categories = paper.get("categories") or ([paper.get("cate")] if paper.get("cate") else [])
+    if not categories:
+        categories = ["Uncategorized"]
+
+    return {
+        "idx": idx + 1,
+        "id": paper.get("id", "N/A"),
+        "title": paper.get("title", "N/A"),
+        "authors": ", ".join(paper.get("authors", ["N/A"])),
+        "comment": paper.get("comment", "无"), # 作者备注
+        "categories": ", ".join(categories), # 所有分类，用于模板显示
+        "pdf_url": paper.get("pdf_url", "N/A"), # PDF链接
+        "cate": primary_category(paper), # 主分类，默认为 "Uncategorized"
+        "url": f"https://arxiv.org/abs/{paper.get('id', '')}",
 
-    # --- 数据分类和排序 ---
+        # AI 数据
+        "title_translation": ai_data.get('title_translation', 'N/A'),
+        "keywords": ai_data.get('keywords', 'N/A'),
+        "tldr": ai_data.get('tldr', 'N/A'),
+        "motivation": ai_data.get('motivation', 'N/A'),
+        "method": ai_data.get('method', 'N/A'),
+        "conclusion": ai_data.get('conclusion', 'N/A'),
+
+        # --- 已修正以下键名以匹配模板 ---
+        "ai_comment": ai_data.get('comments', 'N/A'),      # 模板需要 {ai_comment}
+        "results": ai_data.get('result', 'N/A'),           # 模板需要 {results}
+        "ai_Abstract": ai_data.get('summary', 'N/A'),      # 模板需要 {ai_Abstract}
+        "abstract_translation": ai_data.get('translation', 'N/A'), # 模板需要 {abstract_translation}
+    }
+
+def group_by_category(data):
+    """按主分类分组，返回 ({分类: [论文, ...]}, 按 CATEGORIES 偏好排序的分类列表)。"""
     preference_str = os.environ.get('CATEGORIES', 'cs.CV,cs.CL,cs.LG,cs.AI,stat.ML,eess.IV')
     preference = [cat.strip() for cat in preference_str.split(',')]
-    def rank(category):
-        try:
-            return preference.index(category)
-        except ValueError:
-            return len(preference)
 
     papers_by_category = defaultdict(list)
     for paper in data:
-        primary_category = (paper.get("categories") or [paper.get("cate")])[0] or "Uncategorized"
-        papers_by_category[primary_category].append(paper)
-    sorted_categories = sorted(papers_by_category.keys(), key=rank)
-
-    # --- Markdown 内容生成 ---
-    # 1. 预先渲染所有论文卡片
-    rendered_papers = {}
-    for idx, paper in enumerate(data):
-        ai_data = paper.get('AI', {})
-        primary_category = (paper.get("categories") or [paper.get("cate")])[0] or "Uncategorized" # 获取主分类，默认为 "Uncategorized"
-
-        # 兼容 "categories" 和 "cate" 字段
-        categories = paper.get("categories") or ([paper.get("cate")] if paper.get("cate") else [])
-        if not categories:
-            categories = ["Uncategorized"]
-            
-        paper['all_categories_str'] = ", ".join(categories) # 存储所有分类，用于模板显示
-        
-        # **核心修正**: 调整context字典的键名，以精确匹配paper_template.md中的占位符
-        context = {
-            "idx": idx + 1,
-            "id": paper.get("id", "N/A"),
-            "title": paper.get("title", "N/A"),
-            "authors": ", ".join(paper.get("authors", ["N/A"])),
-            "comment": paper.get("comment", "无"), # 作者备注
-            "categories": paper.get('all_categories_str', 'N/A'), # 使用我们创建的完整分类字符串
-            "pdf_url": paper.get("pdf_url", "N/A"), # PDF链接
-            "cate": primary_category,
-            "url": f"https://arxiv.org/abs/{paper.get('id', '')}",
-            
-            # AI 数据
-            "title_translation": ai_data.get('title_translation', 'N/A'),
-            "keywords": ai_data.get('keywords', 'N/A'),
-            "tldr": ai_data.get('tldr', 'N/A'),
-            "motivation": ai_data.get('motivation', 'N/A'),
-            "method": ai_data.get('method', 'N/A'),
-            "conclusion": ai_data.get('conclusion', 'N/A'),
-
-            # --- 已修正以下键名以匹配模板 ---
-            "ai_comment": ai_data.get('comments', 'N/A'),      # 模板需要 {ai_comment}
-            "results": ai_data.get('result', 'N/A'),           # 模板需要 {results}
-            "ai_Abstract": ai_data.get('summary', 'N/A'),      # 模板需要 {ai_Abstract}
-            "abstract_translation": ai_data.get('translation', 'N/A'), # 模板需要 {abstract_translation}
-        }
-        
-        # 填充模板
-        temp_paper_content = paper_template
-        for key, value in context.items():
-            # 使用 str(value or '') 确保即使值为None也能安全替换为空字符串
-            temp_paper_content = temp_paper_content.replace(f"{{{key}}}", str(value or ''))
-        rendered_papers[paper.get("id")] = temp_paper_content
-
-    # 2. 生成TOC (目录)
-    toc_parts = [f"## 今日总计: {len(data)} 篇论文", "### 目录"]
+        papers_by_category[primary_category(paper)].append(paper)
+    sorted_categories = sorted(papers_by_category.keys(), key=lambda category: category_rank(category, preference))
+    return papers_by_category, sorted_categories
+
+def report_summary(data, date_str):
+    """
+    一份报告的摘要：论文总数、各分类的篇数 (与报告目录顺序一致) 以及出现最多的 AI 关键词。
+    写在报告旁的 YYYY-MM-DD.summary.json 中，由 update_readme.py 合并进报告清单，生成 README 时不必再读取报告。
+    """
+    data = data or []
+    papers_by_category, sorted_categories = group_by_category(data)
+    keywords = Counter()
+    for paper in data:
+        value = (paper.get("AI") or {}).get("keywords")
+        if isinstance(value, str):
+            keywords.update(kw.strip() for kw in value.split(',') if kw.strip())
+    return {
+        "date": date_str,
+        "total": len(data),
+        "categories": [[cate, len(papers_by_category[cate])] for cate in sorted_categories],
+        "keywords": keywords.most_common(SUMMARY_KEYWORDS),
+    }
+
+def summary_path(report_path):
+    return report_path.removesuffix(".md") + ".summary.json"
+
+def render_report(data, segments, date_str):
+    """生成整份报告的 Markdown 文本。segments 是 compile_template 编译好的单篇论文模板。"""
+    out = io.StringIO()
+    out.write(f"# AI-Enhanced arXiv Daily {date_str}\n\n")
+    if not data:
+        out.write("### 今日没有找到新论文。\n")
+        return out.getvalue()
+
+    papers_by_category, sorted_categories = group_by_category(data)
+    # 同一篇论文在输入中重复出现时，每次出现都输出最后一次出现时的卡片 (包括编号)
+    latest = {paper.get("id"): (idx, paper) for idx, paper in enumerate(data)}
+
+    # 1. TOC (目录)
+    out.write("<a id='toc'></a>\n")
+    out.write(f"## 今日总计: {len(data)} 篇论文\n### 目录\n")
     for cate in sorted_categories:
-        slug = slugify(cate)
-        toc_parts.append(f"- [{cate}](#{slug}) ({len(papers_by_category[cate])} 篇)")
-    
-    # 3. 按分类组装最终内容
-    content_by_category_str = ""
+        out.write(f"- [{cate}](#{slugify(cate)}) ({len(papers_by_category[cate])} 篇)\n")
+    out.write("\n---\n")
+
+    # 2. 按分类输出论文卡片，编号为论文在输入中的序号
+    # 每个分类以 "## 分类" 开头，每篇论文后跟返回链接与分隔线；整份报告末尾不保留最后一条分隔线
+    body = io.StringIO()
     for cate in sorted_categories:
         slug = slugify(cate)
-        # **已修改**: 使用 <small> 标签来缩小导航链接的字体
-        content_by_category_str += f"<a id='{slug}'></a>\n## {cate} \n\n"
-        
-        for paper_data in papers_by_category[cate]:
-            paper_id = paper_data.get("id")
-            if paper_id in rendered_papers:
-                content_by_category_str += rendered_papers[paper_id]
-                content_by_category_str += f"\n[⬆️ 返回分类顶部](#{slug}) | [⬆️ 返回总目录](#toc)\n\n---\n\n"
-
-    # 4. 组装最终的完整Markdown页面
-    report_title = f"# AI-Enhanced arXiv Daily {date_str}\n\n"
-    toc_anchor = "<a id='toc'></a>\n"
-    final_toc = "\n".join(toc_parts) + "\n\n---\n"
-    
-    final_content = report_title + toc_anchor + final_toc + content_by_category_str.strip().removesuffix('---')
-
-    with open(args.output, "w", encoding='utf-8') as f:
-        f.write(final_content)
-    
-    print(f"成功将 {len(data)} 篇论文转换为Markdown，并保存到 {args.output}")
+        body.write(f"<a id='{slug}'></a>\n## {cate} \n\n")
+        for paper in papers_by_category[cate]:
+            render_template(segments, paper_context(*latest[paper.get("id")]), body)
+            body.write(f"\n[⬆️ 返回分类顶部](#{slug}) | [⬆️ 返回总目录](#toc)\n\n---\n\n")
+    out.write(body.getvalue().strip().removesuffix('---'))
+    return out.getvalue()
+
+def write_report(output, data, segments, date_str):
+    """写出报告及其摘要，返回摘要。"""
+    summary = report_summary(data, date_str)
+    with open(output, "w", encoding='utf-8') as f:
+        f.write(render_report(data, segments, date_str))
+    with open(summary_path(output), "w", encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False)
+    return summary
+
+def stale_reports(data_dir, template_path, language):
+    """
+    返回需要重新生成的报告 [(报告路径, 源文件名, 源文件所在路径, 日期)]：报告不存在，或比增强后的 JSONL 或模板旧。
+    已归档的月份只会因归档而改变 (见 archive.py)，归档本身不使报告过期，只与模板比较。
+    """
+    from archive import SOURCE_RE, list_sources
+
+    template_mtime = os.path.getmtime(template_path)
+    stale = []
+    for name, path in list_sources(data_dir).items():
+        match = SOURCE_RE.fullmatch(name)
+        if match.group(2) != language:
+            continue
+        output = os.path.join(data_dir, f"{match.group(1)}.md")
+        source_mtime = 0 if path.endswith(".zip") else os.path.getmtime(path)
+        if not os.path.exists(output) or os.path.getmtime(output) < max(source_mtime, template_mtime):
+            stale.append((output, name, path, match.group(1)))
+    return stale
+
+def convert_reports(reports, segments):
+    """在一个进程中依次生成 reports 中的报告 (同一个月份的报告放在一起，归档只需解码一次)，返回论文总数。"""
+    from archive import read_source
+
+    count = 0
+    for output, name, path, date_str in reports:
+        data = [record for record in read_source(name, path) if record is not None]
+        write_report(output, data, segments, date_str)
+        count += len(data)
+    return count
+
+def convert_all(data_dir, template_path, jobs):
+    """按月份分组，在进程池中重新生成所有过期的报告。"""
+    stale = stale_reports(data_dir, template_path, os.environ.get('LANGUAGE', 'Chinese'))
+    if not stale:
+        print("所有报告都是最新的。")
+        return
+    segments = compile_template(load_template(template_path))
+    by_month = defaultdict(list)
+    for report in stale:
+        by_month[report[3][:7]].append(report)
+    groups = list(by_month.values())
+    if jobs <= 1 or len(groups) <= 1:
+        counts = [convert_reports(group, segments) for group in groups]
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(groups))) as executor:
+            counts = list(executor.map(convert_reports, groups, [segments] * len(groups)))
+    print(f"重新生成了 {len(stale)} 份报告，共 {sum(counts)} 篇论文。")
+
+def main():
+    """主函数，生成Markdown报告。"""
+    args = parse_arguments()
+    if args.all:
+        convert_all(args.data, args.template, args.jobs)
+        return
+
+    date_match = re.search(r'(\d{4}-\d{2}-\d{2})', args.output)
+    date_str = date_match.group(1) if date_match else datetime.now().strftime('%Y-%m-%d')
+
+    data = load_jsonl_data(args.input) if args.input else load_store_data(args.store, date_str)
+    segments = compile_template(load_template(args.template))
+    write_report(args.output, data, segments, date_str)
+
+    if not data:
+        print(f"成功生成报告 (无新论文): {args.output}")
+    else:
+        print(f"成功将 {len(data)} 篇论文转换为Markdown，并保存到 {args.output}")
 
 if __name__ == "__main__":
     main()
@@ -1,14 +1,21 @@
 import os
 import re
+import json
 from datetime import datetime, date, timedelta
 from collections import defaultdict
 import calendar
 
+from archive import list_sources, read_source
+from to_md.convert import report_summary, summary_path
+
 # --- 配置区 ---
 DATA_DIR = "data"
 README_PATH = "README.md"
 # 这是一个新的模板文件，定义了README的静态框架
 TEMPLATE_PATH = "readme_content_template.md" 
+# 报告清单：每份报告的摘要 (总数、各分类篇数、热门关键词)，生成README时只读取它，不读取报告本身
+REPORTS_MANIFEST_PATH = os.path.join(DATA_DIR, "reports.json")
+LANGUAGE = os.environ.get("LANGUAGE", "Chinese")
 
 def get_report_files():
     """扫描data目录，获取所有报告文件并按日期降序排序。"""
@@ -19,38 +26,84 @@ def get_report_files():
     files.sort(reverse=True)
     return files
 
-def parse_report_toc(filepath):
-    """解析报告文件，提取其目录和总数。"""
-    summary = {"total": 0, "toc_lines": []}
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        total_match = re.search(r'## Total Papers Today: (\d+)', content)
-        if total_match:
-            summary["total"] = int(total_match.group(1))
+def backfill_summary(date_str, sources):
+    """
+    为没有摘要的旧报告补上摘要：由当天的源数据 (优先取增强后的文件，sources 见 archive.list_sources) 重新计算，
+    只在第一次合并清单时发生一次。
+    """
+    for name in (f"{date_str}_AI_enhanced_{LANGUAGE}.jsonl", f"{date_str}.jsonl"):
+        if name in sources:
+            data = [record for record in read_source(name, sources[name]) if isinstance(record, dict)]
+            return report_summary(data, date_str)
+    return report_summary([], date_str)
 
-        toc_match = re.search(r'# Table of Contents\n\n(.*?)\n\n<hr>', content, re.DOTALL)
-        if toc_match:
-            summary["toc_lines"] = toc_match.group(1).strip().split('\n')
-        
-        return summary
-    except Exception:
-        return summary
+def write_reports_manifest(summaries):
+    """按日期降序写出报告清单，每份报告一行，便于在提交记录中查看变化。"""
+    lines = [json.dumps(summaries[date_str], ensure_ascii=False) for date_str in sorted(summaries, reverse=True)]
+    tmp_path = REPORTS_MANIFEST_PATH + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('{"reports": [\n' + ',\n'.join(lines) + '\n]}\n')
+    os.replace(tmp_path, REPORTS_MANIFEST_PATH)
+
+def load_report_summaries(report_files, fresh=None):
+    """
+    读取报告清单，返回 {日期: 摘要}。convert.py 写在报告旁的 YYYY-MM-DD.summary.json 合并进清单后删除；
+    fresh ({日期: 摘要}，pipeline.py 在内存中传入刚生成的摘要) 优先于摘要文件。
+    清单中缺少的报告由 backfill_summary 补上，已删除的报告从清单中移除。
+    """
+    fresh = fresh or {}
+    summaries = {}
+    if os.path.exists(REPORTS_MANIFEST_PATH):
+        with open(REPORTS_MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            summaries = {summary["date"]: summary for summary in json.load(f)["reports"]}
+    report_dates = {os.path.basename(path).replace('.md', ''): path for path in report_files}
+
+    changed = False
+    merged = []
+    sources = None
+    for date_str, path in report_dates.items():
+        sidecar = summary_path(path)
+        if date_str in fresh:
+            summaries[date_str] = fresh[date_str]
+            if os.path.exists(sidecar):
+                merged.append(sidecar)
+            changed = True
+        elif os.path.exists(sidecar):
+            with open(sidecar, 'r', encoding='utf-8') as f:
+                summaries[date_str] = json.load(f)
+            merged.append(sidecar)
+            changed = True
+        elif date_str not in summaries:
+            sources = sources or list_sources(DATA_DIR)
+            summaries[date_str] = backfill_summary(date_str, sources)
+            changed = True
+    for date_str in set(summaries) - set(report_dates):
+        del summaries[date_str]
+        changed = True
+
+    if changed:
+        write_reports_manifest(summaries)
+        for sidecar in merged:
+            os.remove(sidecar)
+    return summaries
 
-def generate_dashboard_section(latest_file, recent_files):
+def generate_dashboard_section(latest_file, recent_files, summaries):
     """生成动态摘要仪表盘模块。"""
     if not latest_file:
         return "## 最新速报\n\n暂无报告。\n"
 
     latest_date_str = os.path.basename(latest_file).replace('.md', '')
-    report_summary = parse_report_toc(latest_file)
+    summary = summaries[latest_date_str]
     
     dashboard_md = f"## **最新速报：{latest_date_str}**\n\n"
     
-    if report_summary["total"] > 0:
-        mini_toc = " | ".join([line.strip().replace("- [", "").split("]")[0] for line in report_summary["toc_lines"]])
+    if summary["total"] > 0:
+        dashboard_md += f"**今日总计:** {summary['total']} 篇论文\n\n"
+        mini_toc = " | ".join(f"{cate} ({count})" for cate, count in summary["categories"])
         dashboard_md += f"**今日领域分布:** {mini_toc}\n\n"
+        if summary["keywords"]:
+            keywords = ", ".join(keyword for keyword, _ in summary["keywords"])
+            dashboard_md += f"**热门关键词:** {keywords}\n\n"
     
     dashboard_md += f"> [**阅读 {latest_date_str} 的完整报告...**](./{latest_file})\n"
     
@@ -59,11 +112,11 @@ def generate_dashboard_section(latest_file, recent_files):
     # 我们只展示最近的6篇（不含今天）
     for file in recent_files:
         date_str = os.path.basename(file).replace('.md', '')
-        dashboard_md += f"- [{date_str}](./{file})\n"
+        dashboard_md += f"- [{date_str}](./{file}) ({summaries[date_str]['total']} 篇)\n"
         
     return dashboard_md
 
-def generate_calendar_md(year, month, files_by_date):
+def generate_calendar_md(year, month, files_by_date, summaries):
     """为指定月份生成日历热图的Markdown表格。"""
     cal = calendar.Calendar()
     month_name = date(year, month, 1).strftime('%B')
@@ -80,14 +133,15 @@ def generate_calendar_md(year, month, files_by_date):
             else:
                 day_str = f"{year}-{month:02d}-{day:02d}"
                 if day_str in files_by_date:
-                    link = f"[{day}](./{files_by_date[day_str]})"
+                    # 链接标题 (鼠标悬停时显示) 给出当天的论文数
+                    link = f"[{day}](./{files_by_date[day_str]} \"{summaries[day_str]['total']} 篇\")"
                     week_md.append(link)
                 else:
                     week_md.append(str(day))
         md += f"| {' | '.join(week_md)} |\n"
     return md
 
-def generate_archive_md(files_by_year_month):
+def generate_archive_md(files_by_year_month, summaries):
     """生成折叠存档模块。"""
     md = "### **历史存档 (Full Archive)**\n\n"
     
@@ -98,19 +152,20 @@ def generate_archive_md(files_by_year_month):
             md += f"<details>\n<summary>{month_name}</summary>\n\n"
             for file in sorted(files_by_year_month[year][month], reverse=True):
                 date_str = os.path.basename(file).replace('.md', '')
-                md += f"- [{date_str}](./{file})\n"
+                md += f"- [{date_str}](./{file}) ({summaries[date_str]['total']} 篇)\n"
             md += "\n</details>\n"
         md += "\n</details>\n"
     return md
 
-def main():
-    """主函数，生成并更新README.md。"""
+def main(fresh_summaries=None):
+    """主函数，生成并更新README.md。fresh_summaries 见 load_report_summaries。"""
     report_files = get_report_files()
     if not report_files:
         print("在data目录中未找到任何报告文件。")
         return
 
     # --- 准备数据 ---
+    summaries = load_report_summaries(report_files, fresh_summaries)
     latest_report = report_files[0]
     recent_reports = report_files[1:7] 
     
@@ -122,16 +177,16 @@ def main():
         files_by_year_month[int(year)][int(month)].append(f)
 
     # --- 生成各个模块 ---
-    dashboard_md = generate_dashboard_section(latest_report, recent_reports)
+    dashboard_md = generate_dashboard_section(latest_report, recent_reports, summaries)
     
     today = date.today()
-    current_month_cal = generate_calendar_md(today.year, today.month, files_by_date)
+    current_month_cal = generate_calendar_md(today.year, today.month, files_by_date, summaries)
     
     last_month_date = today.replace(day=1) - timedelta(days=1)
     last_month_cal = ""
     # 如果今天是月初，可能还想显示上个月的日历
     if today.day < 15 and (today.year, today.month) != (last_month_date.year, last_month_date.month):
-        last_month_cal = generate_calendar_md(last_month_date.year, last_month_date.month, files_by_date)
+        last_month_cal = generate_calendar_md(last_month_date.year, last_month_date.month, files_by_date, summaries)
 
     # 从存档中排除最近的月份，避免重复
     archive_files = defaultdict(lambda: defaultdict(list))
@@ -142,7 +197,7 @@ def main():
             if not is_current and not is_last_month_in_view:
                 archive_files[year][month].extend(files)
 
-    archive_md = generate_archive_md(archive_files)
+    archive_md = generate_archive_md(archive_files, summaries)
     
     # --- 组合最终内容 ---
     content_parts = [